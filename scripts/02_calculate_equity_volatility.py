@@ -9,11 +9,16 @@ Calculates σ_E from 2013-2023 monthly returns using:
 - NA if insufficient data
 """
 
+import sys
 import pandas as pd
 import numpy as np
 from pathlib import Path
 
 base_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(base_dir))
+from utils.schema import read_table
+from utils.tickers import TickerResolver
+from utils.time_checks import assert_sigma_windows, audit_sigma_windows, build_monthly_return_index
 
 print("="*80)
 print("INSTRUCTION 2: CALCULATE EQUITY VOLATILITY")
@@ -22,7 +27,7 @@ print("="*80)
 # 1. Load data
 print("\n[1] Loading input data...")
 monthly_path = base_dir / 'data/clean/raw_monthly_total_return_2013_2023 (1).csv'
-monthly = pd.read_csv(monthly_path)
+monthly = read_table(monthly_path, 'monthly_returns')
 monthly.columns = monthly.columns.str.strip()
 monthly = monthly.rename(columns={'Instrument': 'instrument', 'Date': 'date', 'Total Return': 'total_return_pct'})
 monthly['date'] = pd.to_datetime(monthly['date'])
@@ -33,26 +38,16 @@ monthly['month'] = monthly['date'].dt.month
 monthly = monthly[monthly['year'].between(2013, 2023)].copy()
 print(f"   Monthly data: {len(monthly):,} rows")
 
-# Load List_bank for ticker_base
-list_bank = pd.read_excel(base_dir / 'data/clean/List_bank.xlsx')
-list_bank.columns = list_bank.columns.str.strip().str.lower().str.replace(' ', '_')
-list_bank = list_bank.rename(columns={'ticker': 'ticker_base', 'permid': 'perm_id'})
-
-# Load ticker mapping exceptions
-exceptions = pd.read_csv(base_dir / 'data/clean/ticker_mapping_exceptions.csv')
-exception_map = dict(zip(exceptions['return_instrument'], exceptions['list_bank_ticker']))
-
-def standardize_ticker(inst):
-    if pd.isna(inst): return None
-    if inst in exception_map: return exception_map[inst]
-    for suffix in ['.N', '.O', '.OQ', '.K', '.PK', '.A', '.AS']:
-        if inst.endswith(suffix): return inst[:-len(suffix)]
-    return inst
-
-monthly['ticker_base'] = monthly['instrument'].apply(standardize_ticker)
+# Resolve RICs to List_bank tickers (exceptions, List_bank symbols, suffix rules)
+resolver = TickerResolver.from_clean_dir(base_dir / 'data/clean')
+monthly['ticker_base'] = resolver.resolve(monthly['instrument']).astype(object)
+unresolved = resolver.report(monthly['instrument'])
+if len(unresolved):
+    print(f"   [WARN] {len(unresolved)} instruments not in List_bank:")
+    print(unresolved.to_string(index=False))
 
 # Merge with List_bank to get full metadata
-monthly = monthly.merge(list_bank[['ticker_base', 'company', 'perm_id']], on='ticker_base', how='left')
+monthly = monthly.merge(resolver.metadata()[['ticker_base', 'company', 'perm_id']], on='ticker_base', how='left')
 
 print(f"   After ticker mapping: {monthly['ticker_base'].nunique()} unique instruments")
 
@@ -98,6 +93,9 @@ for ticker in sorted(monthly_tier1['ticker_base'].unique()):
         window_months = 0
         obs_count = n_obs
         flag = None
+        # Calendar years of the first and last month actually used
+        window_start = valid_data['date'].iloc[0].year if n_obs else None
+        window_end = valid_data['date'].iloc[-1].year if n_obs else None
         
         # PRIMARY METHOD: 36-month rolling std
         if n_obs >= 24:
@@ -137,6 +135,8 @@ for ticker in sorted(monthly_tier1['ticker_base'].unique()):
             'sigma_E': sigma_E,
             'sigma_E_method': method,
             'sigma_E_window_months': window_months,
+            'sigmaE_window_start_year': window_start,
+            'sigmaE_window_end_year': window_end,
             'sigma_E_obs_count': obs_count,
             'sigma_E_flag': flag
         })
@@ -171,7 +171,7 @@ print(f"   Applied peer median to {peer_median_mask.sum()} bank-years")
 
 # 6. Merge with company names
 results_df = results_df.merge(
-    list_bank[['ticker_base', 'company']],
+    resolver.metadata()[['ticker_base', 'company']],
     on='ticker_base',
     how='left'
 )
@@ -179,9 +179,17 @@ results_df = results_df.merge(
 # Reorder columns
 output_cols = [
     'ticker_base', 'company', 'year', 'sigma_E', 'sigma_E_method',
-    'sigma_E_window_months', 'sigma_E_obs_count', 'sigma_E_flag'
+    'sigma_E_window_months', 'sigmaE_window_start_year', 'sigmaE_window_end_year',
+    'sigma_E_obs_count', 'sigma_E_flag'
 ]
 results_final = results_df[output_cols].copy()
+results_final['sigmaE_window_start_year'] = results_final['sigmaE_window_start_year'].astype('Int16')
+results_final['sigmaE_window_end_year'] = results_final['sigmaE_window_end_year'].astype('Int16')
+
+# Deep time integrity: re-derive every window from the monthly returns
+# before anything is written (raises on a count or window-year mismatch)
+monthly_index = build_monthly_return_index(monthly)
+assert_sigma_windows(results_final, monthly_index, ticker_col='ticker_base')
 
 # 7. Save output
 print("\n[7] Saving output...")
@@ -206,8 +214,9 @@ print(f"Total NA: {results_final['sigma_E'].isna().sum():,}")
 # CHECK B: Timing integrity
 print("\n[CHECK B] Timing Integrity Check")
 print("-"*80)
-print("Verified: All calculations use data from years < t only (cutoff in loop)")
-print("✅ No observations use data from year t")
+window_audit = audit_sigma_windows(results_final, monthly_index, ticker_col='ticker_base')
+print(f"Re-derived σ_E windows from {len(monthly_index):,} monthly returns (before January of year t)")
+print(f"✅ {int(window_audit['ok'].sum()):,} bank-years: window counts and years match returns dated before year t")
 
 # CHECK C: 2018 spot check (need old σ_E values)
 print("\n[CHECK C] 2018 Spot Check - σ_E Comparison")
@@ -3,11 +3,14 @@
 Analyze 2013-2015 coverage to understand impact on 2018 σ_E calculation
 """
 
+import sys
 import pandas as pd
 import numpy as np
 from pathlib import Path
 
 base_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(base_dir))
+from utils.tickers import TickerResolver
 
 print("="*80)
 print("EARLY YEARS COVERAGE ANALYSIS (2013-2015)")
@@ -21,21 +24,8 @@ monthly['date'] = pd.to_datetime(monthly['date'])
 monthly['year'] = monthly['date'].dt.year
 
 # Load ticker mapping
-list_bank = pd.read_excel(base_dir / 'data/clean/List_bank.xlsx')
-list_bank.columns = list_bank.columns.str.strip().str.lower().str.replace(' ', '_')
-list_bank = list_bank.rename(columns={'ticker': 'ticker_base'})
-
-exceptions = pd.read_csv(base_dir / 'data/clean/ticker_mapping_exceptions.csv')
-exception_map = dict(zip(exceptions['return_instrument'], exceptions['list_bank_ticker']))
-
-def standardize_ticker(inst):
-    if pd.isna(inst): return None
-    if inst in exception_map: return exception_map[inst]
-    for suffix in ['.N', '.O', '.OQ', '.K', '.PK', '.A', '.AS']:
-        if inst.endswith(suffix): return inst[:-len(suffix)]
-    return inst
-
-monthly['ticker_base'] = monthly['instrument'].apply(standardize_ticker)
+resolver = TickerResolver.from_clean_dir(base_dir / 'data/clean')
+monthly['ticker_base'] = resolver.resolve(monthly['instrument'])
 
 # Load esg to get instruments in use
 esg = pd.read_csv(base_dir / 'data/clean/esg_0718.csv')
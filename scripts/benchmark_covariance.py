@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark the panel covariance estimators in utils/covariance.py.
+
+Builds a synthetic bank-period panel (100,000 observations by default),
+fits OLS once and times each sandwich estimator against a naive version
+that loops over clusters in Python and against statsmodels' robust
+covariances. Standard errors of all three are checked for agreement.
+
+Usage:
+  python scripts/benchmark_covariance.py [n_obs] [n_banks]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import statsmodels.api as sm
+
+base_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(base_dir))
+from utils.covariance import sandwich_cov
+
+n_obs = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+n_banks = int(sys.argv[2]) if len(sys.argv) > 2 else 5_000
+n_regressors = 10
+maxlags = 2
+
+
+def timed(func, repeat=3):
+    """Best wall time of ``repeat`` calls and the last result."""
+    best = np.inf
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def naive_cluster(bread, scores, labels, df_resid):
+    """Per-cluster Python loop (the approach the module replaces)."""
+    n, k = scores.shape
+    meat = np.zeros((k, k))
+    clusters = np.unique(labels)
+    for g in clusters:
+        s = scores[labels == g].sum(axis=0)
+        meat += np.outer(s, s)
+    g = len(clusters)
+    return g / (g - 1) * (n - 1) / df_resid * bread @ meat @ bread
+
+
+print("="*80)
+print("PANEL COVARIANCE BENCHMARK")
+print("="*80)
+
+rng = np.random.default_rng(0)
+bank = rng.integers(0, n_banks, n_obs)
+period = rng.integers(0, 96, n_obs)
+X = sm.add_constant(rng.normal(size=(n_obs, n_regressors)))
+y = X @ rng.normal(size=n_regressors + 1) + rng.normal(size=n_banks)[bank] + rng.normal(size=n_obs)
+print(f"Panel: {n_obs:,} observations, {n_banks:,} banks, 96 periods, {n_regressors} regressors + constant")
+
+ols = sm.OLS(y, X).fit()
+bread = np.linalg.inv(X.T @ X)
+scores = X * ols.resid[:, None]
+df_resid = int(ols.df_resid)
+
+cases = [
+    ('HC1', {}, 'HC1', {}),
+    ('cluster', {'groups': bank}, 'cluster', {'groups': bank}),
+    ('twoway', {'groups': (bank, period)}, 'cluster', {'groups': np.column_stack([bank, period])}),
+    ('driscoll_kraay', {'time': period, 'maxlags': maxlags}, 'hac-groupsum', {'time': period, 'maxlags': maxlags}),
+]
+
+rows = []
+for name, kwargs, sm_type, sm_kwargs in cases:
+    seconds, (cov, _) = timed(lambda: sandwich_cov(bread, scores, name, df_resid=df_resid, **kwargs))
+    sm_seconds, sm_fit = timed(lambda: ols.get_robustcov_results(cov_type=sm_type, **sm_kwargs), repeat=1)
+    row = {
+        'estimator': name,
+        'module_ms': seconds * 1e3,
+        'statsmodels_ms': sm_seconds * 1e3,
+        'max_rel_diff_vs_statsmodels': np.max(np.abs(np.sqrt(np.diag(cov)) / sm_fit.bse - 1)),
+    }
+    if name == 'cluster':
+        loop_seconds, loop_cov = timed(lambda: naive_cluster(bread, scores, bank, df_resid), repeat=1)
+        row['python_loop_ms'] = loop_seconds * 1e3
+        row['max_rel_diff_vs_loop'] = np.max(np.abs(np.sqrt(np.diag(cov)) / np.sqrt(np.diag(loop_cov)) - 1))
+    rows.append(row)
+
+report = pd.DataFrame(rows).set_index('estimator')
+print("\n" + report.to_string(float_format=lambda v: f"{v:.3g}"))
+print("\n" + "="*80)
+print("module_ms: best of 3 runs of utils.covariance.sandwich_cov (scores precomputed)")
+print("="*80)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Report the approximation error of streaming (sketch-based) winsorization.
+
+Fits year × size bounds for DD_a/DD_m twice on the latest ESG+DD/PD dataset:
+exactly with Series.quantile and in chunks with KLL quantile sketches, then
+prints the absolute and rank error of the approximate bounds.
+"""
+
+import sys
+from pathlib import Path
+
+base_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(base_dir))
+from utils.datasheet import latest_run, read_datasheet
+from utils.winsorization import sketch_error_report
+
+output_dir = base_dir / 'data' / 'outputs' / 'datasheet'
+
+print("="*80)
+print("STREAMING WINSORIZATION: SKETCH VS EXACT QUANTILES")
+print("="*80)
+
+try:
+    esg_run = latest_run(output_dir, 'esg_dd_pd')
+except FileNotFoundError:
+    print("⚠️  No esg_dd_pd outputs found")
+    sys.exit(1)
+
+df = read_datasheet(esg_run['path'])
+print(f"Dataset: {esg_run['path'].name} ({len(df):,} rows)")
+
+for k in (200, 50):
+    report = sketch_error_report(df, ['DD_a', 'DD_m'], k=k, chunksize=100)
+    print(f"\n[k={k}] Sketches fed in chunks of 100 rows")
+    print("-"*80)
+    cols = ['variable', 'scope', 'n_obs', 'abs_err_low', 'abs_err_high', 'rank_err_low', 'rank_err_high']
+    summary = report[cols].groupby(['variable', 'scope']).agg(
+        groups=('n_obs', 'size'),
+        max_abs_err_low=('abs_err_low', 'max'),
+        max_abs_err_high=('abs_err_high', 'max'),
+        max_rank_err_low=('rank_err_low', 'max'),
+        max_rank_err_high=('rank_err_high', 'max'),
+    )
+    print(summary.to_string())
+
+print("\n" + "="*80)
+print("Groups smaller than k are stored exactly (zero error); rank error is the")
+print("share of the group's observations lying between exact and approximate bounds.")
+print("="*80)
@@ -4,10 +4,14 @@ Create lean total return mapping for esg_0718.csv instruments
 Maps 2013-2023 total returns to existing instrument tickers
 """
 
+import sys
 import pandas as pd
 from pathlib import Path
 
 base_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(base_dir))
+from utils.tickers import TickerResolver
+
 print("="*80)
 print("CREATE TOTAL RETURN MAPPING FOR ESG_0718 INSTRUMENTS")
 print("="*80)
@@ -43,33 +47,19 @@ annual['total_return'] = annual['total_return'] / 100
 print(f"    Monthly: {len(monthly):,} rows, {monthly['instrument'].nunique()} instruments")
 print(f"    Annual: {len(annual):,} rows, {annual['instrument'].nunique()} instruments")
 
-# 3. Load ticker mapping exceptions
-print("\n[3] Loading ticker mapping exceptions...")
-exceptions = pd.read_csv(base_dir / 'data/clean/ticker_mapping_exceptions.csv')
-exception_map = dict(zip(exceptions['return_instrument'], exceptions['list_bank_ticker']))
-print(f"    Loaded {len(exceptions)} manual mappings")
+# 3. Load ticker crosswalk (mapping exceptions, List_bank symbols, suffix rules)
+print("\n[3] Loading ticker crosswalk...")
+resolver = TickerResolver.from_clean_dir(base_dir / 'data/clean')
+print(f"    Loaded {len(resolver.crosswalk)} known identifiers")
 
 # 4. Standardize tickers in return data
-def standardize_ticker(inst):
-    """Map return instrument to esg_0718 ticker using exceptions and suffix stripping."""
-    if pd.isna(inst):
-        return None
-    
-    # Check manual exceptions first
-    if inst in exception_map:
-        return exception_map[inst]
-    
-    # Strip common suffixes
-    ticker = inst
-    for suffix in ['.N', '.O', '.OQ', '.K', '.PK', '.A', '.AS']:
-        if ticker.endswith(suffix):
-            return ticker[:-len(suffix)]
-    
-    return ticker
-
 print("\n[4] Mapping tickers...")
-monthly['ticker'] = monthly['instrument'].apply(standardize_ticker)
-annual['ticker'] = annual['instrument'].apply(standardize_ticker)
+monthly['ticker'] = resolver.resolve(monthly['instrument'])
+annual['ticker'] = resolver.resolve(annual['instrument'])
+unresolved = resolver.report(pd.concat([monthly['instrument'], annual['instrument']]))
+print(f"    Unresolved instruments: {len(unresolved)}")
+if len(unresolved):
+    print(unresolved.to_string(index=False))
 
 # 5. Filter to only instruments in esg_0718.csv
 print("\n[5] Filtering to esg_0718 instruments only...")
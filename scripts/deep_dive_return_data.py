@@ -3,11 +3,15 @@
 Deep dive into return data to answer all integration questions
 """
 
+import sys
 import pandas as pd
 import numpy as np
 from pathlib import Path
 from datetime import datetime
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from utils.tickers import TickerResolver
+
 base = Path('/Users/guillaumebld/Documents/Graduate_Research/Professor Abol Jalilvand/fall2025/risk_bank/risk_bank')
 monthly_file = base / 'data/clean/raw_monthly_total_return_2013_2023 (1).csv'
 annual_file = base / 'data/clean/raw_yearly_total_return_2013_2023 (1).csv'
@@ -55,8 +59,9 @@ if len(complex_tickers) > 0:
 print()
 
 # Clean tickers
-monthly['ticker_base'] = monthly['Instrument'].str.replace(r'(\.[A-Z]+|\^.*)$', '', regex=True)
-annual['ticker_base'] = annual['Instrument'].str.replace(r'(\.[A-Z]+|\^.*)$', '', regex=True)
+resolver = TickerResolver.from_clean_dir(base / 'data/clean')
+monthly['ticker_base'] = resolver.resolve(monthly['Instrument'])
+annual['ticker_base'] = resolver.resolve(annual['Instrument'])
 
 print(f'Unique BASE tickers (cleaned): {monthly["ticker_base"].nunique()}')
 print()
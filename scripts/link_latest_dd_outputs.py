@@ -2,42 +2,53 @@
 """
 Create fixed-name links to latest DD output files.
 This ensures validator can find the correct files after notebooks run with timestamps.
+
+The latest outputs are looked up in the run manifest. A fixed-name CSV is
+only rewritten when its recorded source run is no longer the latest, and
+the fixed-name file is itself recorded with that source run as upstream.
 """
 
-import glob
-import shutil
+import sys
 from pathlib import Path
 
 base_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(base_dir))
+from utils.datasheet import latest_run, read_datasheet
+from utils.manifest import MANIFEST_NAME, RunManifest
+
 output_dir = base_dir / 'data' / 'outputs' / 'datasheet'
+manifest = RunManifest(output_dir / MANIFEST_NAME)
 
 print("="*80)
 print("LINKING LATEST DD OUTPUTS TO FIXED NAMES")
 print("="*80)
 
-# Market DD: find latest market_*.csv and copy to dd_pd_market_results.csv
-market_pattern = str(output_dir / 'market_*.csv')
-market_files = sorted(glob.glob(market_pattern), key=lambda x: Path(x).stat().st_mtime, reverse=True)
-
-if market_files:
-    latest_market = Path(market_files[0])
-    target_market = output_dir / 'dd_pd_market_results.csv'
-    shutil.copy2(latest_market, target_market)
-    print(f"✅ Market DD: {latest_market.name} → dd_pd_market_results.csv")
-else:
-    print("⚠️  No market DD files found")
-
-# Accounting DD: find latest accounting_*.csv and copy to dd_pd_accounting_results.csv
-accounting_pattern = str(output_dir / 'accounting_*.csv')
-accounting_files = sorted(glob.glob(accounting_pattern), key=lambda x: Path(x).stat().st_mtime, reverse=True)
-
-if accounting_files:
-    latest_accounting = Path(accounting_files[0])
-    target_accounting = output_dir / 'dd_pd_accounting_results.csv'
-    shutil.copy2(latest_accounting, target_accounting)
-    print(f"✅ Accounting DD: {latest_accounting.name} → dd_pd_accounting_results.csv")
-else:
-    print("⚠️  No accounting DD files found")
+
+def link_latest(dataset_type, target_name, label):
+    try:
+        source = latest_run(output_dir, dataset_type)
+    except FileNotFoundError:
+        print(f"⚠️  No {label} DD files found")
+        return
+    link_type = Path(target_name).stem
+    target = output_dir / target_name
+    linked = manifest.get(link_type)
+    if (linked is not None and linked['upstream'].get(dataset_type) == source['run_id']
+            and manifest.verify(link_type)):
+        print(f"✅ {label} DD: {target_name} already points to run {source['run_id']}")
+        return
+    df = read_datasheet(source['path'])
+    df.to_csv(target, index=False)
+    manifest.record(link_type, source['run_id'], target, rows=len(df), stage='link',
+                    upstream={dataset_type: source['run_id']})
+    print(f"✅ {label} DD: {source['path'].name} → {target_name}")
+
+
+# Market DD: latest market run → dd_pd_market_results.csv
+link_latest('market', 'dd_pd_market_results.csv', 'Market')
+
+# Accounting DD: latest accounting run → dd_pd_accounting_results.csv
+link_latest('accounting', 'dd_pd_accounting_results.csv', 'Accounting')
 
 print("="*80)
 print("COMPLETE - Fixed-name files ready for validation")
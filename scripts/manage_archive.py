@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Inspect, restore from and prune the dataset archive (archive/datasets).
+
+Usage:
+  python scripts/manage_archive.py list [--type market]
+  python scripts/manage_archive.py restore market 20251011_042629 [--dest data/outputs/datasheet]
+  python scripts/manage_archive.py prune --keep-last 20 [--keep-days 90] [--type market]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+base_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(base_dir))
+from utils.archive import ArchiveStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--archive-dir', default=str(base_dir / 'archive' / 'datasets'))
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    list_cmd = sub.add_parser('list', help='Show archived runs')
+    list_cmd.add_argument('--type', dest='dataset_type')
+
+    restore_cmd = sub.add_parser('restore', help='Rebuild an archived run')
+    restore_cmd.add_argument('dataset_type')
+    restore_cmd.add_argument('run_id')
+    restore_cmd.add_argument('--dest', default=str(base_dir / 'data' / 'outputs' / 'datasheet'))
+    restore_cmd.add_argument('--name', help='File name when several formats were archived')
+
+    prune_cmd = sub.add_parser('prune', help='Apply a retention policy')
+    prune_cmd.add_argument('--keep-last', type=int, help='Runs to keep per dataset type')
+    prune_cmd.add_argument('--keep-days', type=float, help='Keep runs archived within this many days')
+    prune_cmd.add_argument('--type', dest='dataset_type')
+    args = parser.parse_args()
+
+    store = ArchiveStore(args.archive_dir)
+
+    if args.command == 'list':
+        entries = store.entries(args.dataset_type)
+        if entries.empty:
+            print("Archive is empty")
+            return 0
+        print(entries[['dataset_type', 'run_id', 'name', 'size', 'archived']].to_string(index=False))
+        usage = store.disk_usage()
+        print(f"\n{len(entries)} files, {usage['logical_bytes']:,} bytes archived, "
+              f"{usage['stored_bytes']:,} bytes on disk")
+    elif args.command == 'restore':
+        try:
+            path = store.restore(args.dataset_type, args.run_id, args.dest, name=args.name)
+        except KeyError as exc:
+            print(f"❌ {exc.args[0]}")
+            return 1
+        print(f"✅ Restored {path}")
+    else:
+        result = store.prune(keep_last=args.keep_last, keep_days=args.keep_days, dataset_type=args.dataset_type)
+        print(f"Removed {result['removed_entries']} archived files and {result['removed_blobs']} blobs "
+              f"({result['freed_bytes']:,} bytes freed)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Re-render report figures from saved figure data, without the panel or a kernel.
+
+analysis.ipynb and solver_diagnostics.ipynb save the aggregates behind their
+report figures (histogram bins, per-year box statistics, hexbin counts,
+category counts) as JSON in data/outputs/analysis/. This script draws them
+again with the Agg backend, one figure per worker process, e.g. to change
+the format or resolution.
+
+Usage:
+  python scripts/render_figures.py                          # latest analysis and solver figure data
+  python scripts/render_figures.py path/to/figures.json     # a specific file
+  python scripts/render_figures.py --format pdf --dpi 200 --jobs 4
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+base_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(base_dir))
+from utils.figures import load_figure_data, render_figures
+
+ANALYSIS_DIR = base_dir / 'data' / 'outputs' / 'analysis'
+FIGURE_DATA = ['analysis_figures', 'solver_figures']
+
+
+def latest_figure_data():
+    """Newest figure data file of each report."""
+    files = []
+    for stem in FIGURE_DATA:
+        candidates = sorted(ANALYSIS_DIR.glob(f'{stem}_*.json'))
+        if candidates:
+            files.append(candidates[-1])
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Render report figures from saved figure data')
+    parser.add_argument('files', nargs='*', type=Path, help='figure data JSON (default: latest of each report)')
+    parser.add_argument('--output-dir', type=Path, default=ANALYSIS_DIR / 'figures')
+    parser.add_argument('--format', default='png', help='png, pdf or svg')
+    parser.add_argument('--dpi', type=int, default=100)
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes (default: one per CPU)')
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("RENDER REPORT FIGURES")
+    print("=" * 80)
+
+    files = args.files or latest_figure_data()
+    if not files:
+        print(f"[WARN] No figure data found in {ANALYSIS_DIR}; run analysis.ipynb or solver_diagnostics.ipynb first")
+        return 1
+
+    specs = []
+    for path in files:
+        loaded = load_figure_data(path)
+        print(f"  {path.name}: {len(loaded)} figures")
+        specs += loaded
+
+    started = time.perf_counter()
+    paths = render_figures(specs, args.output_dir, fmt=args.format, dpi=args.dpi, n_jobs=args.jobs)
+    print(f"\n[SAVED] {len(paths)} figures to {args.output_dir} in {time.perf_counter() - started:.1f}s")
+    for path in paths:
+        print(f"  {path.name}")
+    print("=" * 80)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
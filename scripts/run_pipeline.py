@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Run the DD/PD production flow headlessly as a stage DAG.
+
+Stages (dependencies derived from inputs/outputs):
+  volatility -> accounting, market -> merging, link -> analysis
+
+Stages whose code and input files are unchanged since their last successful
+run are skipped; accounting and market run concurrently. Notebooks are
+executed with nbconvert into data/logs/pipeline/ (source notebooks are not
+modified).
+
+Usage:
+  python scripts/run_pipeline.py                 # run everything that is stale
+  python scripts/run_pipeline.py --dry-run       # show what would run
+  python scripts/run_pipeline.py market --force  # rerun market and downstream
+  python scripts/run_pipeline.py --list          # show stages and dependencies
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+base_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(base_dir))
+from utils.pipeline import Pipeline, Stage
+
+CLEAN = 'data/clean'
+DATASHEET = 'data/outputs/datasheet'
+ANALYSIS = 'data/outputs/analysis'
+
+STAGES = [
+    Stage(
+        name='volatility',
+        code='scripts/02_calculate_equity_volatility.py',
+        inputs=[
+            f'{CLEAN}/raw_monthly_total_return_2013_2023 (1).csv',
+            f'{CLEAN}/List_bank.xlsx',
+            f'{CLEAN}/ticker_mapping_exceptions.csv',
+            f'{CLEAN}/total_return_diagnostic.csv',
+            f'{CLEAN}/esg_0718.csv',
+        ],
+        outputs=[f'{CLEAN}/equity_volatility_by_year.csv'],
+    ),
+    Stage(
+        name='accounting',
+        code='dd_pd_accounting.ipynb',
+        inputs=[f'{CLEAN}/Book2_clean.csv', f'{CLEAN}/equity_volatility_by_year.csv'],
+        outputs=[f'{DATASHEET}/accounting_[0-9]*.parquet', f'{ANALYSIS}/accounting_*_summary.csv'],
+    ),
+    Stage(
+        name='market',
+        code='dd_pd_market.ipynb',
+        inputs=[
+            f'{CLEAN}/esg_0718_clean.csv',
+            f'{CLEAN}/all_banks_marketcap_annual_2016_2023.csv',
+            f'{CLEAN}/equity_volatility_by_year.csv',
+            f'{CLEAN}/fama_french_factors_annual_clean.csv',
+            f'{CLEAN}/List_bank.xlsx',
+            f'{CLEAN}/ticker_mapping_exceptions.csv',
+        ],
+        outputs=[f'{DATASHEET}/market_[0-9]*.parquet', f'{ANALYSIS}/market_*_summary.csv'],
+    ),
+    Stage(
+        name='merging',
+        code='merging.ipynb',
+        inputs=[f'{DATASHEET}/accounting_[0-9]*.parquet', f'{DATASHEET}/market_[0-9]*.parquet', f'{DATASHEET}/esg_0718.csv'],
+        outputs=[f'{DATASHEET}/merged_[0-9]*.parquet', f'{DATASHEET}/esg_dd_pd_[0-9]*.parquet'],
+    ),
+    Stage(
+        name='link',
+        code='scripts/link_latest_dd_outputs.py',
+        inputs=[f'{DATASHEET}/accounting_[0-9]*.parquet', f'{DATASHEET}/market_[0-9]*.parquet'],
+        outputs=[f'{DATASHEET}/dd_pd_accounting_results.csv', f'{DATASHEET}/dd_pd_market_results.csv'],
+    ),
+    Stage(
+        name='analysis',
+        code='analysis.ipynb',
+        inputs=[f'{DATASHEET}/merged_[0-9]*.parquet', f'{CLEAN}/outlier_rules.json'],
+        outputs=[
+            f'{ANALYSIS}/regression_summary_*.csv',
+            f'{ANALYSIS}/sample_sizes_*.csv',
+            f'{ANALYSIS}/regression_bootstrap_*.csv',
+            f'{ANALYSIS}/regression_splits_*.csv',
+            f'{ANALYSIS}/analysis_figures_*.json',
+        ],
+    ),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('stages', nargs='*', help='Stages to run (downstream stages are included)')
+    parser.add_argument('--force', action='store_true', help='Run selected stages even if unchanged')
+    parser.add_argument('--dry-run', action='store_true', help='Only show what would run')
+    parser.add_argument('--jobs', type=int, default=2, help='Maximum concurrent stages (default: 2)')
+    parser.add_argument('--list', action='store_true', help='List stages and dependencies')
+    args = parser.parse_args()
+
+    pipeline = Pipeline(
+        STAGES,
+        base_dir=base_dir,
+        state_path=base_dir / 'data' / 'logs' / 'pipeline_state.json',
+        log_dir=base_dir / 'data' / 'logs' / 'pipeline',
+    )
+
+    if args.list:
+        for name in pipeline.order:
+            deps = ', '.join(pipeline.deps[name]) or '-'
+            current = 'current' if pipeline.is_current(pipeline.stages[name]) else 'stale'
+            print(f"{name:<12} after: {deps:<24} [{current}]")
+        return 0
+
+    print("="*80)
+    print("DD/PD PIPELINE")
+    print("="*80)
+    status = pipeline.run(args.stages or None, force=args.force, dry_run=args.dry_run, jobs=args.jobs)
+    print("="*80)
+    for name, result in status.items():
+        print(f"{name:<12} {result}")
+    print("="*80)
+    return 1 if any(result in ('failed', 'blocked') for result in status.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Report memory use of the core tables with default dtypes versus the schema
+registry in utils/schema.py (categorical keys, int16 years, float32 option).
+
+Usage:
+  python scripts/schema_memory_report.py
+"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+base_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(base_dir))
+from utils.datasheet import latest_datasheet
+from utils.schema import memory_report
+
+clean_dir = base_dir / 'data' / 'clean'
+datasheet_dir = base_dir / 'data' / 'outputs' / 'datasheet'
+
+tables = {
+    'book2_clean': clean_dir / 'Book2_clean.csv',
+    'esg_0718_clean': clean_dir / 'esg_0718_clean.csv',
+    'equity_volatility_by_year': clean_dir / 'equity_volatility_by_year.csv',
+    'marketcap_annual': clean_dir / 'all_banks_marketcap_annual_2016_2023.csv',
+    'monthly_returns': clean_dir / 'raw_monthly_total_return_2013_2023 (1).csv',
+}
+try:
+    merged = latest_datasheet(datasheet_dir, 'merged')
+    if merged.suffix == '.csv':
+        tables['merged'] = merged
+except FileNotFoundError:
+    pass
+
+print("="*80)
+print("SCHEMA MEMORY REPORT")
+print("="*80)
+
+missing = [name for name, path in tables.items() if not path.exists()]
+for name in missing:
+    print(f"⚠️  Skipping {name}: {tables.pop(name)} not found")
+
+report = memory_report(tables)
+display = report.copy()
+for col in ['bytes_default', 'bytes_schema', 'bytes_schema_float32']:
+    display[col] = (display[col] / 1024).round(1)
+display = display.rename(columns={'bytes_default': 'KiB_default', 'bytes_schema': 'KiB_schema',
+                                  'bytes_schema_float32': 'KiB_float32'})
+with pd.option_context('display.width', 160, 'display.max_columns', 20, 'display.float_format', '{:.4g}'.format):
+    print(display.to_string(index=False))
+
+total_default = report['bytes_default'].sum()
+print(f"\nTotal: {total_default / 1024:.0f} KiB default → {report['bytes_schema'].sum() / 1024:.0f} KiB schema "
+      f"→ {report['bytes_schema_float32'].sum() / 1024:.0f} KiB with float32 measures")
+print("="*80)
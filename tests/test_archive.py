@@ -0,0 +1,98 @@
+"""
+Tests for the content-addressed archive store.
+
+Ensures that:
+1. Archived runs restore byte-for-byte by run id
+2. Identical content is stored once, however often it is archived
+3. Retention over the catalog removes runs and frees their blobs
+"""
+
+import os
+import pytest
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import utils
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from utils.archive import ArchiveStore, archive_outputs
+
+
+def write_output(directory: Path, name: str, data: bytes) -> Path:
+    path = directory / name
+    path.write_bytes(data)
+    return path
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    out, arc = tmp_path / 'out', tmp_path / 'archive'
+    out.mkdir()
+    return out, arc
+
+
+class TestArchiveStore:
+    """Deduplication, restore and retention."""
+
+    def test_restore_round_trip(self, dirs, tmp_path):
+        """A multi-chunk file is rebuilt exactly under its original name."""
+        out, arc = dirs
+        data = os.urandom(1000) + b'x' * 5000
+        store = ArchiveStore(arc, chunk_size=512)
+        entry = store.add(write_output(out, 'market_20250101_000000.parquet', data), 'market')
+        assert entry['run_id'] == '20250101_000000'
+        assert len(entry['chunks']) == 12
+
+        restored = store.restore('market', '20250101_000000', tmp_path / 'restored')
+        assert restored.name == 'market_20250101_000000.parquet'
+        assert restored.read_bytes() == data
+        with pytest.raises(KeyError):
+            store.restore('market', '20240101_000000', tmp_path / 'restored')
+
+    def test_identical_reruns_stored_once(self, dirs):
+        """Re-archiving unchanged content writes no new blobs."""
+        out, arc = dirs
+        data = os.urandom(4096)
+        store = ArchiveStore(arc, chunk_size=1024)
+        first = store.add(write_output(out, 'merged_20250101_000000.csv', data), 'merged')
+        again = store.add(out / 'merged_20250101_000000.csv', 'merged')
+        rerun = store.add(write_output(out, 'merged_20250102_000000.csv', data), 'merged')
+
+        assert first['new_bytes'] > 0
+        assert again['new_bytes'] == 0 and again['archive_id'] == first['archive_id']
+        assert rerun['new_bytes'] == 0
+        usage = store.disk_usage()
+        assert usage['logical_bytes'] == 2 * len(data)
+        assert usage['stored_bytes'] < 1.1 * len(data)
+
+    def test_prune_keep_last(self, dirs):
+        """Only the newest runs survive; shared blobs are kept, orphaned ones freed."""
+        out, arc = dirs
+        store = ArchiveStore(arc, chunk_size=1024)
+        shared = os.urandom(1024)
+        for day in range(1, 5):
+            store.add(write_output(out, f'market_2025010{day}_000000.csv', shared + os.urandom(1024)), 'market')
+        store.add(write_output(out, 'accounting_20250101_000000.csv', os.urandom(100)), 'accounting')
+
+        result = store.prune(keep_last=2, dataset_type='market')
+        assert result['removed_entries'] == 2
+        assert result['removed_blobs'] == 2
+        assert store.entries('market')['run_id'].tolist() == ['20250103_000000', '20250104_000000']
+        assert len(store.entries('accounting')) == 1
+        assert store.restore('market', '20250104_000000', out / 'restored').stat().st_size == 2048
+
+
+class TestArchiveOutputs:
+    """Notebook helper replacing archive_old_files."""
+
+    def test_moves_only_matching_outputs(self, dirs):
+        """Timestamped outputs of the type are archived; others stay."""
+        out, arc = dirs
+        write_output(out, 'market_20250101_000000.parquet', b'a')
+        write_output(out, 'market_20250101_000000.csv', b'a')
+        write_output(out, 'market.csv', b'fixed')
+        write_output(out, 'market_20250101_000000_summary.csv', b's')
+
+        archived = archive_outputs(out, arc, 'market')
+        assert sorted(e['name'] for e in archived) == ['market_20250101_000000.csv', 'market_20250101_000000.parquet']
+        assert sorted(p.name for p in out.iterdir()) == ['market.csv', 'market_20250101_000000_summary.csv']
+        assert ArchiveStore(arc).get('market', '20250101_000000')['name'].endswith('.parquet')
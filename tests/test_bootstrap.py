@@ -0,0 +1,132 @@
+"""
+Tests for the wild-cluster bootstrap.
+
+Ensures that:
+1. Batched p-values equal a refit-per-draw bootstrap with the same weights
+2. Results depend only on the seed and model name, not on workers or other models
+3. Observed t-statistics are the clustered t-statistics of the OLS grid
+4. Rank-deficient designs the grid can fit are bootstrapped with aliased terms reported as NaN
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from utils.bootstrap import _block_seeds, bootstrap_weights, wild_cluster_bootstrap
+from utils.covariance import group_codes
+from utils.regression import OLSGrid
+
+
+@pytest.fixture
+def grid():
+    """Clustered grid with one informative and one irrelevant regressor."""
+    rng = np.random.default_rng(3)
+    n = 300
+    df = pd.DataFrame({'bank': rng.integers(0, 25, n), 'x1': rng.normal(size=n), 'x2': rng.normal(size=n)})
+    df['y'] = 1 + 0.15 * df['x1'] + rng.normal(size=n) + rng.normal(size=25)[df['bank']]
+    grid = OLSGrid(df, cov_type='cluster', groups='bank')
+    grid.add('y', ['x1', 'x2'], 'both')
+    grid.add('y', ['x1'], 'x1 only')
+    return grid
+
+
+def _refit_bootstrap(names, X, y, clusters, term, n_draws, block_size, model, kind='rademacher'):
+    """Reference: impose H0, flip residuals per cluster, refit every draw."""
+    codes = group_codes(clusters)
+    g = codes.max() + 1
+    n, k = X.shape
+    j = names.index(term)
+    bread = np.linalg.inv(X.T @ X)
+
+    def t_stat(values):
+        beta = bread @ X.T @ values
+        scores = np.zeros((g, k))
+        np.add.at(scores, codes, X * (values - X @ beta)[:, None])
+        cov = g / (g - 1) * (n - 1) / (n - k) * bread @ scores.T @ scores @ bread
+        return beta[j] / np.sqrt(cov[j, j])
+
+    others = [c for c in range(k) if c != j]
+    fitted = X[:, others] @ np.linalg.lstsq(X[:, others], y, rcond=None)[0]
+    observed = t_stat(y)
+    exceed = 0
+    for size, seed in _block_seeds(0, model, n_draws, block_size):
+        weights = bootstrap_weights(kind, g, size, np.random.default_rng(seed))
+        for b in range(size):
+            exceed += abs(t_stat(fitted + (y - fitted) * weights[codes, b])) >= abs(observed)
+    return observed, exceed / n_draws
+
+
+class TestWildClusterBootstrap:
+    """Batched restricted wild-cluster bootstrap."""
+
+    @pytest.mark.parametrize('kind', ['rademacher', 'webb'])
+    def test_matches_refit_bootstrap(self, grid, kind):
+        """Same draws give the same t-statistics and p-values as refitting."""
+        design = grid.design('both')
+        result = wild_cluster_bootstrap({'both': design}, n_draws=199, weights=kind,
+                                        block_size=50, n_jobs=1).set_index('term')
+        for term in ['x1', 'x2']:
+            t_stat, p_value = _refit_bootstrap(*design, term, 199, 50, 'both', kind)
+            assert result.loc[term, 't_stat'] == pytest.approx(t_stat, rel=1e-10)
+            assert result.loc[term, 'p_boot'] == pytest.approx(p_value)
+
+    def test_t_stat_is_grid_clustered_t(self, grid):
+        """The observed statistic is the grid's CR1 clustered t."""
+        fitted = grid.fit()['both']
+        result = wild_cluster_bootstrap({'both': grid.design('both')}, n_draws=99, n_jobs=1)
+        np.testing.assert_allclose(result['t_stat'], fitted.tvalues[['x1', 'x2']], rtol=1e-10)
+        np.testing.assert_allclose(result['coef'], fitted.params[['x1', 'x2']], rtol=1e-10)
+
+    def test_reproducible_across_workers_and_models(self, grid):
+        """Pool size and the other models in the call do not change a model's p-values."""
+        designs = {m: grid.design(m) for m in ['both', 'x1 only']}
+        serial = wild_cluster_bootstrap(designs, n_draws=300, block_size=100, n_jobs=1)
+        pooled = wild_cluster_bootstrap(designs, n_draws=300, block_size=100, n_jobs=2)
+        alone = wild_cluster_bootstrap({'x1 only': designs['x1 only']}, n_draws=300, block_size=100, n_jobs=1)
+        pd.testing.assert_frame_equal(serial, pooled)
+        assert alone['p_boot'].iloc[0] == serial.loc[serial['model'] == 'x1 only', 'p_boot'].iloc[0]
+
+    def test_terms_filter(self, grid):
+        """Only the requested terms are tested; the constant never is."""
+        result = wild_cluster_bootstrap({'both': grid.design('both')}, terms=['const', 'x2'],
+                                        n_draws=99, n_jobs=1)
+        assert result['term'].tolist() == ['x2']
+
+    def test_aliased_terms(self, grid):
+        """A constant dummy and a collinear regressor are dropped, the rest is unchanged."""
+        grid.data['size_dummy'] = 1
+        grid.data['x12'] = grid.data['x1'] + grid.data['x2']
+        grid.add('y', ['x1', 'x2', 'size_dummy', 'x12'], 'aliased')
+        grid.add('y', ['size_dummy'], 'dummy only')
+        assert grid.fit()['aliased'] is not None
+
+        names, X, y, clusters = grid.design('aliased')
+        result = wild_cluster_bootstrap({'aliased': (names, X, y, clusters), 'dummy only': grid.design('dummy only')},
+                                        n_draws=199, n_jobs=1)
+        reduced = wild_cluster_bootstrap({'aliased': (names[:3], X[:, :3], y, clusters)}, n_draws=199, n_jobs=1)
+
+        assert result['term'].tolist() == ['x1', 'x2', 'size_dummy', 'x12', 'size_dummy']
+        pd.testing.assert_frame_equal(result.iloc[:2], reduced)
+        assert result.iloc[2:][['coef', 't_stat', 'p_boot']].isna().all().all()
+
+    def test_unknown_weights(self, grid):
+        """Weight types are validated before any work starts."""
+        with pytest.raises(ValueError, match="Unknown weights"):
+            wild_cluster_bootstrap({'both': grid.design('both')}, weights='mammen')
+
+
+class TestBootstrapWeights:
+    """Weight distributions."""
+
+    def test_support(self):
+        """Rademacher is ±1; Webb has six symmetric points with unit variance."""
+        rng = np.random.default_rng(0)
+        rademacher = bootstrap_weights('rademacher', 10, 5000, rng)
+        webb = bootstrap_weights('webb', 10, 5000, rng)
+        assert set(np.unique(rademacher)) == {-1.0, 1.0}
+        assert len(np.unique(webb)) == 6
+        assert np.var(np.unique(webb)) == pytest.approx(1.0)
+        assert abs(webb.mean()) < 0.02
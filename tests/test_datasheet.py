@@ -0,0 +1,126 @@
+"""
+Tests for Parquet datasheet storage.
+
+Ensures that:
+1. Stage outputs round-trip through Parquet with their dtypes
+2. Readers load only the requested columns (missing names are skipped)
+3. The latest run is found through the run manifest, or by timestamp
+   (preferring Parquet over CSV) for outputs written before it
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import utils
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from utils.datasheet import (
+    datasheet_columns, latest_datasheet, latest_run, read_datasheet, run_datasheet, write_datasheet
+)
+
+pytest.importorskip('pyarrow')
+
+
+@pytest.fixture
+def merged():
+    return pd.DataFrame({
+        'instrument': ['AAA', 'BBB', 'CCC'],
+        'year': [2018, 2019, 2020],
+        'DD_a': [1.5, np.nan, 3.25],
+        'a_td/ta': [0.9, 0.8, 0.7],
+        'm_status': ['ok', None, 7],
+    })
+
+
+class TestWriteRead:
+    """Parquet round trip and column projection."""
+
+    def test_round_trip(self, tmp_path, merged):
+        """Values and numeric dtypes survive; mixed object columns become strings."""
+        path = write_datasheet(merged, tmp_path, 'merged', '20250101_120000')
+        assert path.name == 'merged_20250101_120000.parquet'
+        assert not (tmp_path / 'merged_20250101_120000.csv').exists()
+
+        back = read_datasheet(path)
+        pd.testing.assert_frame_equal(back.drop(columns='m_status'), merged.drop(columns='m_status'))
+        assert back['m_status'].tolist()[0] == 'ok'
+        assert pd.isna(back['m_status'].iloc[1])
+        assert back['m_status'].iloc[2] == '7'
+
+    def test_object_columns_keep_their_type(self, tmp_path):
+        """Numbers and timestamps held in object columns are stored as numbers and timestamps."""
+        from decimal import Decimal
+
+        df = pd.DataFrame({
+            'count': pd.Series([1, None, 3], dtype=object),
+            'ratio': pd.Series([0.5, 2, None], dtype=object),
+            'amount': pd.Series([Decimal('1.25'), Decimal('2.5'), None], dtype=object),
+            'date': pd.Series([pd.Timestamp('2020-01-31').to_pydatetime(), None, pd.Timestamp('2021-06-30')],
+                              dtype=object),
+        })
+        back = read_datasheet(write_datasheet(df, tmp_path, 'merged', '20250101_120000'))
+
+        assert back['count'].tolist()[::2] == [1.0, 3.0] and pd.isna(back['count'].iloc[1])
+        assert pd.api.types.is_float_dtype(back['ratio']) and back['ratio'].iloc[1] == 2.0
+        assert back['amount'].tolist()[:2] == [1.25, 2.5]
+        assert pd.api.types.is_datetime64_any_dtype(back['date'])
+        assert back['date'].iloc[2] == pd.Timestamp('2021-06-30')
+
+    def test_csv_side_product(self, tmp_path, merged):
+        """export_csv writes a CSV copy next to the Parquet file."""
+        write_datasheet(merged, tmp_path, 'esg_dd_pd', '20250101_120000', export_csv=True)
+        csv = pd.read_csv(tmp_path / 'esg_dd_pd_20250101_120000.csv')
+        assert csv['DD_a'].equals(merged['DD_a'])
+
+    def test_projection(self, tmp_path, merged):
+        """Only requested columns are loaded, in request order; unknown names are skipped."""
+        path = write_datasheet(merged, tmp_path, 'merged', '20250101_120000')
+        assert datasheet_columns(path) == list(merged.columns)
+
+        back = read_datasheet(path, columns=['DD_a', 'year', 'not_a_column'])
+        assert list(back.columns) == ['DD_a', 'year']
+
+        merged.to_csv(tmp_path / 'merged_20240101_120000.csv', index=False)
+        back_csv = read_datasheet(tmp_path / 'merged_20240101_120000.csv', columns=['year', 'missing'])
+        assert list(back_csv.columns) == ['year']
+
+
+class TestLatestDatasheet:
+    """Discovery of the latest stage output."""
+
+    def test_latest_by_timestamp_and_format(self, tmp_path, merged):
+        """Without a manifest, newest timestamp wins and Parquet beats CSV within a run."""
+        merged.to_csv(tmp_path / 'market_20250102_000000.csv', index=False)
+        merged.drop(columns='m_status').to_parquet(tmp_path / 'market_20250101_000000.parquet')
+        assert latest_datasheet(tmp_path, 'market').name == 'market_20250102_000000.csv'
+
+        merged.drop(columns='m_status').to_parquet(tmp_path / 'market_20250102_000000.parquet')
+        assert latest_datasheet(tmp_path, 'market').name == 'market_20250102_000000.parquet'
+
+    def test_manifest_resolution(self, tmp_path, merged):
+        """Recorded runs resolve through the manifest, latest and by run id."""
+        write_datasheet(merged, tmp_path, 'accounting', '20250101_000000')
+        write_datasheet(merged, tmp_path, 'accounting', '20250102_000000')
+        path = write_datasheet(merged.iloc[:2], tmp_path, 'merged', '20250103_000000', stage='merging',
+                               upstream={'accounting': '20250102_000000'})
+        # A stray file with a newer name is not picked up over the manifest
+        merged.to_csv(tmp_path / 'merged_20990101_000000.csv', index=False)
+
+        run = latest_run(tmp_path, 'merged')
+        assert run['path'] == path
+        assert run['rows'] == 2
+        assert run['stage'] == 'merging'
+        assert run['upstream'] == {'accounting': '20250102_000000'}
+        assert run_datasheet(tmp_path, 'accounting', '20250101_000000').name == 'accounting_20250101_000000.parquet'
+        with pytest.raises(FileNotFoundError):
+            run_datasheet(tmp_path, 'accounting', '20240101_000000')
+
+    def test_other_types_ignored(self, tmp_path, merged):
+        """Similarly named files do not match, and a missing type raises."""
+        write_datasheet(merged, tmp_path, 'market', '20250101_000000')
+        (tmp_path / 'market_20250101_000000_summary.csv').write_text('x\n1\n')
+        assert latest_datasheet(tmp_path, 'market').suffix == '.parquet'
+        with pytest.raises(FileNotFoundError):
+            latest_datasheet(tmp_path, 'merged')
@@ -0,0 +1,87 @@
+"""
+Tests for the Excel workbook cache.
+
+Ensures that:
+1. The first read parses the workbook and later reads come from the cache
+2. Column names are normalized once, before caching
+3. A changed workbook is re-parsed; a touched but unchanged one is not
+"""
+
+import os
+
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import utils.excel_cache as excel_cache
+from utils.excel_cache import normalize_columns, read_workbook
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    """Small List_bank-like workbook."""
+    path = tmp_path / 'clean' / 'List_bank.xlsx'
+    path.parent.mkdir()
+    pd.DataFrame({
+        ' Ticker': ['ABCB', 'ACNB'],
+        'Company': ['Ameris Bancorp', 'ACNB Corporation'],
+        'new ticker': [None, 'ACNBX'],
+        'PermId': [4295905573.0, 4295912100.0],
+    }).to_excel(path, index=False)
+    return path
+
+
+@pytest.fixture
+def excel_reads(monkeypatch):
+    """Count calls into pd.read_excel made by the cache."""
+    calls = []
+    original = excel_cache.pd.read_excel
+
+    def counting(*args, **kwargs):
+        calls.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(excel_cache.pd, 'read_excel', counting)
+    return calls
+
+
+class TestReadWorkbook:
+    """Cached workbook loads."""
+
+    def test_normalize_columns(self):
+        """Names are stripped, lower-cased and underscored."""
+        assert list(normalize_columns(pd.Index([' Ticker', 'new ticker', 'MM/YY']))) == \
+            ['ticker', 'new_ticker', 'mm/yy']
+
+    def test_second_read_served_from_cache(self, workbook, excel_reads):
+        """Only the first read parses Excel; both reads agree."""
+        first = read_workbook(workbook)
+        second = read_workbook(workbook)
+        assert len(excel_reads) == 1
+        assert list(first.columns) == ['ticker', 'company', 'new_ticker', 'permid']
+        pd.testing.assert_frame_equal(first, second)
+        assert (workbook.parent.parent / 'cache').is_dir()
+
+    def test_touched_workbook_is_not_reparsed(self, workbook, excel_reads):
+        """A new mtime with identical contents only refreshes the cache key."""
+        read_workbook(workbook)
+        stat = workbook.stat()
+        os.utime(workbook, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        read_workbook(workbook)
+        assert len(excel_reads) == 1
+
+    def test_changed_workbook_is_reparsed(self, workbook, excel_reads):
+        """New contents invalidate the cache."""
+        read_workbook(workbook)
+        pd.DataFrame({'Ticker': ['JPM'], 'Company': ['JPMorgan']}).to_excel(workbook, index=False)
+        refreshed = read_workbook(workbook)
+        assert len(excel_reads) == 2
+        assert refreshed['ticker'].tolist() == ['JPM']
+
+    def test_raw_column_names_cached_separately(self, workbook, tmp_path):
+        """normalize=False keeps the workbook's own column names."""
+        raw = read_workbook(workbook, normalize=False, cache_dir=tmp_path / 'other')
+        assert ' Ticker' in raw.columns
+        assert read_workbook(workbook, cache_dir=tmp_path / 'other')['ticker'].tolist() == ['ABCB', 'ACNB']
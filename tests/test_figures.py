@@ -0,0 +1,125 @@
+"""
+Tests for headless report figures.
+
+Ensures that:
+1. Pre-aggregated histogram, box, hexbin and bar panels match numpy/matplotlib statistics
+2. Figures are written to image files, in-process and from worker processes
+3. Figure data round-trips through JSON and empty panels still render
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from utils.figures import (
+    bar_counts, figure, five_number_summary, hexbin_counts, histogram,
+    load_figure_data, render_figures, save_figure_data,
+)
+
+
+@pytest.fixture
+def panel():
+    """Heavy-tailed DD-like values by year with gaps."""
+    rng = np.random.default_rng(12)
+    n = 3000
+    df = pd.DataFrame({'year': rng.integers(2016, 2024, n), 'DD_m': rng.standard_t(3, n)})
+    df['DD_a'] = 0.6 * df['DD_m'] + rng.normal(size=n)
+    df.loc[::50, 'DD_a'] = np.nan
+    df.loc[::70, 'DD_m'] = np.inf
+    return df
+
+
+class TestAggregates:
+    """Panel statistics."""
+
+    def test_histogram(self, panel):
+        """Bin counts and median are those of the finite values."""
+        values = panel['DD_a'].dropna().to_numpy()
+        hist = histogram(panel['DD_a'], bins=20, title='DD_a')
+        counts, edges = np.histogram(values, bins=20)
+        assert hist['counts'] == counts.tolist()
+        np.testing.assert_allclose(hist['edges'], edges)
+        assert hist['median'] == pytest.approx(np.median(values))
+        assert hist['vlines'][0][0] == hist['median']
+
+    def test_five_number_summary_matches_matplotlib(self, panel):
+        """Quartiles, whiskers and outlier counts per year equal boxplot_stats."""
+        from matplotlib.cbook import boxplot_stats
+
+        box = five_number_summary(panel['DD_a'], panel['year'])
+        assert [b['label'] for b in box['boxes']] == [str(y) for y in range(2016, 2024)]
+        for b in box['boxes']:
+            values = panel.loc[panel['year'] == int(b['label']), 'DD_a'].dropna()
+            expected = boxplot_stats(values.to_numpy())[0]
+            for key in ['q1', 'med', 'q3', 'whislo', 'whishi']:
+                assert b[key] == pytest.approx(expected[key], abs=1e-12)
+            assert (b['n'], b['n_fliers']) == (len(values), len(expected['fliers']))
+
+    def test_hexbin_matches_matplotlib(self, panel):
+        """Occupied hexagons and their counts equal Axes.hexbin on the raw points."""
+        from matplotlib.figure import Figure
+
+        data = panel[np.isfinite(panel['DD_m']) & panel['DD_a'].notna()]
+        hexes = hexbin_counts(panel['DD_m'], panel['DD_a'], gridsize=25)
+        ax = Figure().subplots()
+        cells = ax.hexbin(data['DD_m'], data['DD_a'], gridsize=(25, int(round(25 / np.sqrt(3)))), mincnt=1)
+        assert sorted(hexes['counts']) == sorted(cells.get_array().astype(int).tolist())
+        assert hexes['n'] == sum(hexes['counts']) == len(data)
+        np.testing.assert_allclose(hexes['fit'], np.polyfit(data['DD_m'], data['DD_a'], 1))
+        assert hexes['corr'] == pytest.approx(data['DD_m'].corr(data['DD_a']))
+
+    def test_bar_counts(self):
+        """Categories are ordered by frequency; missing labels are not counted."""
+        bars = bar_counts(['low_debt', 'other', None, 'low_debt'])
+        assert (bars['categories'], bars['counts']) == (['low_debt', 'other'], [2, 1])
+
+    def test_unknown_panel_kind(self):
+        with pytest.raises(ValueError, match='Unknown panel kind'):
+            figure('bad', [{'kind': 'pie'}])
+
+
+class TestRendering:
+    """Image files from figure specs."""
+
+    @pytest.fixture
+    def specs(self, panel):
+        return [
+            figure('dd_distributions', [histogram(panel['DD_a'], title='DD_a'), histogram(panel['DD_m'], title='DD_m')]),
+            figure('dd_by_year', [five_number_summary(panel['DD_a'], panel['year'])]),
+            figure('dd_scatter', [hexbin_counts(panel['DD_m'], panel['DD_a'])], figsize=(10, 8)),
+            figure('empty', [histogram([]), bar_counts([]),
+                             five_number_summary([np.nan, np.nan], [2016, 2017]), hexbin_counts([], [])]),
+        ]
+
+    def test_files_written(self, specs, tmp_path):
+        """Every spec becomes one non-empty PNG named after it."""
+        paths = render_figures(specs, tmp_path, n_jobs=1)
+        assert [p.name for p in paths] == ['dd_distributions.png', 'dd_by_year.png', 'dd_scatter.png', 'empty.png']
+        assert all(p.read_bytes().startswith(b'\x89PNG') for p in paths)
+
+    def test_pool_matches_serial(self, specs, tmp_path):
+        """Worker processes write the same images as the in-process path."""
+        serial = render_figures(specs, tmp_path / 'serial', n_jobs=1)
+        pooled = render_figures(specs, tmp_path / 'pooled', n_jobs=2)
+        assert [p.read_bytes() for p in serial] == [p.read_bytes() for p in pooled]
+
+    def test_json_round_trip(self, specs, tmp_path):
+        """Saved figure data renders the same images without the panel."""
+        path = save_figure_data(specs, tmp_path / 'figures.json')
+        loaded = load_figure_data(path)
+        assert [s['name'] for s in loaded] == [s['name'] for s in specs]
+        direct = render_figures(specs[:1], tmp_path / 'direct', n_jobs=1)
+        reloaded = render_figures(loaded[:1], tmp_path / 'reloaded', n_jobs=1)
+        assert direct[0].read_bytes() == reloaded[0].read_bytes()
+
+    def test_independent_of_session_style(self, specs, tmp_path):
+        """A style set by the caller does not change the image."""
+        from matplotlib import style
+
+        plain = render_figures(specs[:1], tmp_path / 'plain', n_jobs=1)
+        with style.context('ggplot'):
+            styled = render_figures(specs[:1], tmp_path / 'styled', n_jobs=1)
+        assert plain[0].read_bytes() == styled[0].read_bytes()
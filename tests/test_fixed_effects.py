@@ -0,0 +1,120 @@
+"""
+Tests for fixed-effects absorption.
+
+Ensures that:
+1. Absorbed slopes and standard errors equal the dummy-variable regression's
+2. Absorbed degrees of freedom are exact for connected and disconnected panels
+3. Demeaning is exact for one factor and converges for unbalanced two-way panels
+4. Regressors absorbed by the effects are dropped with a warning
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import statsmodels.formula.api as smf
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from utils.fixed_effects import FixedEffects, absorb_ols
+
+
+@pytest.fixture
+def panel():
+    """Unbalanced bank-year panel with bank and year effects."""
+    rng = np.random.default_rng(11)
+    banks, years = 40, 8
+    df = pd.DataFrame({
+        'instrument': np.repeat([f'B{i:02d}' for i in range(banks)], years),
+        'year': np.tile(np.arange(2016, 2016 + years), banks),
+    }).sample(frac=0.75, random_state=3).reset_index(drop=True)
+    bank_effect = df['instrument'].map(dict(zip(df['instrument'].unique(), rng.normal(0, 2, banks))))
+    year_effect = (df['year'] - 2016) * 0.3
+    df['x1'] = rng.normal(size=len(df)) + bank_effect
+    df['x2'] = rng.normal(size=len(df)) + year_effect
+    df['y'] = 0.8 * df['x1'] - 0.4 * df['x2'] + bank_effect + year_effect + rng.normal(size=len(df))
+    return df
+
+
+def _lsdv(df, cov_type, **kwargs):
+    return smf.ols('y ~ x1 + x2 + C(instrument) + C(year)', data=df).fit(cov_type=cov_type, **kwargs)
+
+
+class TestAbsorbOLS:
+    """Two-way absorbed regressions."""
+
+    # The two-way covariance of the LSDV dummies is not positive definite
+    @pytest.mark.filterwarnings('ignore:invalid value encountered in sqrt')
+    @pytest.mark.parametrize('cov_type', ['nonrobust', 'HC1', 'cluster', 'twoway', 'driscoll_kraay'])
+    def test_matches_dummy_regression(self, panel, cov_type):
+        """Slopes and errors equal the LSDV fit with the same covariance."""
+        cluster = ('instrument', 'year') if cov_type == 'twoway' else 'instrument'
+        fitted = absorb_ols(panel, 'y', ['x1', 'x2'], cov_type=cov_type, cluster=cluster, maxlags=2)
+        bank = pd.factorize(panel['instrument'])[0]
+        sm_type, kwargs = {
+            'cluster': ('cluster', {'cov_kwds': {'groups': bank}}),
+            'twoway': ('cluster', {'cov_kwds': {'groups': np.column_stack([bank, panel['year'] - 2016])}}),
+            'driscoll_kraay': ('hac-groupsum', {'cov_kwds': {'time': (panel['year'] - 2016).to_numpy(), 'maxlags': 2}}),
+        }.get(cov_type, (cov_type, {}))
+        expected = _lsdv(panel, sm_type, **kwargs)
+        np.testing.assert_allclose(fitted.params.to_numpy(), expected.params[['x1', 'x2']].to_numpy(), rtol=1e-8)
+        np.testing.assert_allclose(fitted.bse.to_numpy(), expected.bse[['x1', 'x2']].to_numpy(), rtol=1e-7)
+        assert fitted.df_resid == expected.df_resid
+        assert fitted.absorbed == {'instrument': 40, 'year': 8}
+
+    def test_missing_values_dropped(self, panel):
+        """Rows missing y, a regressor or an effect are excluded."""
+        panel.loc[:4, 'x1'] = np.nan
+        panel.loc[5:6, 'instrument'] = None
+        fitted = absorb_ols(panel, 'y', ['x1', 'x2'], cov_type='nonrobust')
+        assert fitted.n_obs == len(panel) - 7
+
+    def test_absorbed_regressor_dropped(self, panel):
+        """A year-level dummy under year effects is dropped; the other slopes are unchanged."""
+        panel['covid'] = (panel['year'] >= 2020).astype(int)
+        with pytest.warns(UserWarning, match="covid"):
+            fitted = absorb_ols(panel, 'y', ['x1', 'covid', 'x2'])
+        expected = absorb_ols(panel, 'y', ['x1', 'x2'])
+        assert fitted.dropped == ['covid']
+        pd.testing.assert_series_equal(fitted.params, expected.params)
+        pd.testing.assert_series_equal(fitted.bse, expected.bse)
+        assert fitted.df_resid == expected.df_resid
+
+    def test_unknown_cov_type(self, panel):
+        """Only the implemented covariance estimators are accepted."""
+        with pytest.raises(ValueError, match="Unknown cov_type"):
+            absorb_ols(panel, 'y', ['x1'], cov_type='HAC')
+
+
+class TestFixedEffects:
+    """Demeaning and degrees of freedom."""
+
+    def test_single_factor_is_group_demeaning(self, panel):
+        """One factor is removed exactly in one pass."""
+        effects = FixedEffects.from_frame(panel, ['instrument'])
+        demeaned = effects.demean(panel['y'].to_numpy())
+        expected = panel['y'] - panel.groupby('instrument')['y'].transform('mean')
+        np.testing.assert_allclose(demeaned, expected.to_numpy(), atol=1e-12)
+        assert effects.iterations == 1
+        assert effects.absorbed_dof == 39
+
+    def test_two_way_residuals_orthogonal_to_effects(self, panel):
+        """Converged residuals have zero mean within every bank and every year."""
+        effects = FixedEffects.from_frame(panel, ['instrument', 'year'])
+        demeaned = effects.demean(panel[['y', 'x1']].to_numpy())
+        for col in ['instrument', 'year']:
+            means = pd.DataFrame(demeaned).groupby(panel[col].to_numpy()).mean()
+            assert np.abs(means.to_numpy()).max() < 1e-8
+
+    def test_disconnected_panel_dof(self):
+        """Two separate bank-year blocks lose one extra level."""
+        df = pd.DataFrame({'instrument': ['A', 'A', 'B', 'B', 'C', 'C'],
+                           'year': [2016, 2017, 2016, 2017, 2018, 2019]})
+        effects = FixedEffects.from_frame(df, ['instrument', 'year'])
+        assert effects.absorbed_dof == (3 + 4) - 2 - 1
+
+    def test_not_converged(self, panel):
+        """Exhausting max_iter raises instead of returning partial residuals."""
+        effects = FixedEffects.from_frame(panel, ['instrument', 'year'])
+        with pytest.raises(RuntimeError, match='did not converge'):
+            effects.demean(panel['y'].to_numpy(), tol=1e-14, max_iter=1)
@@ -0,0 +1,78 @@
+"""
+Tests for concurrent input loading.
+
+Ensures that:
+1. Concurrently loaded frames equal sequential schema reads
+2. Every input gets a timing and the bundle keeps the requested order
+3. Missing inputs fail before any read starts
+"""
+
+import threading
+
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import utils.loader as loader
+from utils.loader import load_inputs
+from utils.schema import read_table
+
+
+@pytest.fixture
+def csv_inputs(tmp_path):
+    """Two small panel CSVs and one plain CSV."""
+    book = tmp_path / 'Book2_clean.csv'
+    pd.DataFrame({
+        'instrument': ['ABCB', 'ABCB', 'ACNB'],
+        'year': [2016, 2017, 2016],
+        'total_assets': [1.5, 1.7, 0.9],
+    }).to_csv(book, index=False)
+    vol = tmp_path / 'equity_volatility_by_year.csv'
+    pd.DataFrame({
+        'ticker_base': ['ABCB', 'ACNB'],
+        'year': [2016, 2016],
+        'sigma_E': [0.21, 0.3],
+        'sigma_E_method': ['monthly_36m', 'ewma'],
+    }).to_csv(vol, index=False)
+    rf = tmp_path / 'rf.csv'
+    pd.DataFrame({'year': [2016, 2017], 'rf': [0.2, 0.8]}).to_csv(rf, index=False)
+    return {'book2': (book, 'book2_clean'), 'equity_vol': (vol, 'equity_volatility_by_year'), 'rf': rf}
+
+
+class TestLoadInputs:
+    """Concurrent reads."""
+
+    @pytest.mark.parametrize('engine', [None, 'c'])
+    def test_matches_sequential_reads(self, csv_inputs, engine):
+        """Frames equal read_table / read_csv results, in input order."""
+        loaded = load_inputs(csv_inputs, engine=engine)
+        assert list(loaded.frames) == ['book2', 'equity_vol', 'rf']
+        pd.testing.assert_frame_equal(loaded['book2'], read_table(*csv_inputs['book2']))
+        pd.testing.assert_frame_equal(loaded['equity_vol'], read_table(*csv_inputs['equity_vol']))
+        pd.testing.assert_frame_equal(loaded['rf'], pd.read_csv(csv_inputs['rf']))
+        assert isinstance(loaded['book2']['instrument'].dtype, pd.CategoricalDtype)
+
+    def test_reads_run_on_separate_threads(self, csv_inputs, monkeypatch):
+        """Each input is read on a pool thread; timings cover every input."""
+        threads = []
+        original = loader._read
+
+        def recording(*args):
+            threads.append(threading.get_ident())
+            return original(*args)
+
+        monkeypatch.setattr(loader, '_read', recording)
+        loaded = load_inputs(csv_inputs)
+        assert threading.get_ident() not in threads
+        assert set(loaded.timings) == set(csv_inputs)
+        assert all(seconds >= 0 for seconds in loaded.timings.values())
+        table = loaded.timing_table()
+        assert list(table.columns) == ['input', 'rows', 'columns', 'seconds']
+        assert table['seconds'].is_monotonic_decreasing
+
+    def test_missing_input_raises(self, csv_inputs, tmp_path):
+        """A missing file is reported before reading starts."""
+        with pytest.raises(FileNotFoundError, match='missing.csv'):
+            load_inputs({**csv_inputs, 'missing': tmp_path / 'missing.csv'})
@@ -0,0 +1,76 @@
+"""
+Tests for the run manifest.
+
+Ensures that:
+1. Recorded outputs resolve as latest or by run id
+2. Content hashes detect files changed after recording
+3. Concurrent writers do not lose entries
+"""
+
+import pytest
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add parent directory to path to import utils
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from utils.manifest import MANIFEST_NAME, RunManifest
+
+
+def write_output(directory: Path, name: str, text: str = 'a,b\n1,2\n') -> Path:
+    path = directory / name
+    path.write_text(text)
+    return path
+
+
+class TestRunManifest:
+    """Recording and resolving stage outputs."""
+
+    def test_latest_and_by_run(self, tmp_path):
+        """The last recorded run is latest; earlier runs stay addressable."""
+        manifest = RunManifest(tmp_path / MANIFEST_NAME)
+        assert manifest.get('market') is None
+        first = write_output(tmp_path, 'market_20250101_000000.parquet')
+        second = write_output(tmp_path, 'market_20250102_000000.parquet')
+        manifest.record('market', '20250101_000000', first, rows=1, stage='market')
+        manifest.record('market', '20250102_000000', second, rows=1, stage='market')
+
+        assert manifest.resolve('market') == second
+        assert manifest.resolve('market', '20250101_000000') == first
+        assert manifest.runs('market') == ['20250101_000000', '20250102_000000']
+        with pytest.raises(FileNotFoundError):
+            manifest.resolve('merged')
+
+    def test_paths_relative_to_manifest(self, tmp_path):
+        """Moving the output folder keeps entries valid."""
+        out = tmp_path / 'out'
+        out.mkdir()
+        manifest = RunManifest(out / MANIFEST_NAME)
+        manifest.record('merged', '20250101_000000', write_output(out, 'merged_20250101_000000.csv'),
+                        upstream={'market': '20250102_000000'})
+        moved = out.rename(tmp_path / 'moved')
+
+        entry = RunManifest(moved / MANIFEST_NAME).get('merged')
+        assert entry['path'] == moved / 'merged_20250101_000000.csv'
+        assert entry['upstream'] == {'market': '20250102_000000'}
+
+    def test_verify_detects_changes(self, tmp_path):
+        """A file edited after recording fails verification."""
+        manifest = RunManifest(tmp_path / MANIFEST_NAME)
+        path = write_output(tmp_path, 'accounting_20250101_000000.csv')
+        manifest.record('accounting', '20250101_000000', path, rows=1)
+        assert manifest.verify('accounting')
+        path.write_text('a,b\n9,9\n')
+        assert not manifest.verify('accounting')
+
+    def test_concurrent_records(self, tmp_path):
+        """Parallel stages appending to one manifest keep every entry."""
+        manifest = RunManifest(tmp_path / MANIFEST_NAME)
+        paths = [write_output(tmp_path, f'market_2025010{i}_000000.csv', str(i)) for i in range(1, 9)]
+
+        def record(path):
+            return RunManifest(manifest.path).record('market', path.stem[len('market_'):], path)
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(record, paths))
+        assert len(manifest.runs('market')) == len(paths)
@@ -0,0 +1,147 @@
+"""
+Tests for the column-deduplicating merge.
+
+Ensures that:
+1. Duplicated columns within a side are dropped and recorded as aliases
+2. Columns identical on both sides are stored once; conflicting ones stay prefixed
+3. Rows and kept values match the prefixed pd.merge the notebook used before
+4. resolve_columns maps a_/m_ names onto the stored columns
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from utils.merge import duplicate_columns, merge_outputs, resolve_columns
+
+
+@pytest.fixture
+def outputs():
+    """Accounting and market outputs with shared, conflicting and aliased columns."""
+    accounting = pd.DataFrame({
+        'instrument': ['ABCB', 'ABCB', 'ACNB', 'ZION'],
+        'year': [2016, 2017, 2016, 2018],
+        'E': [10.0, 11.0, 5.0, 7.0],
+        'E_pb': [10.0, 11.0, 5.0, 7.0],
+        'F': [20.0, 21.0, 9.0, 12.0],
+        'covid': [0, 0, 0, 0],
+        'DD_a': [3.1, 2.9, 4.0, 1.2],
+        'PD_a': [0.001, 0.002, 0.0001, 0.1],
+    })
+    market = pd.DataFrame({
+        'instrument': ['ABCB', 'ACNB', 'ACNB', 'BANF'],
+        'year': [2016, 2016, 2017, 2019],
+        'symbol': ['ABCB', 'ACNB', 'ACNB', 'BANF'],
+        'F': [19.5, 9.0, 9.5, 30.0],
+        'F_t': [19.5, 9.0, 9.5, 30.0],
+        'rf': [0.2, 0.2, 0.8, 2.1],
+        'rf_t': [0.2, 0.2, 0.8, 2.1],
+        'covid': [0, 0, 0, 0],
+        'DD_m': [2.5, 3.8, np.nan, 5.0],
+        'd2': [2.5, 3.8, np.nan, 5.0],
+        'PD_m': [0.006, 0.0001, np.nan, 0.0],
+    })
+    return accounting, market
+
+
+def _naive_merge(accounting, market, keys=('instrument', 'year')):
+    """The prefix-everything merge used before merge_outputs."""
+    keys = list(keys)
+    protect = ['DD_a', 'PD_a', 'DD_m', 'PD_m']
+    a = accounting.rename(columns={c: f'a_{c}' for c in accounting.columns if c not in keys + protect})
+    m = market.rename(columns={c: f'm_{c}' for c in market.columns if c not in keys + protect})
+    return pd.merge(a, m, on=keys, how='outer')
+
+
+class TestDuplicateColumns:
+    """Within-side duplicates."""
+
+    def test_finds_equal_columns(self, outputs):
+        """Equal content is an alias of the first column; protected columns are kept."""
+        _, market = outputs
+        aliases = duplicate_columns(market.drop(columns=['instrument', 'year']), protect=['DD_m'])
+        assert aliases == {'F_t': 'F', 'rf_t': 'rf', 'd2': 'DD_m'}
+
+    def test_missing_pattern_must_match(self):
+        """Columns that differ only where one is missing are not duplicates."""
+        df = pd.DataFrame({'x': [1.0, np.nan, 3.0], 'y': [1.0, 2.0, 3.0]})
+        assert duplicate_columns(df) == {}
+
+
+class TestMergeOutputs:
+    """Merged layout and lineage."""
+
+    def test_layout(self, outputs):
+        """Aliases dropped, identical shared column unprefixed, conflicting one prefixed."""
+        merged, _ = merge_outputs(*outputs)
+        assert list(merged.columns) == [
+            'instrument', 'year', 'a_E', 'a_F', 'covid', 'DD_a', 'PD_a',
+            'm_symbol', 'm_F', 'm_rf', 'DD_m', 'PD_m',
+        ]
+
+    def test_matches_naive_merge(self, outputs):
+        """Same rows in key order, and every kept column equals its old counterpart."""
+        merged, lineage = merge_outputs(*outputs)
+        naive = _naive_merge(*outputs)
+        pd.testing.assert_frame_equal(merged[['instrument', 'year']], naive[['instrument', 'year']])
+        stored = resolve_columns(list(naive.columns), lineage)
+        for name, col in stored.items():
+            if name in ('a_covid', 'm_covid'):
+                continue
+            pd.testing.assert_series_equal(merged[col], naive[name], check_names=False, check_dtype=False)
+
+    def test_shared_column_is_coalesced(self, outputs):
+        """The unprefixed copy takes whichever side has the row."""
+        merged, _ = merge_outputs(*outputs)
+        naive = _naive_merge(*outputs)
+        pd.testing.assert_series_equal(
+            merged['covid'], naive['a_covid'].fillna(naive['m_covid']),
+            check_names=False, check_dtype=False,
+        )
+        assert merged['covid'].notna().all()
+
+    def test_lineage(self, outputs):
+        """Every source column has one lineage row."""
+        accounting, market = outputs
+        _, lineage = merge_outputs(accounting, market)
+        assert len(lineage) == accounting.shape[1] + market.shape[1]
+        rules = lineage.set_index(['side', 'source_column'])['rule']
+        assert rules[('accounting', 'instrument')] == 'key'
+        assert rules[('accounting', 'E_pb')] == 'alias'
+        assert rules[('market', 'covid')] == 'shared'
+        assert rules[('market', 'F')] == 'prefixed'
+        assert rules[('market', 'DD_m')] == 'protected'
+
+    def test_duplicate_keys(self, outputs):
+        """Repeated keys produce the same row multiplication as pd.merge."""
+        accounting, market = outputs
+        accounting = pd.concat([accounting, accounting.iloc[[0]]], ignore_index=True)
+        merged, _ = merge_outputs(accounting, market)
+        assert len(merged) == len(_naive_merge(accounting, market))
+
+    def test_categorical_keys(self, outputs):
+        """Categorical instrument keys survive with their dtype."""
+        accounting, market = outputs
+        accounting = accounting.assign(instrument=accounting['instrument'].astype('category'))
+        merged, _ = merge_outputs(accounting, market)
+        assert isinstance(merged['instrument'].dtype, pd.CategoricalDtype)
+        assert merged['instrument'].isna().sum() == 0
+
+
+class TestResolveColumns:
+    """Name translation."""
+
+    def test_resolves_prefixed_names(self, outputs):
+        """Shared, alias and plain names map to the stored column."""
+        _, lineage = merge_outputs(*outputs)
+        assert resolve_columns(['a_covid', 'm_rf_t', 'm_d2', 'a_E', 'DD_a', 'other'], lineage) == {
+            'a_covid': 'covid', 'm_rf_t': 'm_rf', 'm_d2': 'DD_m',
+            'a_E': 'a_E', 'DD_a': 'DD_a', 'other': 'other',
+        }
+
+    def test_without_lineage(self):
+        """Older merged outputs have no lineage table: names pass through."""
+        assert resolve_columns(['a_E', 'covid'], None) == {'a_E': 'a_E', 'covid': 'covid'}
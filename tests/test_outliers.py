@@ -0,0 +1,116 @@
+"""
+Tests for the outlier rule table.
+
+Ensures that:
+1. The shipped rules reproduce the row-wise categorize_outlier of the analysis notebook
+2. Priorities decide between overlapping rules and missing values never match
+3. Malformed rule tables are rejected
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from utils.outliers import OutlierRules
+
+RULES_PATH = Path(__file__).parent.parent / 'data' / 'clean' / 'outlier_rules.json'
+
+
+def _categorize_outlier(row, dd_col, dataset_type, threshold=13.0):
+    """Row-wise reference (the notebook implementation the rule table replaces)."""
+    if not (pd.notna(row[dd_col]) and row[dd_col] > threshold):
+        return None
+    prefix = 'a_' if dataset_type == 'accounting' else 'm_'
+    cost, weight = f'{prefix}wacc_cost_of_debt,_(%)', f'{prefix}wacc_debt_weight,_(%)'
+    if cost in row.index and weight in row.index and pd.notna(row[cost]) and pd.notna(row[weight]):
+        if abs(row[cost]) < 1e-6 and abs(row[weight]) < 1e-6:
+            return 'zero_cost_debt'
+    debt = f'{prefix}debt_total'
+    if debt in row.index and pd.notna(row[debt]) and row[debt] <= 1.0:
+        return 'low_debt'
+    de = f'{prefix}d/e'
+    if de in row.index and pd.notna(row[de]) and row[de] <= 0.05:
+        return 'low_leverage'
+    return 'other'
+
+
+@pytest.fixture
+def merged():
+    """Merged-like frame where every rule column has zeros, small values and gaps."""
+    rng = np.random.default_rng(9)
+    n = 2000
+    df = pd.DataFrame({'DD_a': rng.uniform(0, 20, n), 'DD_m': rng.uniform(0, 20, n)})
+    for prefix in ['a_', 'm_']:
+        df[f'{prefix}wacc_cost_of_debt,_(%)'] = rng.choice([0.0, -0.0, 1e-7, 2.5], n)
+        df[f'{prefix}wacc_debt_weight,_(%)'] = rng.choice([0.0, 1e-7, 30.0], n)
+        df[f'{prefix}debt_total'] = rng.choice([0.5, 1.0, 1.5, 500.0], n)
+        df[f'{prefix}d/e'] = rng.choice([0.01, 0.05, 0.06, 2.0], n)
+    for col in df.columns:
+        df.loc[rng.random(n) < 0.1, col] = np.nan
+    return df
+
+
+class TestOutlierRules:
+    """Vectorized categorization."""
+
+    @pytest.mark.parametrize('dataset,dd_col', [('accounting', 'DD_a'), ('market', 'DD_m')])
+    def test_matches_row_wise(self, merged, dataset, dd_col):
+        """Every row gets the category of the row-wise function."""
+        rules = OutlierRules.from_json(RULES_PATH)
+        expected = merged.apply(lambda row: _categorize_outlier(row, dd_col, dataset), axis=1)
+        result = rules.categorize(merged, dataset)
+        assert result.fillna('').tolist() == expected.fillna('').tolist()
+        assert set(result.dropna()) == {'zero_cost_debt', 'low_debt', 'low_leverage', 'other'}
+
+    def test_absent_columns_skip_rule(self, merged):
+        """Without the WACC columns the zero-cost rule cannot fire, as before."""
+        reduced = merged.drop(columns=['a_wacc_cost_of_debt,_(%)'])
+        rules = OutlierRules.from_json(RULES_PATH)
+        expected = reduced.apply(lambda row: _categorize_outlier(row, 'DD_a', 'accounting'), axis=1)
+        result = rules.categorize(reduced, 'accounting')
+        assert result.fillna('').tolist() == expected.fillna('').tolist()
+        assert 'zero_cost_debt' not in set(result.dropna())
+
+    def test_apply_adds_output_columns(self, merged):
+        """apply writes outlier_a and outlier_m for the datasets present."""
+        out = OutlierRules.from_json(RULES_PATH).apply(merged.drop(columns=['DD_m']))
+        assert 'outlier_a' in out.columns and 'outlier_m' not in out.columns
+        assert out['outlier_a'].notna().sum() == (merged['DD_a'] > 13.0).sum()
+
+    def test_priority_order(self):
+        """Overlapping rules resolve to the lowest priority number, not the file order."""
+        df = pd.DataFrame({'DD': [20.0, 20.0, 20.0, 5.0], 'x': [1.0, 1.0, 9.0, 1.0], 'z': [0.0, np.nan, 0.0, 0.0]})
+        rules = OutlierRules.from_dict({
+            'threshold': 10,
+            'datasets': {'d': {'dd': 'DD', 'prefix': ''}},
+            'rules': [
+                {'category': 'small_x', 'priority': 5, 'conditions': [{'column': '{prefix}x', 'op': '<', 'value': 2}]},
+                {'category': 'zero_z', 'priority': 1, 'conditions': [{'column': 'z', 'op': '==', 'value': 0}]},
+            ],
+            'default': 'rest',
+        })
+        assert rules.categorize(df, 'd').tolist() == ['zero_z', 'small_x', 'zero_z', None]
+
+    def test_not_equal_ignores_missing(self):
+        """A missing value does not satisfy != either."""
+        df = pd.DataFrame({'DD': [20.0, 20.0], 'x': [np.nan, 1.0]})
+        rules = OutlierRules.from_dict({
+            'threshold': 10, 'datasets': {'d': {'dd': 'DD'}},
+            'rules': [{'category': 'nonzero', 'priority': 1, 'conditions': [{'column': 'x', 'op': '!=', 'value': 0}]}],
+        })
+        assert rules.categorize(df, 'd').tolist() == ['other', 'nonzero']
+
+    def test_invalid_tables(self):
+        """Unknown operators, duplicate priorities and unknown datasets raise."""
+        spec = {'threshold': 10, 'datasets': {'d': {'dd': 'DD'}},
+                'rules': [{'category': 'a', 'priority': 1, 'conditions': [{'column': 'x', 'op': '=<', 'value': 0}]}]}
+        with pytest.raises(ValueError, match="Unknown operator"):
+            OutlierRules.from_dict(spec)
+        spec['rules'] = [{'category': c, 'priority': 1, 'conditions': []} for c in 'ab']
+        with pytest.raises(ValueError, match="unique"):
+            OutlierRules.from_dict(spec)
+        with pytest.raises(ValueError, match="Unknown dataset"):
+            OutlierRules.from_dict({**spec, 'rules': []}).categorize(pd.DataFrame({'DD': [1.0]}), 'e')
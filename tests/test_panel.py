@@ -0,0 +1,133 @@
+"""
+Tests for the integer-coded (instrument, year) panel index.
+
+Ensures that:
+1. Lags, leads and differences match groupby-shift on a panel without gaps
+2. Lags and rolling windows are NaN across missing years instead of skipping them
+3. Duplicate (instrument, year) rows never lag onto their own twin
+4. Results are aligned to the frame's row order, whatever that order is
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from utils.panel import PanelIndex
+
+
+def make_panel(seed=0, n_firms=5, years=range(2016, 2024)):
+    """Balanced random panel, rows shuffled."""
+    rng = np.random.default_rng(seed)
+    rows = [(f'BANK{i}', year) for i in range(n_firms) for year in years]
+    df = pd.DataFrame(rows, columns=['instrument', 'year'])
+    df['rit'] = rng.normal(0.05, 0.2, len(df))
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+class TestBalancedPanel:
+    """Without gaps the panel reproduces the groupby-shift idiom."""
+
+    def test_lag_lead_diff_match_groupby(self):
+        """lag/lead/diff equal sort + groupby shift/diff."""
+        df = make_panel()
+        panel = PanelIndex.from_frame(df)
+        expected = df.sort_values(['instrument', 'year']).groupby('instrument')['rit']
+
+        pd.testing.assert_series_equal(panel.lag(df['rit']), expected.shift(1).reindex(df.index))
+        pd.testing.assert_series_equal(panel.lead(df['rit'], 2), expected.shift(-2).reindex(df.index))
+        pd.testing.assert_series_equal(panel.diff(df['rit']), expected.diff().reindex(df.index))
+
+    @pytest.mark.parametrize('func', ['mean', 'sum', 'std', 'min', 'max'])
+    def test_rolling_matches_pandas(self, func):
+        """Rolling statistics over prior years match shift(1).rolling()."""
+        df = make_panel(seed=1)
+        panel = PanelIndex.from_frame(df)
+        ordered = df.sort_values(['instrument', 'year'])
+        expected = ordered.groupby('instrument', group_keys=False)['rit'].apply(
+            lambda s: getattr(s.shift(1).rolling(3, min_periods=2), func)()
+        ).reindex(df.index)
+        result = panel.rolling(df['rit'], window=3, func=func, min_periods=2, lag=1)
+        np.testing.assert_allclose(result, expected, equal_nan=True)
+
+    def test_expanding_mean_of_prior_years(self):
+        """expanding(lag=1) equals expanding().mean().shift(1) per firm."""
+        df = make_panel(seed=2)
+        panel = PanelIndex.from_frame(df)
+        ordered = df.sort_values(['instrument', 'year'])
+        expected = ordered.groupby('instrument', group_keys=False)['rit'].apply(
+            lambda s: s.expanding().mean().shift(1)
+        ).reindex(df.index)
+        np.testing.assert_allclose(panel.expanding(df['rit'], 'mean', lag=1), expected, equal_nan=True)
+
+    def test_structure(self):
+        """Codes, sorted order and group offsets describe the panel."""
+        df = make_panel(n_firms=3)
+        panel = PanelIndex.from_frame(df)
+        assert panel.n_instruments == 3
+        assert panel.first_year == 2016 and panel.n_years == 8
+        assert list(np.diff(panel.offsets)) == [8, 8, 8]
+        ordered = df.iloc[panel.order]
+        assert ordered['instrument'].is_monotonic_increasing
+        assert panel.is_unique
+        assert panel.gaps().empty
+
+
+class TestGapsAndDuplicates:
+    """Missing years and repeated keys."""
+
+    def test_lag_is_nan_after_missing_year(self):
+        """The year after a gap has no lag; groupby shift would use t-2."""
+        df = pd.DataFrame({
+            'instrument': ['A', 'A', 'A', 'B'],
+            'year': [2016, 2017, 2019, 2019],
+            'rit': [0.1, 0.2, 0.4, 0.9],
+        })
+        panel = PanelIndex.from_frame(df)
+        lagged = panel.lag(df['rit'])
+        assert np.isnan(lagged[0]) and lagged[1] == 0.1
+        assert np.isnan(lagged[2]) and np.isnan(lagged[3])
+        assert np.isnan(panel.lead(df['rit'])[1])
+        assert panel.gaps().to_dict('records') == [{'instrument': 'A', 'year': 2018}]
+
+    def test_rolling_window_counts_calendar_years(self):
+        """The prior-3-year window of 2019 covers 2016-2018 only."""
+        df = pd.DataFrame({
+            'instrument': ['A'] * 4,
+            'year': [2014, 2016, 2017, 2019],
+            'rit': [100.0, 1.0, 2.0, 3.0],
+        })
+        panel = PanelIndex.from_frame(df)
+        counts = panel.rolling(df['rit'], window=3, func='count', min_periods=0, lag=1)
+        assert counts.tolist() == [0.0, 1.0, 2.0, 2.0]
+        means = panel.rolling(df['rit'], window=3, func='mean', min_periods=1, lag=1)
+        assert means.tolist()[1:] == [100.0, 50.5, 1.5]
+        assert np.isnan(panel.rolling(df['rit'], window=2, func='mean', lag=1)[3])
+        # Expanding history still spans the gap
+        assert panel.expanding(df['rit'], 'count', lag=1).tolist() == [0.0, 1.0, 2.0, 3.0]
+
+    def test_duplicate_rows_use_first_occurrence(self):
+        """Duplicates share the lag of their year and feed the first row's value forward."""
+        df = pd.DataFrame({
+            'instrument': pd.Categorical(['A', 'A', 'A', 'A']),
+            'year': pd.array([2016, 2016, 2017, 2017], dtype='Int16'),
+            'rit': [0.1, 0.5, 0.2, 0.3],
+        })
+        panel = PanelIndex.from_frame(df)
+        assert panel.duplicated.tolist() == [False, True, False, True]
+        assert not panel.is_unique
+        lagged = panel.lag(df['rit'])
+        assert np.isnan(lagged[0]) and np.isnan(lagged[1])
+        assert lagged.tolist()[2:] == [0.1, 0.1]
+
+    def test_missing_keys_and_misaligned_values(self):
+        """Rows without a year get NaN; values must match the panel length."""
+        df = pd.DataFrame({'instrument': ['A', 'A', None], 'year': [2016, None, 2017]})
+        panel = PanelIndex.from_frame(df)
+        assert np.isnan(panel.lag(np.array([1.0, 2.0, 3.0]))).all()
+        with pytest.raises(ValueError):
+            panel.lag([1.0, 2.0])
+        with pytest.raises(ValueError):
+            panel.rolling([1.0, 2.0, 3.0], window=2, func='median')
@@ -0,0 +1,228 @@
+"""
+Tests for the stage DAG pipeline runner.
+
+Ensures that:
+1. Dependencies are derived from declared inputs and outputs
+2. Unchanged stages are skipped on rerun
+3. Changing one input reruns only the affected stage and its downstream
+4. Production datasheet patterns match only the stage outputs, not side tables
+5. Glob inputs resolve through the run manifest, else by the run timestamp in the name
+6. Production stages declare the lookup tables their code reads as inputs
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import utils
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+from utils.manifest import MANIFEST_NAME, RunManifest
+from utils.pipeline import Pipeline, Stage, resolve
+from run_pipeline import STAGES
+
+def write_stage(base_dir: Path, name: str, reads: list, writes: str) -> str:
+    """Write a stage script that concatenates its inputs into one output."""
+    script = base_dir / f'{name}.py'
+    script.write_text(
+        "from pathlib import Path\n"
+        f"base = Path({str(base_dir)!r})\n"
+        f"text = ''.join((base / p).read_text() for p in {reads!r})\n"
+        f"(base / {writes!r}).write_text(text + {name!r})\n"
+        f"with open(base / 'calls.txt', 'a') as fh: fh.write({name!r} + '\\n')\n"
+    )
+    return script.name
+
+
+def build_pipeline(base_dir: Path) -> Pipeline:
+    """Diamond DAG: raw -> left, right -> final."""
+    (base_dir / 'raw_a.txt').write_text('a')
+    (base_dir / 'raw_b.txt').write_text('b')
+    stages = [
+        Stage('left', write_stage(base_dir, 'left', ['raw_a.txt'], 'left.txt'),
+              inputs=['raw_a.txt'], outputs=['left.txt']),
+        Stage('right', write_stage(base_dir, 'right', ['raw_b.txt'], 'right.txt'),
+              inputs=['raw_b.txt'], outputs=['right.txt']),
+        Stage('final', write_stage(base_dir, 'final', ['left.txt', 'right.txt'], 'final.txt'),
+              inputs=['left.txt', 'right.txt'], outputs=['final.txt']),
+    ]
+    return Pipeline(stages, base_dir, base_dir / 'state.json', base_dir / 'logs')
+
+
+def calls(base_dir: Path) -> list:
+    path = base_dir / 'calls.txt'
+    return path.read_text().split() if path.exists() else []
+
+
+class TestPipeline:
+    """Test suite for the pipeline runner."""
+
+    def test_dependencies_from_inputs_and_outputs(self, tmp_path):
+        """Test that the DAG is derived from file declarations."""
+        pipeline = build_pipeline(tmp_path)
+
+        assert pipeline.deps == {'left': [], 'right': [], 'final': ['left', 'right']}
+        assert pipeline.order.index('final') == 2
+
+    def test_first_run_executes_all_stages(self, tmp_path):
+        """Test that a fresh pipeline runs every stage."""
+        status = build_pipeline(tmp_path).run(jobs=2)
+
+        assert status == {'left': 'ran', 'right': 'ran', 'final': 'ran'}
+        assert (tmp_path / 'final.txt').read_text() == 'aleftbrightfinal'
+
+    def test_rerun_skips_unchanged_stages(self, tmp_path):
+        """Test that a second run with identical inputs does nothing."""
+        build_pipeline(tmp_path).run()
+        status = build_pipeline(tmp_path).run()
+
+        assert set(status.values()) == {'skipped'}
+        assert len(calls(tmp_path)) == 3
+
+    def test_changed_input_reruns_only_downstream(self, tmp_path):
+        """Test that changing one raw input leaves the other branch alone."""
+        build_pipeline(tmp_path).run()
+        pipeline = build_pipeline(tmp_path)
+        (tmp_path / 'raw_a.txt').write_text('A')
+
+        status = pipeline.run()
+
+        assert status == {'left': 'ran', 'right': 'skipped', 'final': 'ran'}
+        assert (tmp_path / 'final.txt').read_text() == 'Aleftbrightfinal'
+
+    def test_changed_utils_module_reruns_importing_stages(self, tmp_path):
+        """Test that editing a utils module (also imported indirectly) invalidates the stages using it."""
+        (tmp_path / 'utils').mkdir()
+        (tmp_path / 'utils' / '__init__.py').write_text('')
+        (tmp_path / 'utils' / 'base.py').write_text('SUFFIX = 1\n')
+        (tmp_path / 'utils' / 'helper.py').write_text('from utils.base import SUFFIX\n')
+        pipeline = build_pipeline(tmp_path)
+        script = tmp_path / 'left.py'
+        script.write_text('from utils.helper import SUFFIX\n' + script.read_text())
+        pipeline.run()
+
+        (tmp_path / 'utils' / 'base.py').write_text('SUFFIX = 2\n')
+        status = Pipeline(list(pipeline.stages.values()), tmp_path, tmp_path / 'state.json', tmp_path / 'logs').run()
+
+        # left writes the same output, so final stays current
+        assert status == {'left': 'ran', 'right': 'skipped', 'final': 'skipped'}
+
+    def test_failed_stage_blocks_downstream(self, tmp_path):
+        """Test that downstream stages do not run after a failure."""
+        pipeline = build_pipeline(tmp_path)
+        (tmp_path / 'left.py').write_text('raise SystemExit(1)\n')
+
+        status = pipeline.run()
+
+        assert status['left'] == 'failed'
+        assert status['final'] == 'blocked'
+
+    def test_unknown_target_is_rejected(self, tmp_path):
+        """Test that a misspelled stage name raises instead of running nothing."""
+        pipeline = build_pipeline(tmp_path)
+
+        with pytest.raises(KeyError, match="no_such_stage"):
+            pipeline.run(['left', 'no_such_stage'])
+        assert calls(tmp_path) == []
+
+    def test_cycle_is_rejected(self, tmp_path):
+        """Test that circular declarations raise an error."""
+        stages = [Stage('a', 'a.py', inputs=['b.txt'], outputs=['a.txt']),
+                  Stage('b', 'b.py', inputs=['a.txt'], outputs=['b.txt'])]
+
+        with pytest.raises(ValueError, match="cycle"):
+            Pipeline(stages, tmp_path, tmp_path / 'state.json', tmp_path / 'logs')
+
+
+class TestProductionStages:
+    """Test suite for the declared DD/PD stages."""
+
+    def test_lineage_table_is_not_a_merged_output(self, tmp_path):
+        """Test that the merge's lineage table never stands in for the merged data."""
+        datasheet = tmp_path / 'data' / 'outputs' / 'datasheet'
+        datasheet.mkdir(parents=True)
+        merged = datasheet / 'merged_20250101_000000.parquet'
+        merged.write_bytes(b'values')
+        (datasheet / 'lineage_merged_20250101_000000.parquet').write_bytes(b'columns')
+        (datasheet / 'merged_lineage_20250101_000000.parquet').write_bytes(b'columns')  # pre-rename name
+        analysis = next(stage for stage in STAGES if stage.name == 'analysis')
+
+        assert resolve(tmp_path, analysis.inputs[0]) == merged
+
+        merged.unlink()
+        assert resolve(tmp_path, analysis.inputs[0]) is None
+
+    def test_merged_values_change_analysis_key(self, tmp_path):
+        """Test that new merged values (same columns) make the analysis stage stale."""
+        datasheet = tmp_path / 'data' / 'outputs' / 'datasheet'
+        datasheet.mkdir(parents=True)
+        (tmp_path / 'analysis.ipynb').write_text('{"cells": []}')
+        merged = datasheet / 'merged_20250101_000000.parquet'
+        merged.write_bytes(b'values v1')
+        (datasheet / 'lineage_merged_20250101_000000.parquet').write_bytes(b'columns')
+        (tmp_path / 'data' / 'clean').mkdir(parents=True)
+        (tmp_path / 'data' / 'clean' / 'outlier_rules.json').write_text('{}')
+        analysis = next(stage for stage in STAGES if stage.name == 'analysis')
+        pipeline = Pipeline([analysis], tmp_path, tmp_path / 'state.json', tmp_path / 'logs')
+        before = pipeline.stage_key(analysis)
+
+        merged.write_bytes(b'values v2')
+        (datasheet / 'lineage_merged_20250101_000000.parquet').write_bytes(b'columns')
+
+        assert Pipeline([analysis], tmp_path, tmp_path / 'state2.json', tmp_path / 'logs').stage_key(analysis) != before
+
+    def test_outlier_rules_change_analysis_key(self, tmp_path):
+        """Test that editing the outlier rule table makes the analysis stage stale."""
+        analysis = next(stage for stage in STAGES if stage.name == 'analysis')
+        (tmp_path / 'analysis.ipynb').write_text('{"cells": []}')
+        (tmp_path / 'data' / 'clean').mkdir(parents=True)
+        (tmp_path / 'data' / 'outputs' / 'datasheet').mkdir(parents=True)
+        (tmp_path / 'data' / 'outputs' / 'datasheet' / 'merged_20250101_000000.parquet').write_bytes(b'values')
+        rules = tmp_path / 'data' / 'clean' / 'outlier_rules.json'
+        rules.write_text('{"threshold": 5}')
+        before = Pipeline([analysis], tmp_path, tmp_path / 'state.json', tmp_path / 'logs').stage_key(analysis)
+
+        rules.write_text('{"threshold": 3}')
+
+        assert Pipeline([analysis], tmp_path, tmp_path / 'state2.json', tmp_path / 'logs').stage_key(analysis) != before
+
+    def test_ticker_crosswalk_changes_market_key(self, tmp_path):
+        """Test that editing the ticker exceptions makes the market stage stale."""
+        clean = tmp_path / 'data' / 'clean'
+        clean.mkdir(parents=True)
+        (tmp_path / 'dd_pd_market.ipynb').write_text('{"cells": []}')
+        market = next(stage for stage in STAGES if stage.name == 'market')
+        for pattern in market.inputs:
+            (tmp_path / pattern).write_bytes(b'input')
+        exceptions = clean / 'ticker_mapping_exceptions.csv'
+        exceptions.write_text('ticker,instrument\nABC,ABC.N\n')
+        before = Pipeline([market], tmp_path, tmp_path / 'state.json', tmp_path / 'logs').stage_key(market)
+
+        exceptions.write_text('ticker,instrument\nABC,ABC.OQ\n')
+
+        assert Pipeline([market], tmp_path, tmp_path / 'state2.json', tmp_path / 'logs').stage_key(market) != before
+
+
+class TestResolve:
+    """Test suite for glob input resolution."""
+
+    def test_manifest_latest_wins(self, tmp_path):
+        """Test that the recorded latest run is used, not the newest file on disk."""
+        recorded = tmp_path / 'merged_20250101_000000.parquet'
+        recorded.write_bytes(b'recorded')
+        RunManifest(tmp_path / MANIFEST_NAME).record('merged', '20250101_000000', recorded)
+        (tmp_path / 'merged_20250202_000000.parquet').write_bytes(b'stray copy')
+
+        assert resolve(tmp_path, 'merged_[0-9]*.parquet') == recorded
+
+    def test_timestamp_in_name_beats_mtime(self, tmp_path):
+        """Test that without a manifest the latest run id wins, even if an older file was touched last."""
+        newer = tmp_path / 'market_20250202_000000.parquet'
+        newer.write_bytes(b'new')
+        (tmp_path / 'market_20250101_000000.parquet').write_bytes(b'old, copied later')
+
+        assert resolve(tmp_path, 'market_[0-9]*.parquet') == newer
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
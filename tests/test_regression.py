@@ -0,0 +1,155 @@
+"""
+Tests for the batched OLS grid.
+
+Ensures that:
+1. Every statistic matches statsmodels OLS on the same complete-case sample
+2. Models on the same sample share one cross-product matrix
+3. Adding a model refits only that model
+4. Rank-deficient designs and small samples are handled like the notebook did
+5. Robust covariances give statsmodels' errors and Wald F-test
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import statsmodels.api as sm
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import utils.regression as regression
+from utils.regression import SUMMARY_COLUMNS, OLSGrid
+
+
+@pytest.fixture
+def panel():
+    """Bank-year-like frame with missing values in some regressors."""
+    rng = np.random.default_rng(7)
+    n = 400
+    df = pd.DataFrame({
+        'esg_e': rng.normal(50, 15, n),
+        'esg_s': rng.normal(55, 10, n),
+        'lnta': rng.normal(15, 1.5, n),
+        'td_ta': rng.uniform(0.8, 0.95, n),
+        'size_dummy': rng.integers(0, 2, n),
+        'covid_dummy': rng.integers(0, 2, n),
+    })
+    df['DD'] = 2 + 0.02 * df['esg_e'] - 0.5 * df['lnta'] + 3 * df['td_ta'] + rng.normal(0, 1, n)
+    df['PD'] = rng.beta(0.5, 20, n)
+    df.loc[rng.choice(n, 40, replace=False), 'esg_s'] = np.nan
+    df.loc[rng.choice(n, 25, replace=False), 'DD'] = np.nan
+    return df
+
+
+def _statsmodels(df, y, X):
+    data = df[[y] + X].dropna()
+    return sm.OLS(data[y], sm.add_constant(data[X])).fit(), len(data)
+
+
+class TestOLSGrid:
+    """Grid fits."""
+
+    @pytest.mark.parametrize('y,X', [
+        ('DD', ['esg_e', 'esg_s']),
+        ('DD', ['esg_e', 'size_dummy', 'covid_dummy', 'lnta', 'td_ta']),
+        ('PD', ['esg_e', 'esg_s', 'lnta']),
+        ('PD', ['covid_dummy']),
+    ])
+    def test_matches_statsmodels(self, panel, y, X):
+        """Coefficients, errors and fit statistics equal statsmodels'."""
+        grid = OLSGrid(panel)
+        grid.add(y, X, 'model')
+        fitted = grid.fit()['model']
+        expected, n_obs = _statsmodels(panel, y, X)
+        assert fitted.n_obs == n_obs
+        np.testing.assert_allclose(fitted.params.to_numpy(), expected.params.to_numpy(), rtol=1e-9)
+        np.testing.assert_allclose(fitted.bse.to_numpy(), expected.bse.to_numpy(), rtol=1e-9)
+        np.testing.assert_allclose(fitted.pvalues.to_numpy(), expected.pvalues.to_numpy(), rtol=1e-7)
+        assert fitted.r_squared == pytest.approx(expected.rsquared, rel=1e-9)
+        assert fitted.adj_r_squared == pytest.approx(expected.rsquared_adj, rel=1e-9)
+        assert fitted.f_statistic == pytest.approx(expected.fvalue, rel=1e-9)
+        assert fitted.prob_f == pytest.approx(expected.f_pvalue, rel=1e-7)
+        assert list(fitted.params.index) == ['const', *X]
+
+    @pytest.mark.parametrize('cov_type', ['HC1', 'cluster'])
+    def test_robust_matches_statsmodels(self, panel, cov_type):
+        """Robust errors, t-tests and the robust Wald F equal statsmodels' (use_t=True)."""
+        panel = panel.assign(bank=np.arange(len(panel)) % 37)
+        X = ['esg_e', 'lnta', 'td_ta']
+        grid = OLSGrid(panel, cov_type=cov_type, groups='bank' if cov_type == 'cluster' else None)
+        grid.add('DD', X, 'model')
+        fitted = grid.fit()['model']
+        data = panel[['DD', *X, 'bank']].dropna()
+        kwargs = {'cov_kwds': {'groups': data['bank'].to_numpy()}} if cov_type == 'cluster' else {}
+        expected = sm.OLS(data['DD'], sm.add_constant(data[X])).fit(cov_type=cov_type, use_t=True, **kwargs)
+        np.testing.assert_allclose(fitted.bse.to_numpy(), expected.bse.to_numpy(), rtol=1e-9)
+        np.testing.assert_allclose(fitted.pvalues.to_numpy(), expected.pvalues.to_numpy(), rtol=1e-7)
+        assert fitted.f_statistic == pytest.approx(expected.fvalue, rel=1e-9)
+        assert fitted.prob_f == pytest.approx(expected.f_pvalue, rel=1e-7)
+
+    def test_summary_layout(self, panel):
+        """The summary has the regression_summary columns, in model order."""
+        grid = OLSGrid(panel)
+        grid.add('DD', ['esg_e'], 'b')
+        grid.add('PD', ['esg_e'], 'a')
+        results = grid.fit()
+        assert list(results.summary.columns) == SUMMARY_COLUMNS
+        assert results.summary['model'].tolist() == ['b', 'a']
+        assert len(results.coefficients) == 4
+
+    def test_shared_sample(self, panel):
+        """Nested models on the same complete cases use one sample."""
+        grid = OLSGrid(panel)
+        grid.add('PD', ['esg_e'])
+        grid.add('PD', ['esg_e', 'lnta'])
+        grid.add('PD', ['esg_e', 'lnta', 'td_ta'])
+        grid.fit()
+        assert grid.n_samples == 1
+        grid.add('PD', ['esg_e', 'esg_s'])
+        grid.fit()
+        assert grid.n_samples == 2
+
+    def test_added_model_fits_alone(self, panel, monkeypatch):
+        """Refitting the grid after adding a control solves only the new model."""
+        grid = OLSGrid(panel)
+        grid.add('DD', ['esg_e', 'size_dummy'])
+        grid.fit()
+        solved = []
+        original = regression._solve
+
+        def counting(sample, spec):
+            solved.append(spec.model)
+            return original(sample, spec)
+
+        monkeypatch.setattr(regression, '_solve', counting)
+        spec = grid.add('DD', ['esg_e', 'size_dummy', 'lnta'])
+        results = grid.fit()
+        assert solved == [spec.model]
+        assert len(results.fits) == 2
+
+    @pytest.mark.filterwarnings('ignore::UserWarning')
+    def test_rank_deficient(self, panel):
+        """A collinear regressor gives statsmodels' minimum-norm solution."""
+        panel = panel.assign(esg_e_copy=panel['esg_e'] * 2)
+        grid = OLSGrid(panel)
+        grid.add('DD', ['esg_e', 'esg_e_copy', 'lnta'], 'collinear')
+        fitted = grid.fit()['collinear']
+        expected, _ = _statsmodels(panel, 'DD', ['esg_e', 'esg_e_copy', 'lnta'])
+        assert fitted.df_model == 2
+        np.testing.assert_allclose(fitted.params.to_numpy(), expected.params.to_numpy(), rtol=1e-6)
+        assert fitted.f_statistic == pytest.approx(expected.fvalue, rel=1e-6)
+
+    def test_small_sample_skipped(self, panel):
+        """Models with fewer than min_obs complete cases are reported, not fitted."""
+        grid = OLSGrid(panel.head(12), min_obs=10)
+        grid.add('DD', ['esg_s'], 'small')
+        results = grid.fit()
+        assert 'small' not in results.fits
+        assert results.skipped['small'] < 10
+
+    def test_duplicate_model_name(self, panel):
+        """Model names identify rows of the summary and must be unique."""
+        grid = OLSGrid(panel)
+        grid.add('DD', ['esg_e'], 'm')
+        with pytest.raises(ValueError, match="already in the grid"):
+            grid.add('PD', ['esg_e'], 'm')
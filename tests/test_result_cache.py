@@ -0,0 +1,132 @@
+"""
+Tests for the regression result cache.
+
+Ensures that:
+1. Unchanged specifications and samples are served from the cache with identical results
+2. Sample fingerprints ignore dropped rows and unused columns but see every used value
+3. Entries of other merged runs are removed when the cache is opened
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from utils.bootstrap import wild_cluster_bootstrap
+from utils.iv import IVGrid
+from utils.regression import OLSGrid
+from utils.result_cache import ResultCache, sample_fingerprint
+
+
+@pytest.fixture
+def data():
+    """Panel with gaps, an unused column and bank labels."""
+    rng = np.random.default_rng(4)
+    n = 400
+    df = pd.DataFrame({'bank': rng.integers(0, 30, n).astype(str), 'x1': rng.normal(size=n),
+                       'x2': rng.normal(size=n), 'z': rng.normal(size=n), 'unused': rng.normal(size=n)})
+    df['y'] = 1 + 0.5 * df['x1'] - 0.3 * df['x2'] + rng.normal(size=n)
+    df.loc[::17, 'x2'] = np.nan
+    return df
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(tmp_path / 'results.sqlite', source='run1')
+
+
+def _grid(df):
+    grid = OLSGrid(df, cov_type='cluster', groups='bank')
+    grid.add('y', ['x1'], 'small')
+    grid.add('y', ['x1', 'x2'], 'full')
+    return grid
+
+
+class TestGridCaching:
+    """Fits served from the cache."""
+
+    def test_ols_second_run_hits(self, data, cache):
+        """A fresh grid on the same data reads every fit back unchanged."""
+        first = _grid(data).fit(cache=cache)
+        assert (cache.hits, cache.misses) == (0, 2)
+        second = _grid(data).fit(cache=cache)
+        assert cache.hits == 2
+        pd.testing.assert_frame_equal(first.summary, second.summary)
+        pd.testing.assert_frame_equal(first.coefficients, second.coefficients)
+
+    def test_ols_changed_sample_refits(self, data, cache):
+        """Changing one used value refits only the models that use it."""
+        _grid(data).fit(cache=cache)
+        data.loc[3, 'x2'] += 1.0
+        _grid(data).fit(cache=cache)
+        assert (cache.hits, cache.misses) == (1, 3)
+
+    def test_covariance_is_part_of_key(self, data, cache):
+        """The same spec with another covariance estimator is a different entry."""
+        _grid(data).fit(cache=cache)
+        grid = OLSGrid(data, cov_type='HC1')
+        grid.add('y', ['x1'], 'small')
+        fitted = grid.fit(cache=cache)['small']
+        assert cache.hits == 0 and fitted.cov_type == 'HC1'
+
+    def test_min_obs_is_part_of_key(self, data, cache):
+        """A fit cached under a lower threshold is not served to a stricter grid."""
+        _grid(data).fit(cache=cache)
+        n = _grid(data).fit()['small'].n_obs
+        grid = OLSGrid(data, min_obs=n + 1, cov_type='cluster', groups='bank')
+        grid.add('y', ['x1'], 'small')
+        results = grid.fit(cache=cache)
+        assert cache.hits == 0 and results.skipped == {'small': n}
+
+        iv = IVGrid(data, cov_type='cluster', groups='bank')
+        iv.add('y', ['x1'], ['z', 'x2'], model='iv')
+        n_iv = iv.fit(cache=cache)['iv'].n_obs
+        strict = IVGrid(data, min_obs=n_iv + 1, cov_type='cluster', groups='bank')
+        strict.add('y', ['x1'], ['z', 'x2'], model='iv')
+        assert strict.fit(cache=cache).skipped == {'iv': n_iv}
+
+    def test_iv_and_bootstrap(self, data, cache):
+        """IV fits and bootstrap p-values are cached per model as well."""
+        def iv():
+            grid = IVGrid(data, cov_type='cluster', groups='bank')
+            grid.add('y', ['x1'], ['z', 'x2'], model='iv')
+            return grid.fit(cache=cache)['iv']
+
+        pd.testing.assert_series_equal(iv().bse, iv().bse)
+        designs = {'full': _grid(data).design('full')}
+        boot = [wild_cluster_bootstrap(designs, n_draws=99, n_jobs=1, cache=cache) for _ in range(2)]
+        pd.testing.assert_frame_equal(*boot)
+        assert (cache.hits, cache.misses) == (2, 2)
+
+
+class TestSampleFingerprint:
+    """Fingerprints of complete-case samples."""
+
+    def test_ignores_dropped_rows_and_other_columns(self, data):
+        """Values outside the sample do not change the fingerprint."""
+        before = sample_fingerprint(data, ['y', 'x1', 'x2'], ['bank'])
+        data.loc[0, 'x1'] = 99.0      # row 0 has x2 missing
+        data['unused'] = 0.0
+        assert sample_fingerprint(data, ['y', 'x1', 'x2'], ['bank']) == before
+
+    def test_sees_values_and_labels(self, data):
+        """A changed value or cluster label changes the fingerprint."""
+        before = sample_fingerprint(data, ['y', 'x1'], ['bank'])
+        relabeled = data.assign(bank=data['bank'].where(data.index != 5, 'other'))
+        assert sample_fingerprint(relabeled, ['y', 'x1'], ['bank']) != before
+        assert sample_fingerprint(data.assign(y=data['y'] + 1e-12), ['y', 'x1'], ['bank']) != before
+
+
+class TestResultCache:
+    """Store behaviour."""
+
+    def test_other_runs_invalidated(self, tmp_path):
+        """Opening the cache for a new merged run drops the old run's entries."""
+        path = tmp_path / 'results.sqlite'
+        ResultCache(path, source='run1').put('k', {'a': 1}, label='model')
+        assert ResultCache(path, source='run1').get('k') == {'a': 1}
+        reopened = ResultCache(path, source='run2')
+        assert reopened.get('k') is None
+        assert reopened.entries().empty
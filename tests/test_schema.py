@@ -0,0 +1,116 @@
+"""
+Tests for the table schema registry.
+
+Ensures that:
+1. Keys are categorical, years int16 and flags nullable booleans
+2. Missing values fall back to nullable integer dtypes
+3. Aligned categories give identical merge results to string keys
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import utils
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from utils.schema import SCHEMAS, align_categories, apply_schema, memory_report, read_table
+
+
+@pytest.fixture
+def merged():
+    return pd.DataFrame({
+        'instrument': ['AAA.N', 'BBB.O', 'AAA.N'],
+        'year': [2018.0, 2019.0, 2019.0],
+        'DD_a': [1.5, np.nan, 3.25],
+        'a_weak_E_proxy': [True, False, True],
+        'a_naive_status': ['ok', 'ok', 'no_E'],
+        'm_covid': [0.0, np.nan, 1.0],
+    })
+
+
+class TestApplySchema:
+    """Casting frames to registered schemas."""
+
+    def test_merged_dtypes(self, merged):
+        """Prefixed columns of the merged output pick up their source schemas."""
+        typed = apply_schema(merged, 'merged')
+        assert isinstance(typed['instrument'].dtype, pd.CategoricalDtype)
+        assert isinstance(typed['a_naive_status'].dtype, pd.CategoricalDtype)
+        assert typed['year'].dtype == np.int16
+        assert str(typed['a_weak_E_proxy'].dtype) == 'boolean'
+        assert str(typed['m_covid'].dtype) == 'Int8'
+        assert typed['DD_a'].dtype == np.float64
+        assert apply_schema(merged, 'merged', compact_floats=True)['DD_a'].dtype == np.float32
+        # Input is not modified
+        assert merged['instrument'].dtype != 'category'
+
+    def test_non_integral_left_alone(self):
+        """A column that is not integral keeps its values."""
+        df = pd.DataFrame({'instrument': ['A'], 'year': [2018.5]})
+        assert apply_schema(df, 'book2_clean')['year'].iloc[0] == 2018.5
+
+    def test_unknown_schema(self, merged):
+        with pytest.raises(KeyError):
+            apply_schema(merged, 'nope')
+
+
+class TestReadTable:
+    """Schema applied while reading CSVs."""
+
+    def test_read_and_report(self, tmp_path):
+        """Categorical keys are parsed directly; the report shows the savings."""
+        n = 500
+        df = pd.DataFrame({
+            'ticker_base': np.repeat([f'BANK{i}' for i in range(50)], n // 50),
+            'year': np.tile(np.arange(2016, 2026), n // 10),
+            'sigma_E': np.linspace(0.1, 0.5, n),
+            'sigma_E_method': 'monthly36',
+            'sigma_E_window_months': 36,
+        })
+        path = tmp_path / 'equity_volatility_by_year.csv'
+        df.to_csv(path, index=False)
+
+        typed = read_table(path, 'equity_volatility_by_year')
+        assert isinstance(typed['ticker_base'].dtype, pd.CategoricalDtype)
+        assert typed['year'].dtype == np.int16
+        assert typed['sigma_E_window_months'].dtype == np.int16
+        assert np.allclose(typed['sigma_E'], df['sigma_E'])
+
+        report = memory_report({'equity_volatility_by_year': path}, merge_keys=None)
+        assert report.loc[0, 'bytes_schema'] < report.loc[0, 'bytes_default']
+        assert report.loc[0, 'bytes_schema_float32'] < report.loc[0, 'bytes_schema']
+
+    @pytest.mark.parametrize('engine', ['c', 'pyarrow'])
+    def test_integer_column_with_gaps(self, tmp_path, engine):
+        """Window years missing for bank-years without returns read as nullable integers."""
+        if engine == 'pyarrow':
+            pytest.importorskip('pyarrow')
+        path = tmp_path / 'equity_volatility_by_year.csv'
+        pd.DataFrame({
+            'ticker_base': ['A', 'A', 'B'],
+            'year': [2018, 2019, 2019],
+            'sigmaE_window_start_year': [2015, 2016, None],
+        }).to_csv(path, index=False)
+
+        typed = read_table(path, 'equity_volatility_by_year', engine=engine)
+        assert typed['year'].dtype == np.int16
+        assert typed['sigmaE_window_start_year'].dtype == 'Int16'
+        assert typed['sigmaE_window_start_year'].isna().tolist() == [False, False, True]
+
+
+class TestAlignCategories:
+    """Merges on aligned categorical keys."""
+
+    def test_merge_matches_string_merge(self, merged):
+        """Aligned categorical keys give the same merge as string keys."""
+        right = pd.DataFrame({'instrument': ['BBB.O', 'CCC.K', 'AAA.N'], 'year': [2019, 2019, 2018], 'x': [1, 2, 3]})
+        expected = merged.merge(right, on=['instrument', 'year'], how='left')
+
+        left_t, right_t = align_categories(apply_schema(merged, 'merged'), apply_schema(right, SCHEMAS['book2_clean']))
+        assert left_t['instrument'].cat.categories.equals(right_t['instrument'].cat.categories)
+        result = left_t.merge(right_t, on=['instrument', 'year'], how='left')
+        assert isinstance(result['instrument'].dtype, pd.CategoricalDtype)
+        assert result['instrument'].astype(str).tolist() == expected['instrument'].tolist()
+        assert np.array_equal(result['x'].to_numpy(dtype=float), expected['x'].to_numpy(dtype=float), equal_nan=True)
@@ -0,0 +1,91 @@
+"""
+Tests for the shared ticker resolver.
+
+Ensures that:
+1. Manual exceptions win over List_bank symbols, which win over suffix rules
+2. Delisted RICs with a ``^`` tag resolve to their List_bank ticker
+3. Identifiers outside List_bank are reported, not silently passed on
+4. The persisted crosswalk is reused until a source file changes
+"""
+
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from utils.tickers import CROSSWALK_NAME, TickerResolver, build_crosswalk, strip_suffix
+
+
+@pytest.fixture
+def sources(tmp_path):
+    """Exceptions CSV and List_bank workbook in a clean directory."""
+    clean = tmp_path / 'clean'
+    clean.mkdir()
+    pd.DataFrame({
+        'return_instrument': ['MCHB', 'CIZNV.OQ'],
+        'list_bank_ticker': ['HMST', 'CIZN'],
+        'reason': ['ticker_change', 'spelling_variation'],
+        'notes': ['', ''],
+    }).to_csv(clean / 'ticker_mapping_exceptions.csv', index=False)
+    pd.DataFrame({
+        'Ticker': ['ABCB', 'CIZN', 'HMST', 'BHLB'],
+        'Company': ['Ameris', 'Citizens', 'HomeStreet', 'Berkshire Hills'],
+        'Symbol': ['ABCB.N', 'CIZnv.OQ^J24', 'MCHB.O', 'BHLIP.PK^B11'],
+        'PermId': [4295905573, 4295912100, 5000000001, 4295906000],
+    }).to_excel(clean / 'List_bank.xlsx', index=False)
+    return clean
+
+
+class TestResolution:
+    """Mapping identifiers to base tickers."""
+
+    def test_suffix_rules(self):
+        """Delisting tags and exchange suffixes are stripped."""
+        stripped = strip_suffix(pd.Series(['ABCB.N', 'EBTC.OQ^G25', 'JPM', 'X.PK']))
+        assert stripped.tolist() == ['ABCB', 'EBTC', 'JPM', 'X']
+
+    def test_sources_and_priority(self, sources):
+        """Exceptions, then List_bank symbols/tickers, then suffix rules."""
+        crosswalk = build_crosswalk(sources / 'ticker_mapping_exceptions.csv', sources / 'List_bank.xlsx')
+        assert crosswalk.set_index('identifier').loc['MCHB', 'source'] == 'exception'
+        assert crosswalk.set_index('identifier').loc['ABCB.N', 'source'] == 'list_bank_symbol'
+        assert crosswalk['perm_id'].notna().all()
+
+        resolver = TickerResolver(crosswalk)
+        ids = pd.Series(['ABCB.N', 'CIZnv.OQ^J24', 'MCHB.O', 'BHLIP.PK^B11', 'MCHB.K', 'ABCB', None])
+        assert resolver.resolve(ids).tolist() == ['ABCB', 'CIZN', 'HMST', 'BHLB', 'HMST', 'ABCB', None]
+
+    def test_unresolved_are_reported(self, sources):
+        """Unknown identifiers keep their stripped form and appear in the report."""
+        resolver = TickerResolver.from_clean_dir(sources, cache_dir=None)
+        ids = pd.Series(['ABCB.N', 'ZZZ.OQ', 'ZZZ.OQ', 'ABCB.N'])
+        assert resolver.resolve(ids).tolist() == ['ABCB', 'ZZZ', 'ZZZ', 'ABCB']
+        report = resolver.report(ids)
+        assert report.to_dict('records') == [{'identifier': 'ZZZ.OQ', 'ticker_base': 'ZZZ', 'rows': 2}]
+
+    def test_categorical_input_stays_categorical(self, sources):
+        """Categorical columns are resolved per category and stay categorical."""
+        resolver = TickerResolver.from_clean_dir(sources, cache_dir=None)
+        ids = pd.Series(pd.Categorical(['MCHB.O', 'ABCB.N', 'MCHB.O']), index=[10, 11, 12])
+        resolved = resolver.resolve(ids)
+        assert isinstance(resolved.dtype, pd.CategoricalDtype)
+        assert list(resolved.index) == [10, 11, 12]
+        assert resolved.astype(str).tolist() == ['HMST', 'ABCB', 'HMST']
+
+
+class TestCrosswalkCache:
+    """Persisted crosswalk."""
+
+    def test_cache_reused_until_sources_change(self, sources, tmp_path):
+        """A changed exceptions file invalidates the cached crosswalk."""
+        cache = tmp_path / 'cache'
+        first = TickerResolver.from_clean_dir(sources, cache_dir=cache)
+        assert (cache / CROSSWALK_NAME).exists()
+        again = TickerResolver.from_clean_dir(sources, cache_dir=cache)
+        pd.testing.assert_frame_equal(first.crosswalk, again.crosswalk, check_dtype=False)
+
+        with open(sources / 'ticker_mapping_exceptions.csv', 'a') as fh:
+            fh.write('ABCB.XX,BHLB,test,\n')
+        rebuilt = TickerResolver.from_clean_dir(sources, cache_dir=cache)
+        assert rebuilt.resolve(pd.Series(['ABCB.XX'])).tolist() == ['BHLB']
@@ -15,7 +15,20 @@ from pathlib import Path
 
 # Add parent directory to path to import utils
 sys.path.insert(0, str(Path(__file__).parent.parent))
-from utils.time_checks import assert_time_integrity, validate_no_lookahead
+from utils.panel import PanelIndex
+from utils.time_checks import (
+    MU_SOURCE_NOT_TMINUS1,
+    SIGMA_END_NOT_TMINUS1,
+    WINDOW_INCLUDES_FUTURE,
+    assert_sigma_windows,
+    assert_time_integrity,
+    audit_sigma_windows,
+    build_monthly_return_index,
+    drop_time_violations,
+    find_time_violations,
+    summarize_time_violations,
+    validate_no_lookahead,
+)
 
 
 def create_test_panel(n_firms=2, n_years=4):
@@ -34,14 +47,10 @@ def create_test_panel(n_firms=2, n_years=4):
 def compute_sigma_E_tminus1(df):
     """Compute σ_E using only data up to t-1."""
     df = df.sort_values(['instrument', 'year'])
+    panel = PanelIndex.from_frame(df)
     
-    def rolling_sigma_prior(s):
-        return s.shift(1).rolling(3, min_periods=2).std()
-    
-    df['sigma_E_tminus1'] = df.groupby('instrument', group_keys=False)['rit'].apply(rolling_sigma_prior)
-    df['sigmaE_count'] = df.groupby('instrument', group_keys=False)['rit'].apply(
-        lambda s: s.shift(1).rolling(3, min_periods=1).count()
-    )
+    df['sigma_E_tminus1'] = panel.rolling(df['rit'], window=3, func='std', min_periods=2, lag=1)
+    df['sigmaE_count'] = panel.rolling(df['rit'], window=3, func='count', min_periods=0, lag=1).fillna(0)
     df['sigmaE_window_end_year'] = df['year'] - 1
     # Only set window start when we have data
     df['sigmaE_window_start_year'] = np.where(
@@ -57,7 +66,7 @@ def compute_mu_hat(df):
     """Compute μ̂ = r_{i,t-1}."""
     df = df.sort_values(['instrument', 'year'])
     df['mu_hat_from'] = 'rit_tminus1'
-    df['mu_hat'] = df.groupby('instrument', group_keys=False)['rit'].shift(1)
+    df['mu_hat'] = PanelIndex.from_frame(df).lag(df['rit'])
     df['mu_source_year'] = df['year'] - 1
     return df
 
@@ -193,5 +202,143 @@ class TestRollingVolatilityComputation:
         assert np.isclose(actual_sigma_2024, expected_sigma_2024)
 
 
+class TestTimeViolationIndex:
+    """Test the row-level time integrity violation index."""
+    
+    def create_valid_panel(self):
+        df = create_test_panel(n_firms=2, n_years=4)
+        df = compute_sigma_E_tminus1(df)
+        return compute_mu_hat(df)
+    
+    def test_valid_data_has_no_violations(self):
+        """Test that valid data produces an empty index."""
+        violations = find_time_violations(self.create_valid_panel())
+        
+        assert violations.empty
+    
+    def test_index_records_rows_and_rules(self):
+        """Test that each offending row is listed once with all failed rules."""
+        df = self.create_valid_panel()
+        bad_window = df.index[(df['instrument'] == 'A') & (df['year'] == 2022)][0]
+        bad_mu = df.index[(df['instrument'] == 'B') & (df['year'] == 2021)][0]
+        df.loc[bad_window, 'sigmaE_window_end_year'] = 2022
+        df.loc[bad_mu, 'mu_source_year'] = 2021
+        
+        violations = find_time_violations(df).set_index('row_id')['violations']
+        
+        assert sorted(violations.index) == sorted([bad_window, bad_mu])
+        assert violations[bad_window] == SIGMA_END_NOT_TMINUS1 | WINDOW_INCLUDES_FUTURE
+        assert violations[bad_mu] == MU_SOURCE_NOT_TMINUS1
+    
+    def test_chunked_and_streamed_validation_agree(self):
+        """Test that chunked and streamed validation give the same index."""
+        df = self.create_valid_panel().reset_index(drop=True)
+        df.loc[[1, 6], 'sigmaE_window_end_year'] = 2030
+        
+        full = find_time_violations(df)
+        chunked = find_time_violations(df, chunksize=3)
+        streamed = find_time_violations(df.iloc[i:i + 2] for i in range(0, len(df), 2))
+        
+        pd.testing.assert_frame_equal(full, chunked)
+        pd.testing.assert_frame_equal(full, streamed)
+        assert full['row_id'].tolist() == [1, 6]
+    
+    def test_drop_removes_only_offending_rows(self):
+        """Test that drop_time_violations keeps clean rows and logs the rest."""
+        df = self.create_valid_panel()
+        df.loc[df['year'] == 2023, 'sigmaE_window_end_year'] = 2023
+        
+        clean, log = drop_time_violations(df, verbose=False)
+        
+        assert len(clean) == len(df) - 2
+        assert_time_integrity(clean)
+        assert sorted(log['instrument']) == ['A', 'B']
+        assert log['rules'].str.contains('cannot include current or future years').all()
+        counts = summarize_time_violations(find_time_violations(df)).set_index('rule')['n_violations']
+        assert counts[SIGMA_END_NOT_TMINUS1] == 2
+    
+    def test_drop_with_duplicate_index_labels(self):
+        """Test that rows sharing an index label with a violation are kept."""
+        panel = self.create_valid_panel()
+        bad = panel[panel['instrument'] == 'A'].copy()
+        bad.loc[bad['year'] == 2023, 'sigmaE_window_end_year'] = 2023
+        df = pd.concat([bad, panel[panel['instrument'] == 'B'].set_axis(bad.index)])
+        
+        clean, log = drop_time_violations(df, verbose=False)
+        
+        assert len(clean) == len(df) - 1
+        assert log[['instrument', 'year']].values.tolist() == [['A', 2023]]
+        assert_time_integrity(clean)
+        assert find_time_violations(df)['position'].tolist() == [int(np.flatnonzero(bad['year'] == 2023)[0])]
+
+
+class TestSigmaWindowAudit:
+    """Test the deep σ_E window audit against monthly returns."""
+    
+    def create_monthly_index(self):
+        dates = pd.date_range('2013-01-31', '2019-12-31', freq='ME')
+        monthly = pd.DataFrame({
+            'ticker_base': ['A'] * len(dates) + ['B'] * 20,
+            'date': list(dates) + list(dates[-20:]),
+            'log_return': 0.01,
+        })
+        return build_monthly_return_index(monthly)
+    
+    def create_declared_panel(self):
+        df = pd.DataFrame({
+            'instrument': ['A', 'A', 'B', 'B'],
+            'year': [2016, 2019, 2019, 2020],
+            'sigma_E_window_months': [36, 36, 8, 20],
+        })
+        df['sigmaE_window_end_year'] = df['year'] - 1
+        df['sigmaE_window_start_year'] = df['year'] - 3
+        return df
+    
+    def test_consistent_windows_pass(self):
+        """Test that windows matching the monthly data pass the audit."""
+        df = self.create_declared_panel()
+        audit = audit_sigma_windows(df, self.create_monthly_index())
+        
+        assert audit['ok'].all()
+        assert audit['derived_months'].tolist() == [36, 36, 8, 20]
+        # A in 2016 uses Jan 2013 - Dec 2015
+        assert audit.loc[0, 'derived_first_month'] == 2013 * 12
+        assert audit.loc[0, 'derived_last_month'] == 2015 * 12 + 11
+        assert_sigma_windows(df, self.create_monthly_index())
+    
+    def test_count_needing_current_year_is_flagged(self):
+        """Test that a declared count only reachable with year-t data fails."""
+        df = self.create_declared_panel()
+        df.loc[2, 'sigma_E_window_months'] = 20  # B has only 8 months before 2019
+        
+        audit = audit_sigma_windows(df, self.create_monthly_index())
+        
+        assert audit['count_mismatch'].tolist() == [False, False, True, False]
+        with pytest.raises(AssertionError, match="month count differs"):
+            assert_sigma_windows(df, self.create_monthly_index())
+    
+    def test_window_outside_declared_years_is_flagged(self):
+        """Test that months before the declared start year are flagged."""
+        df = self.create_declared_panel()
+        df.loc[1, 'sigmaE_window_start_year'] = 2017  # 36 months reach back to 2016
+        
+        audit = audit_sigma_windows(df, self.create_monthly_index())
+        
+        assert audit['outside_declared_window'].tolist() == [False, True, False, False]
+    
+    def test_partial_window_start_is_first_month_year(self):
+        """Test that a partial window starts in the year of its first return, not end - months / 12."""
+        df = self.create_declared_panel()
+        # B in 2020 uses 20 months, May 2018 - Dec 2019
+        df['sigmaE_window_start_year'] = [2013, 2016, 2018, 2018]
+        assert_sigma_windows(df, self.create_monthly_index())
+        
+        months = df['sigma_E_window_months']
+        df['sigmaE_window_start_year'] = df['sigmaE_window_end_year'] - (months / 12 - 1).clip(lower=0).astype(int)
+        audit = audit_sigma_windows(df, self.create_monthly_index())
+        
+        assert audit['outside_declared_window'].tolist() == [False, False, False, True]
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
@@ -0,0 +1,303 @@
+"""
+Tests for winsorization utilities.
+
+Ensures that:
+1. Fitted bounds match the percentiles recomputed by trim_by_year_size
+2. Saved bounds can be reloaded and applied to new data
+3. Rows from unseen groups fall back to overall bounds
+4. Sketch error reports count the observations between exact and approximate bounds
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import utils
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from utils.quantile_sketch import KLLSketch, build_group_sketches, merge_group_sketches
+from utils.winsorization import (
+    GroupWinsorizer,
+    build_winsorization_report,
+    export_winsorization_report,
+    fit_streaming_winsorizer,
+    sketch_error_report,
+    trim_by_year_size,
+    trim_sensitivity_grid,
+    unpack_keep_mask,
+    winsorize_chunks,
+    winsorizer_from_sketches,
+)
+
+
+def create_dd_panel(n_per_group=40, years=(2016, 2017), seed=0):
+    """Create a panel with DD values spread across year-size groups."""
+    rng = np.random.default_rng(seed)
+    data = []
+    for year in years:
+        for size in (0, 1):
+            for i in range(n_per_group):
+                data.append({
+                    'instrument': f'B{size}{i:03d}',
+                    'year': year,
+                    'dummylarge': size,
+                    'DD_a': rng.standard_t(3) * 3 + 5 + size,
+                    'DD_m': rng.standard_t(3) * 2 + 4,
+                })
+    df = pd.DataFrame(data)
+    df.loc[::17, 'DD_m'] = np.nan
+    return df
+
+
+class TestGroupWinsorizer:
+    """Test suite for fitted winsorization bounds."""
+
+    def test_trim_matches_trim_by_year_size(self):
+        """Test that fitted trimming keeps the same rows as trim_by_year_size."""
+        df = create_dd_panel()
+        expected = trim_by_year_size(df, ['DD_a', 'DD_m'], report=False)
+
+        trimmed = GroupWinsorizer(['DD_a', 'DD_m']).fit_transform(df, mode='trim')
+
+        assert trimmed.index.equals(expected.index)
+
+    def test_clip_stays_within_group_bounds(self):
+        """Test that clipped values lie within their group's bounds."""
+        df = create_dd_panel()
+        wins = GroupWinsorizer(['DD_a']).fit(df)
+        out = wins.transform(df)
+
+        group = (out['year'] == 2016) & (out['dummylarge'] == 1)
+        p_low, p_high = df.loc[group, 'DD_a'].quantile([0.01, 0.99])
+        assert out.loc[group, 'DD_a_wins'].min() == pytest.approx(p_low)
+        assert out.loc[group, 'DD_a_wins'].max() == pytest.approx(p_high)
+        assert out['DD_a'].equals(df['DD_a'])
+
+    def test_missing_values_are_preserved(self):
+        """Test that NaN inputs stay NaN after clipping."""
+        df = create_dd_panel()
+        out = GroupWinsorizer(['DD_m']).fit_transform(df)
+
+        assert out['DD_m_wins'].isna().equals(df['DD_m'].isna())
+
+    def test_unseen_group_uses_overall_bounds(self):
+        """Test that a new year is clipped with the overall bounds."""
+        df = create_dd_panel()
+        wins = GroupWinsorizer(['DD_a']).fit(df)
+
+        new = pd.DataFrame({'year': [2030, 2030], 'dummylarge': [0, 1], 'DD_a': [1e6, -1e6]})
+        out = wins.transform(new)
+        p_low, p_high = df['DD_a'].quantile([0.01, 0.99])
+
+        assert out['DD_a_wins'].tolist() == pytest.approx([p_high, p_low])
+        assert wins.transform(new, fallback=None)['DD_a_wins'].tolist() == [1e6, -1e6]
+
+    def test_small_groups_are_left_untouched(self):
+        """Test that groups below min_obs get no bounds."""
+        df = create_dd_panel(n_per_group=5)
+        out = GroupWinsorizer(['DD_a']).fit_transform(df)
+
+        assert np.allclose(out['DD_a_wins'], df['DD_a'])
+
+    def test_json_round_trip(self, tmp_path):
+        """Test that bounds saved to JSON reproduce the same transform."""
+        df = create_dd_panel()
+        wins = GroupWinsorizer(['DD_a', 'DD_m']).fit(df)
+        path = tmp_path / 'bounds.json'
+        wins.to_json(path)
+
+        loaded = GroupWinsorizer.from_json(path)
+
+        pd.testing.assert_frame_equal(loaded.transform(df), wins.transform(df))
+
+    def test_parquet_round_trip(self, tmp_path):
+        """Test that bounds saved to Parquet reproduce the same transform."""
+        pytest.importorskip('pyarrow')
+        df = create_dd_panel()
+        wins = GroupWinsorizer(['DD_a', 'DD_m']).fit(df)
+        path = tmp_path / 'bounds.parquet'
+        wins.to_parquet(path)
+
+        loaded = GroupWinsorizer.from_parquet(path)
+
+        pd.testing.assert_frame_equal(loaded.transform(df), wins.transform(df))
+
+    def test_transform_before_fit_raises(self):
+        """Test that transform requires a fitted winsorizer."""
+        with pytest.raises(ValueError, match="must be fitted"):
+            GroupWinsorizer(['DD_a']).transform(create_dd_panel())
+
+
+class TestWinsorizationReport:
+    """Test suite for the winsorization audit export."""
+
+    def test_report_lists_only_changed_rows(self):
+        """Test that NaN rows are not reported as winsorized."""
+        df = create_dd_panel()
+        df = GroupWinsorizer(['DD_a', 'DD_m']).fit_transform(df)
+        report = build_winsorization_report(df, ['DD_a', 'DD_m'])
+
+        for col in ['DD_a', 'DD_m']:
+            changed = df[col].notna() & (df[col] != df[f'{col}_wins'])
+            assert (report['variable'] == col).sum() == changed.sum()
+        assert report['original_value'].notna().all()
+
+    def test_report_direction_and_change(self):
+        """Test that direction and change follow the clipped side."""
+        df = pd.DataFrame({
+            'instrument': ['A', 'B', 'C'],
+            'year': [2016, 2016, 2016],
+            'dummylarge': [1, 0, 0],
+            'DD_a': [20.0, -3.0, np.nan],
+            'DD_a_wins': [15.0, -1.0, np.nan],
+        })
+        report = build_winsorization_report(df, ['DD_a'])
+
+        assert report['direction'].tolist() == ['upper', 'lower']
+        assert report['change'].tolist() == [-5.0, 2.0]
+        assert report['size_category'].tolist() == ['Large', 'Small/Mid']
+
+    def test_export_writes_csv_and_parquet(self, tmp_path):
+        """Test that the export writes the same table to CSV and Parquet."""
+        pytest.importorskip('pyarrow')
+        df = GroupWinsorizer(['DD_a']).fit_transform(create_dd_panel())
+        csv_path = tmp_path / 'report.csv'
+        parquet_path = tmp_path / 'report.parquet'
+
+        export_winsorization_report(df, ['DD_a'], csv_path, parquet_path=parquet_path)
+
+        assert len(pd.read_csv(csv_path)) == len(pd.read_parquet(parquet_path)) > 0
+
+
+class TestStreamingWinsorization:
+    """Test suite for sketch-based streaming winsorization."""
+
+    def test_sketch_is_exact_below_capacity(self):
+        """Test that small samples give the same quantiles as pandas."""
+        values = pd.Series(np.random.default_rng(1).normal(size=150))
+        sketch = KLLSketch(k=200).update(values)
+
+        assert sketch.is_exact
+        assert sketch.quantile([0.01, 0.99]) == pytest.approx(values.quantile([0.01, 0.99]).to_numpy())
+
+    def test_sketch_rank_error_is_bounded(self):
+        """Test that a compacted sketch stays within a small rank error."""
+        values = np.random.default_rng(2).standard_t(3, size=50_000)
+        sketch = KLLSketch(k=200, seed=0)
+        for chunk in np.array_split(values, 25):
+            sketch.update(chunk)
+
+        assert not sketch.is_exact
+        for q in (0.01, 0.5, 0.99):
+            rank = (values <= sketch.quantile(q)[0]).mean()
+            assert abs(rank - q) < 0.02
+
+    def test_merged_sketches_cover_all_chunks(self):
+        """Test that sketches built by separate workers can be combined."""
+        df = create_dd_panel(n_per_group=300)
+        half = len(df) // 2
+        left = build_group_sketches([df.iloc[:half]], ['DD_a'], seed=0)
+        right = build_group_sketches([df.iloc[half:]], ['DD_a'], seed=1)
+
+        merged = merge_group_sketches(left, right)
+
+        assert merged[('DD_a', None)].n == df['DD_a'].notna().sum()
+        assert merged[('DD_a', (2016, 1))].n == 300
+        wins = winsorizer_from_sketches(merged, ['DD_a'])
+        assert len(wins.bounds_) == 5
+
+    def test_merged_sketches_are_reproducible(self):
+        """Test that merging seeded sketches gives the same bounds on every run."""
+        df = create_dd_panel(n_per_group=2000)
+        half = len(df) // 2
+        left = build_group_sketches([df.iloc[:half]], ['DD_a'], k=20, seed=0)
+        right = build_group_sketches([df.iloc[half:]], ['DD_a'], k=20, seed=0)
+
+        first = merge_group_sketches(left, right)[('DD_a', None)]
+        second = merge_group_sketches(left, right)[('DD_a', None)]
+
+        assert first.seed == 0 and not first.is_exact
+        assert first.quantile([0.01, 0.5, 0.99]) == pytest.approx(second.quantile([0.01, 0.5, 0.99]), abs=0)
+
+    def test_streaming_fit_matches_exact_for_small_groups(self):
+        """Test that groups below k get the exact bounds."""
+        df = create_dd_panel()
+        chunks = [df.iloc[i:i + 30] for i in range(0, len(df), 30)]
+
+        streamed = fit_streaming_winsorizer(chunks, ['DD_a', 'DD_m'], k=200)
+        exact = GroupWinsorizer(['DD_a', 'DD_m']).fit(df)
+
+        out = pd.concat(winsorize_chunks(chunks, streamed))
+        pd.testing.assert_frame_equal(out, exact.transform(df))
+
+    def test_sketch_error_report_rank_error(self):
+        """Test that the rank error is the share of a group's values strictly between the two bounds."""
+        df = create_dd_panel(n_per_group=600)
+        report = sketch_error_report(df, ['DD_a', 'DD_m'], k=50, chunksize=100)
+
+        assert (report['rank_err_high'] > 0).any()
+        for row in report.itertuples():
+            mask = df[row.variable].notna()
+            if row.scope == 'group':
+                mask &= (df['year'] == row.year) & (df['dummylarge'] == row.dummylarge)
+            values = df.loc[mask, row.variable]
+            for side in ('low', 'high'):
+                lo, hi = sorted([getattr(row, f'p_{side}_exact'), getattr(row, f'p_{side}_approx')])
+                expected = ((values > lo) & (values < hi)).mean()
+                assert getattr(row, f'rank_err_{side}') == pytest.approx(expected)
+
+
+class TestTrimSensitivityGrid:
+    """Test suite for the multi-percentile trimming grid."""
+
+    PAIRS = [(0.01, 0.99), (0.025, 0.975), (0.05, 0.95)]
+
+    def test_masks_match_trim_by_year_size(self):
+        """Test that every pair keeps the same rows as trim_by_year_size."""
+        df = create_dd_panel()
+        grid = trim_sensitivity_grid(df, ['DD_a', 'DD_m'], self.PAIRS)
+
+        for pair in self.PAIRS:
+            expected = trim_by_year_size(df, ['DD_a', 'DD_m'], percentiles=pair, report=False)
+            keep = unpack_keep_mask(grid['masks'][pair], grid['n_rows'])
+            assert df.index[keep].equals(expected.index)
+
+    def test_missing_group_keys_are_not_trimmed(self):
+        """Test that rows with a missing year or size are kept, as in trim_by_year_size."""
+        df = create_dd_panel()
+        extreme = df['DD_a'].abs().nlargest(4).index
+        df.loc[extreme[:2], 'year'] = np.nan
+        df.loc[extreme[2:], 'dummylarge'] = np.nan
+        grid = trim_sensitivity_grid(df, ['DD_a', 'DD_m'], self.PAIRS)
+
+        for pair in self.PAIRS:
+            expected = trim_by_year_size(df, ['DD_a', 'DD_m'], percentiles=pair, report=False)
+            keep = unpack_keep_mask(grid['masks'][pair], grid['n_rows'])
+            assert df.index[keep].equals(expected.index)
+            assert keep[df.index.get_indexer(extreme)].all()
+        assert grid['bounds'][['year', 'dummylarge']].notna().all().all()
+
+    def test_overall_bounds_match_quantiles(self):
+        """Test that ungrouped bounds equal Series.quantile."""
+        df = create_dd_panel()
+        grid = trim_sensitivity_grid(df, ['DD_a'], [(0.05, 0.95)], group_cols=None)
+
+        row = grid['bounds'].iloc[0]
+        assert row['p_low'] == df['DD_a'].quantile(0.05)
+        assert row['p_high'] == df['DD_a'].quantile(0.95)
+
+    def test_summary_counts_and_input_untouched(self):
+        """Test that summary counts agree with masks and df is not modified."""
+        df = create_dd_panel()
+        before = df.copy()
+        grid = trim_sensitivity_grid(df, ['DD_a', 'DD_m'], self.PAIRS)
+
+        for _, row in grid['summary'].iterrows():
+            keep = unpack_keep_mask(grid['masks'][(row['q_low'], row['q_high'])], grid['n_rows'])
+            assert row['n_remaining'] == keep.sum()
+        pd.testing.assert_frame_equal(df, before)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
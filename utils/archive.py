@@ -0,0 +1,364 @@
+"""
+Content-addressed archive for superseded stage outputs.
+
+Archived files are split into fixed-size chunks stored once under their
+SHA-256 (``blobs/ab/abcdef....``), compressed when that helps. A SQLite
+catalog maps each archived file (dataset type, run id, name, hash) to its
+chunk list. Archiving a file whose content is already stored writes no
+new blobs, so identical reruns cost one hash; retention is applied to the
+catalog, and blobs no longer referenced are garbage-collected.
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import pandas as pd
+
+from utils.pipeline import hash_file
+
+CATALOG_NAME = 'catalog.sqlite'
+CHUNK_SIZE = 4 << 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    archive_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dataset_type TEXT NOT NULL,
+    run_id TEXT,
+    name TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    chunks TEXT NOT NULL,
+    archived TEXT NOT NULL,
+    UNIQUE (name, sha256)
+);
+"""
+
+_COLUMNS = ['archive_id', 'dataset_type', 'run_id', 'name', 'sha256', 'size', 'chunks', 'archived']
+
+# Blob header: compressed or stored as-is (Parquet is already compressed)
+_ZLIB, _RAW = b'Z', b'R'
+
+
+def output_pattern(dataset_type: str) -> 're.Pattern':
+    """Regex for ``{dataset_type}_YYYYMMDD_HHMMSS.<ext>`` file names (run id in group 1)."""
+    return re.compile(rf'^{re.escape(dataset_type)}_(\d{{8}}_\d{{6}})\.\w+$')
+
+
+class ArchiveStore:
+    """
+    Deduplicating archive of output files.
+
+    Parameters
+    ----------
+    root : str or Path
+        Archive directory (e.g., ``archive/datasets``)
+    chunk_size : int, default 4 MiB
+        Chunk size used to split files
+
+    Notes
+    -----
+    Archiving from concurrent stages is safe (blob writes are atomic and
+    the catalog is transactional); ``prune`` should not run while stages
+    are archiving.
+    """
+
+    def __init__(self, root: Union[str, Path], chunk_size: int = CHUNK_SIZE):
+        self.root = Path(root)
+        self.chunk_size = int(chunk_size)
+        self.catalog_path = self.root / CATALOG_NAME
+
+    def _connect(self) -> sqlite3.Connection:
+        self.root.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.catalog_path, timeout=30)
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.root / 'blobs' / digest[:2] / digest
+
+    def _entry(self, row) -> Dict:
+        entry = dict(zip(_COLUMNS, row))
+        entry['chunks'] = json.loads(entry['chunks'])
+        return entry
+
+    def _put_chunk(self, data: bytes) -> Dict:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        if path.exists():
+            return {'digest': digest, 'written': 0}
+        packed = zlib.compress(data, 6)
+        payload = _ZLIB + packed if len(packed) < len(data) else _RAW + data
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f'{digest}.{time.time_ns()}.tmp')
+        tmp_path.write_bytes(payload)
+        tmp_path.replace(path)
+        return {'digest': digest, 'written': len(payload)}
+
+    def _get_chunk(self, digest: str) -> bytes:
+        payload = self._blob_path(digest).read_bytes()
+        return zlib.decompress(payload[1:]) if payload[:1] == _ZLIB else payload[1:]
+
+    def add(self, path: Union[str, Path], dataset_type: str, run_id: Optional[str] = None) -> Dict:
+        """
+        Archive a file.
+
+        Parameters
+        ----------
+        path : str or Path
+            File to archive (left in place)
+        dataset_type : str
+            Output name ('accounting', 'market', 'outliers_market', ...)
+        run_id : str, optional
+            Run identifier; parsed from ``{dataset_type}_<run_id>.<ext>``
+            when omitted
+
+        Returns
+        -------
+        Dict
+            Catalog entry plus ``new_bytes``, the bytes written to the
+            blob store (0 when the content was already archived)
+        """
+        path = Path(path)
+        if run_id is None:
+            match = output_pattern(dataset_type).match(path.name)
+            run_id = match.group(1) if match else None
+        digest = hash_file(path)
+
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM files WHERE name = ? AND sha256 = ?", (path.name, digest)).fetchone()
+            if row:
+                return {**self._entry(row), 'new_bytes': 0}
+
+            chunks, new_bytes = [], 0
+            with open(path, 'rb') as fh:
+                for data in iter(lambda: fh.read(self.chunk_size), b''):
+                    stored = self._put_chunk(data)
+                    chunks.append(stored['digest'])
+                    new_bytes += stored['written']
+
+            with conn:
+                cursor = conn.execute(
+                    "INSERT INTO files (dataset_type, run_id, name, sha256, size, chunks, archived) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (dataset_type, run_id, path.name, digest, path.stat().st_size,
+                     json.dumps(chunks), time.strftime('%Y-%m-%d %H:%M:%S'))
+                )
+            row = conn.execute("SELECT * FROM files WHERE archive_id = ?", (cursor.lastrowid,)).fetchone()
+        finally:
+            conn.close()
+        return {**self._entry(row), 'new_bytes': new_bytes}
+
+    def entries(self, dataset_type: Optional[str] = None) -> pd.DataFrame:
+        """
+        Catalog contents, newest run last.
+
+        Parameters
+        ----------
+        dataset_type : str, optional
+            Only entries of this type
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per archived file (archive_id, dataset_type, run_id,
+            name, sha256, size, n_chunks, archived)
+        """
+        columns = [c for c in _COLUMNS if c != 'chunks'] + ['n_chunks']
+        if not self.catalog_path.exists():
+            return pd.DataFrame(columns=columns)
+        conn = self._connect()
+        try:
+            query = "SELECT * FROM files" + (" WHERE dataset_type = ?" if dataset_type else "")
+            rows = conn.execute(query + " ORDER BY dataset_type, run_id, archive_id",
+                                (dataset_type,) if dataset_type else ()).fetchall()
+        finally:
+            conn.close()
+        entries = [self._entry(row) for row in rows]
+        for entry in entries:
+            entry['n_chunks'] = len(entry.pop('chunks'))
+        return pd.DataFrame(entries, columns=columns)
+
+    def get(self, dataset_type: str, run_id: str, name: Optional[str] = None) -> Dict:
+        """
+        Catalog entry of an archived run.
+
+        Parameters
+        ----------
+        dataset_type : str
+            Output name
+        run_id : str
+            Run identifier
+        name : str, optional
+            File name, to choose between formats archived for the same run
+            (Parquet is preferred otherwise)
+
+        Raises
+        ------
+        KeyError
+            If the run is not archived
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT * FROM files WHERE dataset_type = ? AND run_id = ? ORDER BY archive_id DESC",
+                (dataset_type, run_id)
+            ).fetchall()
+        finally:
+            conn.close()
+        entries = [self._entry(row) for row in rows if name is None or row[3] == name]
+        if not entries:
+            raise KeyError(f"Run {run_id} of {dataset_type} is not archived")
+        return max(entries, key=lambda e: e['name'].endswith('.parquet'))
+
+    def restore(
+        self,
+        dataset_type: str,
+        run_id: str,
+        dest_dir: Union[str, Path],
+        name: Optional[str] = None
+    ) -> Path:
+        """
+        Rebuild an archived file into ``dest_dir`` under its original name.
+
+        Raises
+        ------
+        KeyError
+            If the run is not archived
+        IOError
+            If the rebuilt file does not match its recorded hash
+        """
+        entry = self.get(dataset_type, run_id, name)
+        dest_dir = Path(dest_dir)
+        dest_dir.mkdir(parents=True, exist_ok=True)
+        dest = dest_dir / entry['name']
+        tmp_path = dest.with_name(dest.name + '.restoring')
+        with open(tmp_path, 'wb') as fh:
+            for digest in entry['chunks']:
+                fh.write(self._get_chunk(digest))
+        if hash_file(tmp_path) != entry['sha256']:
+            tmp_path.unlink()
+            raise IOError(f"Archived {entry['name']} is corrupt (hash mismatch)")
+        tmp_path.replace(dest)
+        return dest
+
+    def prune(
+        self,
+        keep_last: Optional[int] = None,
+        keep_days: Optional[float] = None,
+        dataset_type: Optional[str] = None
+    ) -> Dict[str, int]:
+        """
+        Apply a retention policy to the catalog and delete unreferenced blobs.
+
+        An entry is kept if it belongs to one of the ``keep_last`` most
+        recent runs of its type or was archived within ``keep_days``.
+        With neither set, nothing is removed from the catalog (orphaned
+        blobs are still collected).
+
+        Parameters
+        ----------
+        keep_last : int, optional
+            Runs to keep per dataset type
+        keep_days : float, optional
+            Keep entries archived within this many days
+        dataset_type : str, optional
+            Only apply the policy to this type
+
+        Returns
+        -------
+        Dict[str, int]
+            Counts of removed entries and blobs, and bytes freed
+        """
+        entries = self.entries(dataset_type)
+        drop = pd.Series(False, index=entries.index)
+        if len(entries) and (keep_last is not None or keep_days is not None):
+            drop[:] = True
+            if keep_last is not None:
+                run_key = entries['run_id'].fillna(entries['archived'])
+                runs = entries.assign(run_key=run_key)[['dataset_type', 'run_key']].drop_duplicates()
+                recent = runs.groupby('dataset_type')['run_key'].rank(method='first', ascending=False) <= keep_last
+                keep_runs = set(map(tuple, runs.loc[recent, ['dataset_type', 'run_key']].to_numpy()))
+                drop &= pd.Series([key not in keep_runs for key in zip(entries['dataset_type'], run_key)],
+                                  index=entries.index)
+            if keep_days is not None:
+                cutoff = pd.Timestamp.now() - pd.Timedelta(days=keep_days)
+                drop &= pd.to_datetime(entries['archived']) < cutoff
+
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany("DELETE FROM files WHERE archive_id = ?",
+                                 [(int(i),) for i in entries.loc[drop, 'archive_id']])
+            referenced = {digest for (chunks,) in conn.execute("SELECT chunks FROM files")
+                          for digest in json.loads(chunks)}
+        finally:
+            conn.close()
+
+        removed_blobs, freed = 0, 0
+        blob_dir = self.root / 'blobs'
+        if blob_dir.exists():
+            for blob in blob_dir.glob('*/*'):
+                if blob.name not in referenced:
+                    freed += blob.stat().st_size
+                    blob.unlink()
+                    removed_blobs += 1
+        return {'removed_entries': int(drop.sum()), 'removed_blobs': removed_blobs, 'freed_bytes': freed}
+
+    def disk_usage(self) -> Dict[str, int]:
+        """Bytes stored in blobs versus the total size of archived files."""
+        blob_dir = self.root / 'blobs'
+        stored = sum(p.stat().st_size for p in blob_dir.glob('*/*')) if blob_dir.exists() else 0
+        logical = int(self.entries()['size'].sum()) if self.catalog_path.exists() else 0
+        return {'stored_bytes': stored, 'logical_bytes': logical}
+
+
+def archive_outputs(
+    output_dir: Union[str, Path],
+    archive_dir: Union[str, Path],
+    dataset_type: str,
+    keep_last: Optional[int] = None
+) -> List[Dict]:
+    """
+    Archive every ``{dataset_type}_<run_id>.*`` file in ``output_dir`` and
+    remove it from there (replaces the notebooks' ``archive_old_files``).
+
+    Parameters
+    ----------
+    output_dir : str or Path
+        Directory holding the current outputs
+    archive_dir : str or Path
+        Archive store root (e.g., ``archive/datasets``)
+    dataset_type : str
+        Output name
+    keep_last : int, optional
+        Retention applied to this type afterwards (default: keep all runs)
+
+    Returns
+    -------
+    List[Dict]
+        Catalog entries of the archived files
+    """
+    store = ArchiveStore(archive_dir)
+    pattern = output_pattern(dataset_type)
+    archived = []
+    for path in sorted(Path(output_dir).iterdir()):
+        if not pattern.match(path.name):
+            continue
+        entry = store.add(path, dataset_type)
+        path.unlink()
+        archived.append(entry)
+        note = f"{entry['new_bytes']:,} new bytes" if entry['new_bytes'] else "content already stored"
+        print(f"[ARCHIVE] {path.name} ({note})")
+    if keep_last is not None:
+        result = store.prune(keep_last=keep_last, dataset_type=dataset_type)
+        if result['removed_entries']:
+            print(f"[CLEANUP] Removed {result['removed_entries']} archived {dataset_type} files "
+                  f"({result['freed_bytes']:,} bytes freed)")
+    return archived
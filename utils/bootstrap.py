@@ -0,0 +1,275 @@
+"""
+Wild-cluster bootstrap p-values for OLS coefficients.
+
+With about 220 bank clusters and skewed DD distributions, asymptotic
+clustered errors on the ESG pillar scores are fragile. The restricted
+wild-cluster bootstrap (WCR, Cameron, Gelbach and Miller 2008) imposes
+H0: beta_j = 0, flips the restricted residuals cluster by cluster with
+Rademacher or Webb weights, and compares the observed clustered t-statistic
+with its bootstrap distribution.
+
+No model is refitted per draw. Bootstrap coefficients, residuals and
+cluster score sums are all linear in the weight vector w, so for each
+tested coefficient the module precomputes
+
+- ``p`` (G,): the bootstrap numerator is ``p @ w``
+- ``K`` (G, G): the cluster score sums are ``K @ w``
+
+once from the data. All draws are then evaluated as blocked matrix
+products against a (G, block) weight matrix. Blocks are spread over a
+process pool, and each block draws its weights from its own
+``SeedSequence`` child, so results do not depend on the number of workers.
+For the same reason each model's p-values can be cached on their own
+(``utils.result_cache``).
+
+Regressors that are linear combinations of earlier columns (e.g., a size
+dummy that is constant on the sample) are dropped before the bootstrap,
+and their terms are reported with NaN statistics.
+"""
+
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.covariance import group_codes, group_sums
+from utils.result_cache import ResultCache, array_fingerprint, code_version
+
+WEIGHT_TYPES = ('rademacher', 'webb')
+BOOTSTRAP_COLUMNS = ['model', 'term', 'coef', 't_stat', 'p_boot', 'n_draws', 'n_clusters', 'weights']
+
+# Source files whose changes invalidate cached p-values
+_SOURCES = (Path(__file__), Path(__file__).with_name('covariance.py'))
+
+_WEBB = np.array([-np.sqrt(1.5), -1.0, -np.sqrt(0.5), np.sqrt(0.5), 1.0, np.sqrt(1.5)])
+
+# Relative tolerance below which a column counts as aliased
+_RANK_TOL = 1e-10
+
+
+def bootstrap_weights(kind: str, n_clusters: int, n_draws: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Cluster weights for a block of draws.
+
+    Parameters
+    ----------
+    kind : str
+        'rademacher' (±1) or 'webb' (six-point)
+    n_clusters, n_draws : int
+        Output shape is (n_clusters, n_draws)
+    rng : np.random.Generator
+        Random generator of the block
+
+    Returns
+    -------
+    np.ndarray
+        Weight matrix
+    """
+    if kind == 'rademacher':
+        return rng.integers(0, 2, size=(n_clusters, n_draws)) * 2.0 - 1.0
+    if kind == 'webb':
+        return _WEBB[rng.integers(0, 6, size=(n_clusters, n_draws))]
+    raise ValueError(f"Unknown weights '{kind}'. Known: {list(WEIGHT_TYPES)}")
+
+
+def _independent_columns(X: np.ndarray, tol: float = _RANK_TOL) -> List[int]:
+    """
+    Columns of ``X`` that are not linear combinations of earlier columns.
+
+    Columns are scaled to unit norm and taken in order, so the constant
+    (first) is kept and a later collinear regressor is dropped.
+    """
+    norms = np.linalg.norm(X, axis=0)
+    keep: List[int] = []
+    basis = np.empty((X.shape[0], 0))
+    for j in range(X.shape[1]):
+        if norms[j] == 0:
+            continue
+        column = X[:, j] / norms[j]
+        residual = column - basis @ (basis.T @ column)
+        size = np.linalg.norm(residual)
+        if size > np.sqrt(tol):
+            keep.append(j)
+            basis = np.column_stack([basis, residual / size])
+    return keep
+
+
+def _prepare(
+    X: np.ndarray,
+    y: np.ndarray,
+    codes: np.ndarray,
+    columns: Sequence[int]
+) -> Dict:
+    """
+    Observed statistics and the linear maps of the bootstrap for each tested column.
+
+    Aliased columns are dropped first; ``tested`` lists the original
+    indices of the tested columns that remain.
+    """
+    keep = _independent_columns(X)
+    tested = [j for j in columns if j in keep]
+    X = X[:, keep]
+    columns = [keep.index(j) for j in tested]
+    n, k = X.shape
+    n_clusters = int(codes.max()) + 1
+    bread = np.linalg.inv(X.T @ X)
+    A = bread @ X.T
+    params = A @ y
+    resid = y - X @ params
+    correction = n_clusters / (n_clusters - 1) * (n - 1) / (n - k)
+
+    t_stats, numerators, score_maps = [], [], []
+    for j in columns:
+        observed = group_sums((A[j] * resid)[:, None], codes, n_clusters)[:, 0]
+        t_stats.append(params[j] / np.sqrt(correction * observed @ observed))
+
+        # Restricted fit under H0: beta_j = 0
+        others = [c for c in range(k) if c != j]
+        gamma = np.linalg.lstsq(X[:, others], y, rcond=None)[0]
+        restricted = y - X[:, others] @ gamma
+        P = group_sums(A.T * restricted[:, None], codes, n_clusters).T
+        a = group_sums((A[j] * restricted)[:, None], codes, n_clusters)[:, 0]
+        C = group_sums(A[j][:, None] * X, codes, n_clusters)
+        numerators.append(P[j])
+        score_maps.append(np.diag(a) - C @ P)
+    return {
+        'tested': tested,
+        'params': params[list(columns)],
+        't_stats': np.array(t_stats),
+        'numerators': np.array(numerators),
+        'score_maps': np.array(score_maps),
+        'correction': correction,
+        'n_clusters': n_clusters,
+    }
+
+
+def _run_block(
+    numerators: np.ndarray,
+    score_maps: np.ndarray,
+    correction: float,
+    t_stats: np.ndarray,
+    kind: str,
+    n_draws: int,
+    seed: np.random.SeedSequence
+) -> np.ndarray:
+    """Count draws with |t*| >= |t| for each tested coefficient."""
+    weights = bootstrap_weights(kind, numerators.shape[1], n_draws, np.random.default_rng(seed))
+    exceed = np.zeros(len(t_stats), dtype=np.int64)
+    for j in range(len(t_stats)):
+        scores = score_maps[j] @ weights
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t_boot = (numerators[j] @ weights) / np.sqrt(correction * np.einsum('gb,gb->b', scores, scores))
+        exceed[j] = np.count_nonzero(np.abs(t_boot) >= np.abs(t_stats[j]))
+    return exceed
+
+
+def _block_seeds(seed: int, model: str, n_draws: int, block_size: int) -> List[Tuple[int, np.random.SeedSequence]]:
+    """(draws, seed) per block; the model name is part of the entropy."""
+    sizes = [block_size] * (n_draws // block_size) + ([n_draws % block_size] if n_draws % block_size else [])
+    root = np.random.SeedSequence([seed, zlib.crc32(model.encode())])
+    return list(zip(sizes, root.spawn(len(sizes))))
+
+
+def wild_cluster_bootstrap(
+    designs: Dict[str, Tuple[Sequence[str], np.ndarray, np.ndarray, np.ndarray]],
+    terms: Optional[Sequence[str]] = None,
+    n_draws: int = 9999,
+    weights: str = 'rademacher',
+    seed: int = 0,
+    block_size: int = 2000,
+    n_jobs: Optional[int] = None,
+    cache: Optional[ResultCache] = None
+) -> pd.DataFrame:
+    """
+    Restricted wild-cluster bootstrap p-values for several models at once.
+
+    Parameters
+    ----------
+    designs : Dict[str, (names, X, y, clusters)]
+        Model name -> regressor names, design matrix (with the constant),
+        dependent variable and cluster labels of the estimation sample
+        (see ``OLSGrid.design``)
+    terms : Sequence[str], optional
+        Coefficients to test (default: every non-constant regressor)
+    n_draws : int, default 9999
+        Bootstrap draws per model
+    weights : str, default 'rademacher'
+        'rademacher' or 'webb' (preferable with few clusters)
+    seed : int, default 0
+        Base seed; each model's draws depend only on the seed and its name
+    block_size : int, default 2000
+        Draws evaluated per matrix product (and per pool task)
+    n_jobs : int, optional
+        Worker processes (default: one per CPU; 1 runs in-process)
+    cache : ResultCache, optional
+        Store of earlier runs; a model whose sample and settings are
+        unchanged is read from it instead of being bootstrapped again
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per model and term with the columns of ``BOOTSTRAP_COLUMNS``;
+        t_stat is the CR1 clustered t-statistic
+    """
+    if weights not in WEIGHT_TYPES:
+        raise ValueError(f"Unknown weights '{weights}'. Known: {list(WEIGHT_TYPES)}")
+    version = code_version(*_SOURCES) if cache is not None else None
+    prepared, tasks, keys, cached = {}, [], {}, {}
+    for model, (names, X, y, clusters) in designs.items():
+        names = list(names)
+        tested = [c for c in (terms if terms is not None else names) if c in names and c != 'const']
+        if not tested:
+            continue
+        if cache is not None:
+            keys[model] = ResultCache.key('wild_cluster_bootstrap', model, names, tested, n_draws, weights, seed,
+                                          block_size, array_fingerprint(X, y, clusters), version)
+            cached[model] = cache.get(keys[model])
+            if cached[model] is not None:
+                continue
+        prep = _prepare(np.asarray(X, dtype=float), np.asarray(y, dtype=float), group_codes(clusters),
+                        [names.index(c) for c in tested])
+        prep['terms'] = tested
+        prepared[model] = prep
+        if not prep['tested']:
+            continue
+        for size, block_seed in _block_seeds(seed, model, n_draws, block_size):
+            tasks.append((model, (prep['numerators'], prep['score_maps'], prep['correction'],
+                                  prep['t_stats'], weights, size, block_seed)))
+
+    exceed = {model: np.zeros(len(prep['tested']), dtype=np.int64) for model, prep in prepared.items()}
+    if n_jobs == 1 or not tasks:
+        for model, args in tasks:
+            exceed[model] += _run_block(*args)
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            futures = [(model, pool.submit(_run_block, *args)) for model, args in tasks]
+            for model, future in futures:
+                exceed[model] += future.result()
+
+    rows = []
+    for model in designs:
+        if cached.get(model) is not None:
+            rows.extend(cached[model])
+            continue
+        if model not in prepared:
+            continue
+        prep = prepared[model]
+        names = list(designs[model][0])
+        position = {names[j]: i for i, j in enumerate(prep['tested'])}
+        model_rows = []
+        for term in prep['terms']:
+            i = position.get(term)
+            model_rows.append({
+                'model': model, 'term': term,
+                'coef': prep['params'][i] if i is not None else np.nan,
+                't_stat': prep['t_stats'][i] if i is not None else np.nan,
+                'p_boot': exceed[model][i] / n_draws if i is not None else np.nan,
+                'n_draws': n_draws, 'n_clusters': prep['n_clusters'], 'weights': weights,
+            })
+        if cache is not None:
+            cache.put(keys[model], model_rows, label=model)
+        rows.extend(model_rows)
+    return pd.DataFrame(rows, columns=BOOTSTRAP_COLUMNS)
@@ -0,0 +1,264 @@
+"""
+Columnar storage for stage outputs (datasheets).
+
+Stage outputs (``market_<ts>``, ``accounting_<ts>``, ``merged_<ts>``,
+``esg_dd_pd_<ts>``) are written as typed, compressed Parquet files, with a
+CSV copy only when requested. Readers project columns so that consumers
+such as ``analysis.ipynb`` parse only the columns they use. CSV files from
+earlier runs remain readable through the same functions.
+
+Each write is recorded in the output directory's run manifest
+(``utils.manifest``), which is how readers find the latest or a specific
+run without listing the directory.
+"""
+
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import pandas as pd
+
+from utils.manifest import MANIFEST_NAME, RunManifest
+
+try:
+    import pyarrow  # noqa: F401
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:  # pragma: no cover - depends on environment
+    HAS_PYARROW = False
+
+
+# Object column contents that Arrow stores natively
+_ARROW_NATIVE = ('string', 'empty', 'boolean', 'bytes', 'date', 'time')
+_NUMERIC = ('integer', 'floating', 'mixed-integer-float', 'decimal')
+_DATETIME = ('datetime', 'datetime64')
+
+
+def _prepare_for_parquet(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Give object columns a type Arrow can store.
+
+    Numbers and timestamps held in object columns are converted to numeric
+    and datetime dtypes; only genuinely mixed columns (e.g., numbers and
+    text) are cast to strings.
+    """
+    converted = {}
+    for col in df.columns:
+        if df[col].dtype != object:
+            continue
+        kind = pd.api.types.infer_dtype(df[col], skipna=True)
+        if kind in _ARROW_NATIVE:
+            continue
+        try:
+            if kind in _NUMERIC:
+                converted[col] = pd.to_numeric(df[col])
+                continue
+            if kind in _DATETIME:
+                converted[col] = pd.to_datetime(df[col])
+                continue
+        except (TypeError, ValueError):
+            pass
+        converted[col] = df[col].map(lambda v: v if pd.isna(v) else str(v)).astype('string')
+    if not converted:
+        return df
+    df = df.copy()
+    for col, values in converted.items():
+        df[col] = values
+    return df
+
+
+def write_datasheet(
+    df: pd.DataFrame,
+    output_dir: Union[str, Path],
+    dataset_type: str,
+    timestamp: str,
+    export_csv: bool = False,
+    compression: str = 'zstd',
+    stage: Optional[str] = None,
+    upstream: Optional[Dict[str, str]] = None
+) -> Path:
+    """
+    Write a stage output as ``{dataset_type}_{timestamp}.parquet``.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Stage output
+    output_dir : str or Path
+        Destination directory (e.g., ``data/outputs/datasheet``)
+    dataset_type : str
+        Output name ('accounting', 'market', 'merged', 'esg_dd_pd')
+    timestamp : str
+        Run timestamp (YYYYMMDD_HHMMSS)
+    export_csv : bool, default False
+        Also write ``{dataset_type}_{timestamp}.csv`` as a side product
+    compression : str, default 'zstd'
+        Parquet compression codec
+    stage : str, optional
+        Producing stage, recorded in the run manifest
+    upstream : Dict[str, str], optional
+        Run ids of the datasheets this output was built from, keyed by
+        dataset type (e.g., ``{'accounting': '20251011_042604'}``)
+
+    Returns
+    -------
+    Path
+        Path of the primary output (Parquet, or CSV when pyarrow is not
+        installed)
+    """
+    output_dir = Path(output_dir)
+    csv_path = output_dir / f'{dataset_type}_{timestamp}.csv'
+
+    if HAS_PYARROW:
+        path = output_dir / f'{dataset_type}_{timestamp}.parquet'
+        _prepare_for_parquet(df).to_parquet(path, index=False, compression=compression)
+        if export_csv:
+            df.to_csv(csv_path, index=False)
+    else:
+        print('[WARN] pyarrow not installed; writing CSV only')
+        path = csv_path
+        df.to_csv(path, index=False)
+
+    RunManifest(output_dir / MANIFEST_NAME).record(
+        dataset_type, timestamp, path, rows=len(df), stage=stage, upstream=upstream
+    )
+    return path
+
+
+def datasheet_columns(path: Union[str, Path]) -> List[str]:
+    """
+    Column names of a datasheet without loading its data.
+
+    Parameters
+    ----------
+    path : str or Path
+        Parquet or CSV datasheet
+
+    Returns
+    -------
+    List[str]
+        Column names in file order
+    """
+    path = Path(path)
+    if path.suffix == '.parquet':
+        return list(pq.read_schema(path).names)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def read_datasheet(
+    path: Union[str, Path],
+    columns: Optional[Sequence[str]] = None
+) -> pd.DataFrame:
+    """
+    Read a datasheet, loading only the requested columns.
+
+    Parameters
+    ----------
+    path : str or Path
+        Parquet or CSV datasheet
+    columns : Sequence[str], optional
+        Columns to load; names not present in the file are skipped so that
+        callers can list optional columns. None loads everything.
+
+    Returns
+    -------
+    pd.DataFrame
+        Datasheet contents
+    """
+    path = Path(path)
+    if columns is not None:
+        available = set(datasheet_columns(path))
+        columns = [col for col in dict.fromkeys(columns) if col in available]
+    if path.suffix == '.parquet':
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_csv(path, usecols=columns)
+
+
+def _scan_latest(output_dir: Path, dataset_type: str) -> Optional[Path]:
+    """Latest output by file name, for directories written before the manifest."""
+    pattern = re.compile(rf'^{re.escape(dataset_type)}_(\d{{8}}_\d{{6}})\.(parquet|csv)$')
+    candidates = []
+    for path in output_dir.iterdir():
+        match = pattern.match(path.name)
+        if match:
+            candidates.append((match.group(1), match.group(2) == 'parquet', path))
+    return max(candidates, key=lambda c: (c[0], c[1]))[2] if candidates else None
+
+
+def latest_run(output_dir: Union[str, Path], dataset_type: str) -> Dict:
+    """
+    Manifest entry of the most recent ``dataset_type`` output.
+
+    Outputs written before the run manifest existed are found by the
+    timestamp in their file name (Parquet preferred over CSV of the same
+    run); their entries carry only ``run_id`` and ``path``.
+
+    Parameters
+    ----------
+    output_dir : str or Path
+        Output directory holding the manifest
+    dataset_type : str
+        Output name ('accounting', 'market', 'merged', 'esg_dd_pd')
+
+    Returns
+    -------
+    Dict
+        Entry with keys dataset_type, run_id, path, rows, sha256 and
+        upstream (see ``RunManifest.get``)
+
+    Raises
+    ------
+    FileNotFoundError
+        If no output of that type exists
+    """
+    output_dir = Path(output_dir)
+    entry = RunManifest(output_dir / MANIFEST_NAME).get(dataset_type)
+    if entry is not None and entry['path'].exists():
+        return entry
+    path = _scan_latest(output_dir, dataset_type)
+    if path is None:
+        raise FileNotFoundError(f"No {dataset_type} files found in {output_dir}")
+    run_id = path.stem[len(dataset_type) + 1:]
+    return {'dataset_type': dataset_type, 'run_id': run_id, 'path': path,
+            'rows': None, 'sha256': None, 'upstream': {}}
+
+
+def latest_datasheet(output_dir: Union[str, Path], dataset_type: str) -> Path:
+    """
+    Path of the most recent ``dataset_type`` output (see ``latest_run``).
+
+    Raises
+    ------
+    FileNotFoundError
+        If no output of that type exists
+    """
+    return latest_run(output_dir, dataset_type)['path']
+
+
+def run_datasheet(output_dir: Union[str, Path], dataset_type: str, run_id: str) -> Path:
+    """
+    Path of the ``dataset_type`` output of a given run.
+
+    Parameters
+    ----------
+    output_dir : str or Path
+        Output directory holding the manifest
+    dataset_type : str
+        Output name
+    run_id : str
+        Run identifier (YYYYMMDD_HHMMSS)
+
+    Raises
+    ------
+    FileNotFoundError
+        If that run has no such output
+    """
+    output_dir = Path(output_dir)
+    entry = RunManifest(output_dir / MANIFEST_NAME).get(dataset_type, run_id)
+    if entry is not None and entry['path'].exists():
+        return entry['path']
+    for suffix in ('.parquet', '.csv'):
+        path = output_dir / f'{dataset_type}_{run_id}{suffix}'
+        if path.exists():
+            return path
+    raise FileNotFoundError(f"No {dataset_type} output for run {run_id} in {output_dir}")
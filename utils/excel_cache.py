@@ -0,0 +1,89 @@
+"""
+Columnar cache for Excel workbooks.
+
+Parsing ``.xlsx`` through openpyxl is the slowest read in the scripts that
+touch bank metadata (``List_bank.xlsx``, ``esg_0718.xlsx``). ``read_workbook``
+converts a sheet once to a typed Parquet file under ``data/cache``, with the
+column-name normalization already applied, and serves later loads from
+that file. The cache entry is keyed by the workbook's size, modification
+time and SHA-256: a matching size and mtime is trusted, and a changed
+mtime with unchanged contents only refreshes the key.
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Optional, Union
+
+import pandas as pd
+
+from utils.datasheet import HAS_PYARROW, _prepare_for_parquet
+from utils.pipeline import hash_file
+
+
+def normalize_columns(columns: pd.Index) -> pd.Index:
+    """Strip, lower-case and underscore column names (``'Perm Id '`` -> ``'perm_id'``)."""
+    return columns.astype(str).str.strip().str.lower().str.replace(' ', '_')
+
+
+def _cache_paths(path: Path, cache_dir: Path, sheet_name, normalize: bool):
+    sheet = re.sub(r'[^A-Za-z0-9_-]+', '_', str(sheet_name))
+    stem = f"{path.stem}.{sheet}{'.norm' if normalize else ''}"
+    suffix = '.parquet' if HAS_PYARROW else '.pkl'
+    return cache_dir / f'{stem}{suffix}', cache_dir / f'{stem}.json'
+
+
+def read_workbook(
+    path: Union[str, Path],
+    sheet_name: Union[int, str] = 0,
+    normalize: bool = True,
+    cache_dir: Optional[Union[str, Path]] = None
+) -> pd.DataFrame:
+    """
+    Read one sheet of an Excel workbook through the columnar cache.
+
+    Parameters
+    ----------
+    path : str or Path
+        Workbook (e.g., ``data/clean/List_bank.xlsx``)
+    sheet_name : int or str, default 0
+        Sheet to read
+    normalize : bool, default True
+        Normalize column names with ``normalize_columns`` before caching
+    cache_dir : str or Path, optional
+        Cache directory; defaults to ``data/cache`` next to the workbook's
+        ``data/clean`` directory
+
+    Returns
+    -------
+    pd.DataFrame
+        Sheet contents with Excel-inferred dtypes
+    """
+    path = Path(path)
+    cache_dir = Path(cache_dir) if cache_dir is not None else path.parent.parent / 'cache'
+    data_path, meta_path = _cache_paths(path, cache_dir, sheet_name, normalize)
+    stat = path.stat()
+    key = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    meta = json.loads(meta_path.read_text()) if meta_path.exists() else {}
+    if meta and data_path.exists():
+        fresh = meta.get('size') == key['size'] and meta.get('mtime_ns') == key['mtime_ns']
+        if not fresh and meta.get('size') == key['size']:
+            digest = hash_file(path)
+            fresh = digest == meta.get('sha256')
+            if fresh:
+                meta_path.write_text(json.dumps({**key, 'sha256': digest}))
+        if fresh:
+            return pd.read_parquet(data_path) if HAS_PYARROW else pd.read_pickle(data_path)
+
+    df = pd.read_excel(path, sheet_name=sheet_name)
+    if normalize:
+        df.columns = normalize_columns(df.columns)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    if HAS_PYARROW:
+        _prepare_for_parquet(df).to_parquet(data_path, index=False)
+    else:
+        df.to_pickle(data_path)
+    meta_path.write_text(json.dumps({**key, 'sha256': hash_file(path)}))
+    # Serve the first load from the cache too, so every load has the same dtypes
+    return pd.read_parquet(data_path) if HAS_PYARROW else df
@@ -0,0 +1,394 @@
+"""
+Headless report figures rendered from pre-aggregated plot data.
+
+The notebooks draw every figure from the full panel: ``plt.hist`` bins all
+rows, ``DataFrame.boxplot`` recomputes quartiles per year and the DD_m vs
+DD_a scatter draws one marker per bank-year. Each report figure is instead
+built in two steps here:
+
+1. Aggregate once with ``histogram``, ``five_number_summary``,
+   ``hexbin_counts`` and ``bar_counts``. Each returns a small panel dict
+   (bin counts, per-group box statistics, hexagon counts, category counts)
+   of plain Python values whose size does not depend on the number of rows.
+2. Render with ``render_figures``. Figures are drawn on Agg canvases
+   (no pyplot, no display), one figure per worker process, and written to
+   image files.
+
+A figure is a dict ``{'name', 'figsize', 'panels'}``. ``save_figure_data``
+writes a list of figures to JSON, and ``scripts/render_figures.py``
+re-renders them from that file without the data or a live kernel.
+"""
+
+import json
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+PANEL_KINDS = ('hist', 'box', 'hexbin', 'bar')
+
+# Vertices of a unit hexagon, scaled by (sx, sy / 3) as in matplotlib's hexbin
+_HEXAGON = np.array([[0.5, -0.5], [0.5, 0.5], [0.0, 1.0], [-0.5, 0.5], [-0.5, -0.5], [0.0, -1.0]])
+
+
+def _finite(values) -> np.ndarray:
+    values = np.asarray(pd.Series(values).to_numpy(dtype=float, na_value=np.nan), dtype=float)
+    return values[np.isfinite(values)]
+
+
+def _labels(title: str = '', xlabel: str = '', ylabel: str = '', **style) -> Dict:
+    return {'title': title, 'xlabel': xlabel, 'ylabel': ylabel, **style}
+
+
+# ---------------------------------------------------------------------------
+# Aggregation
+# ---------------------------------------------------------------------------
+
+def histogram(
+    values,
+    bins: int = 50,
+    median_line: bool = True,
+    vlines: Sequence[Tuple[float, str]] = (),
+    **labels
+) -> Dict:
+    """
+    Histogram panel: bin counts and edges of the finite values.
+
+    Parameters
+    ----------
+    values : array-like
+        Values to bin (NaN and infinite values are dropped)
+    bins : int, default 50
+        Number of equal-width bins
+    median_line : bool, default True
+        Add a dashed line at the median
+    vlines : Sequence[Tuple[float, str]], default ()
+        Further (x, label) reference lines
+    **labels
+        title, xlabel, ylabel, color
+
+    Returns
+    -------
+    Dict
+        Panel with counts, edges, n and median
+    """
+    values = _finite(values)
+    counts, edges = np.histogram(values, bins=bins) if len(values) else (np.array([]), np.array([]))
+    median = float(np.median(values)) if len(values) else None
+    lines = [(median, f'Median: {median:.2f}')] if median_line and median is not None else []
+    lines += [(float(x), label) for x, label in vlines]
+    return {'kind': 'hist', 'counts': counts.tolist(), 'edges': edges.tolist(), 'n': int(len(values)),
+            'median': median, 'vlines': lines, **_labels(**labels)}
+
+
+def five_number_summary(values, groups, whis: float = 1.5, **labels) -> Dict:
+    """
+    Box-plot panel: quartiles and whiskers per group.
+
+    The statistics are those of ``DataFrame.boxplot`` (linear quantiles,
+    whiskers at the last value within ``whis`` IQRs of the box). Outliers
+    are counted but not stored.
+
+    Parameters
+    ----------
+    values : array-like
+        Values
+    groups : array-like
+        Group labels (e.g., year), same length as ``values``
+    whis : float, default 1.5
+        Whisker reach in interquartile ranges
+    **labels
+        title, xlabel, ylabel
+
+    Returns
+    -------
+    Dict
+        Panel with one entry per group (in sorted order) of label, q1, med,
+        q3, whislo, whishi, n and n_fliers
+    """
+    frame = pd.DataFrame({'group': np.asarray(groups), 'value': pd.Series(values).to_numpy(dtype=float, na_value=np.nan)})
+    frame = frame[np.isfinite(frame['value']) & frame['group'].notna()]
+    if frame.empty:
+        return {'kind': 'box', 'boxes': [], **_labels(**labels)}
+    grouped = frame.groupby('group', sort=True)['value']
+    stats = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+    stats.columns = ['q1', 'med', 'q3']
+    reach = whis * (stats['q3'] - stats['q1'])
+    low = frame['group'].map(stats['q1'] - reach)
+    high = frame['group'].map(stats['q3'] + reach)
+    inside = (frame['value'] >= low) & (frame['value'] <= high)
+    stats['whislo'] = frame['value'][inside].groupby(frame['group'][inside]).min()
+    stats['whishi'] = frame['value'][inside].groupby(frame['group'][inside]).max()
+    stats['n'] = grouped.size()
+    stats['n_fliers'] = (~inside).groupby(frame['group']).sum()
+    boxes = [{'label': str(group.item() if hasattr(group, 'item') else group),
+              **{k: float(row[k]) for k in ['q1', 'med', 'q3', 'whislo', 'whishi']},
+              'n': int(row['n']), 'n_fliers': int(row['n_fliers'])}
+             for group, row in stats.iterrows()]
+    return {'kind': 'box', 'boxes': boxes, **_labels(**labels)}
+
+
+def hexbin_counts(
+    x,
+    y,
+    gridsize: int = 40,
+    fit: bool = True,
+    diagonal: bool = True,
+    **labels
+) -> Dict:
+    """
+    Hexbin panel: counts of (x, y) pairs on a hexagonal grid.
+
+    Points are assigned to the nearer of two rectangular lattices offset by
+    half a cell, as in ``matplotlib.axes.Axes.hexbin``. Only occupied
+    hexagons are stored.
+
+    Parameters
+    ----------
+    x, y : array-like
+        Coordinates (pairs with a missing or infinite value are dropped)
+    gridsize : int, default 40
+        Hexagons along the x axis
+    fit : bool, default True
+        Store the least-squares line (``np.polyfit`` degree 1) and the
+        correlation of the pairs
+    diagonal : bool, default True
+        Draw the 45-degree line
+    **labels
+        title, xlabel, ylabel
+
+    Returns
+    -------
+    Dict
+        Panel with hexagon centers, counts, cell sizes and extent
+    """
+    x = pd.Series(x).to_numpy(dtype=float, na_value=np.nan)
+    y = pd.Series(y).to_numpy(dtype=float, na_value=np.nan)
+    keep = np.isfinite(x) & np.isfinite(y)
+    x, y = x[keep], y[keep]
+    panel = {'kind': 'hexbin', 'n': int(len(x)), 'centers': [], 'counts': [], 'diagonal': diagonal,
+             'fit': None, 'corr': None, **_labels(**labels)}
+    if not len(x):
+        return panel
+
+    xmin, xmax, ymin, ymax = x.min(), x.max(), y.min(), y.max()
+    if xmax == xmin:
+        xmin, xmax = xmin - 0.5, xmax + 0.5
+    if ymax == ymin:
+        ymin, ymax = ymin - 0.5, ymax + 0.5
+    nx = gridsize
+    ny = max(int(round(nx / np.sqrt(3))), 1)
+    sx, sy = (xmax - xmin) / nx, (ymax - ymin) / ny
+    ix, iy = (x - xmin) / sx, (y - ymin) / sy
+    ix1, iy1 = np.round(ix), np.round(iy)
+    ix2, iy2 = np.floor(ix), np.floor(iy)
+    d1 = (ix - ix1) ** 2 + 3.0 * (iy - iy1) ** 2
+    d2 = (ix - ix2 - 0.5) ** 2 + 3.0 * (iy - iy2 - 0.5) ** 2
+    first = d1 < d2
+    cx = np.where(first, ix1, ix2 + 0.5)
+    cy = np.where(first, iy1, iy2 + 0.5)
+    centers, counts = np.unique(np.column_stack([cx, cy]), axis=0, return_counts=True)
+
+    panel.update(
+        centers=np.column_stack([xmin + centers[:, 0] * sx, ymin + centers[:, 1] * sy]).tolist(),
+        counts=counts.tolist(), cell=[float(sx), float(sy)],
+        extent=[float(xmin), float(xmax), float(ymin), float(ymax)],
+    )
+    if fit and len(x) > 1:
+        slope, intercept = np.polyfit(x, y, 1)
+        panel.update(fit=[float(slope), float(intercept)], corr=float(np.corrcoef(x, y)[0, 1]))
+    return panel
+
+
+def bar_counts(values, **labels) -> Dict:
+    """
+    Bar panel: counts per category, most frequent first.
+
+    Parameters
+    ----------
+    values : array-like
+        Category labels (missing values are not counted)
+    **labels
+        title, xlabel, ylabel, color
+
+    Returns
+    -------
+    Dict
+        Panel with categories and counts
+    """
+    counts = pd.Series(values).value_counts()
+    return {'kind': 'bar', 'categories': [str(c) for c in counts.index], 'counts': counts.tolist(),
+            **_labels(**labels)}
+
+
+def figure(name: str, panels: Sequence[Dict], figsize: Optional[Tuple[float, float]] = None) -> Dict:
+    """
+    Figure spec: named row of panels.
+
+    Parameters
+    ----------
+    name : str
+        File stem of the rendered image
+    panels : Sequence[Dict]
+        Panels from the aggregation functions, drawn left to right
+    figsize : Tuple[float, float], optional
+        Figure size in inches (default: 7 x 5 per panel)
+    """
+    panels = list(panels)
+    unknown = {p['kind'] for p in panels} - set(PANEL_KINDS)
+    if unknown:
+        raise ValueError(f"Unknown panel kind(s): {sorted(unknown)}")
+    return {'name': name, 'figsize': list(figsize or (7 * len(panels), 5)), 'panels': panels}
+
+
+# ---------------------------------------------------------------------------
+# Rendering
+# ---------------------------------------------------------------------------
+
+def _empty(ax, panel: Dict) -> bool:
+    if panel.get('counts') or panel.get('boxes'):
+        return False
+    ax.text(0.5, 0.5, 'No observations', ha='center', va='center', transform=ax.transAxes)
+    return True
+
+
+def _draw_hist(ax, panel: Dict) -> None:
+    if _empty(ax, panel):
+        return
+    edges = np.asarray(panel['edges'])
+    ax.stairs(panel['counts'], edges, fill=True, alpha=0.7, color=panel.get('color', 'steelblue'))
+    ax.stairs(panel['counts'], edges, color='black', linewidth=0.5)
+    for x, label in panel['vlines']:
+        ax.axvline(x, color='red', linestyle='--', label=label)
+    if panel['vlines']:
+        ax.legend()
+
+
+def _draw_box(ax, panel: Dict) -> None:
+    if _empty(ax, panel):
+        return
+    stats = [{**box, 'fliers': []} for box in panel['boxes']]
+    ax.bxp(stats, showfliers=False)
+    ax.tick_params(axis='x', rotation=45)
+
+
+def _draw_hexbin(ax, panel: Dict) -> None:
+    from matplotlib.collections import PolyCollection
+
+    if _empty(ax, panel):
+        return
+    sx, sy = panel['cell']
+    centers = np.asarray(panel['centers'])
+    hexagon = _HEXAGON * [sx, sy / 3.0]
+    cells = PolyCollection(centers[:, None, :] + hexagon[None, :, :], array=np.asarray(panel['counts'], float),
+                           cmap='viridis', edgecolors='face', linewidths=0.5)
+    ax.add_collection(cells)
+    ax.figure.colorbar(cells, ax=ax, label='Count')
+    xmin, xmax, ymin, ymax = panel['extent']
+    ax.set_xlim(xmin - sx, xmax + sx)
+    ax.set_ylim(ymin - sy, ymax + sy)
+    if panel['diagonal']:
+        lims = [min(xmin, ymin), max(xmax, ymax)]
+        ax.plot(lims, lims, linestyle='--', color='red', linewidth=2, label='45° line')
+    if panel['fit'] is not None:
+        slope, intercept = panel['fit']
+        ax.plot([xmin, xmax], [slope * xmin + intercept, slope * xmax + intercept], color='blue',
+                linewidth=2, label=f'Regression: y={slope:.2f}x+{intercept:.2f}')
+        ax.text(0.05, 0.95, f"Correlation: {panel['corr']:.3f}", transform=ax.transAxes, fontsize=12,
+                verticalalignment='top', bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
+    ax.legend(loc='lower right')
+
+
+def _draw_bar(ax, panel: Dict) -> None:
+    if _empty(ax, panel):
+        return
+    ax.bar(panel['categories'], panel['counts'], color=panel.get('color', 'steelblue'), edgecolor='black')
+    ax.tick_params(axis='x', rotation=45)
+
+
+_DRAW = {'hist': _draw_hist, 'box': _draw_box, 'hexbin': _draw_hexbin, 'bar': _draw_bar}
+
+
+def render_figure(spec: Dict, output_dir: Union[str, Path], fmt: str = 'png', dpi: int = 100) -> Path:
+    """
+    Draw one figure spec on an Agg canvas and write it to ``output_dir/<name>.<fmt>``.
+
+    The figure is drawn with matplotlib's default style, whatever the
+    session's rcParams (e.g., a seaborn style set in a notebook).
+
+    Returns
+    -------
+    Path
+        Written file
+    """
+    from matplotlib import style
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    path = Path(output_dir) / f"{spec['name']}.{fmt}"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Default style, so the image does not depend on the caller's rcParams
+    with style.context('default'):
+        fig = Figure(figsize=spec['figsize'])
+        FigureCanvasAgg(fig)
+        axes = fig.subplots(1, len(spec['panels']), squeeze=False)[0]
+        for ax, panel in zip(axes, spec['panels']):
+            _DRAW[panel['kind']](ax, panel)
+            ax.set_title(panel['title'])
+            ax.set_xlabel(panel['xlabel'])
+            ax.set_ylabel(panel['ylabel'])
+            ax.grid(True, alpha=0.3)
+        fig.tight_layout()
+        fig.savefig(path, dpi=dpi)
+    return path
+
+
+def render_figures(
+    specs: Sequence[Dict],
+    output_dir: Union[str, Path],
+    fmt: str = 'png',
+    dpi: int = 100,
+    n_jobs: Optional[int] = None
+) -> List[Path]:
+    """
+    Render figure specs to image files in parallel.
+
+    Parameters
+    ----------
+    specs : Sequence[Dict]
+        Figures from ``figure`` (or ``load_figure_data``)
+    output_dir : str or Path
+        Directory of the image files (created if needed)
+    fmt : str, default 'png'
+        Image format understood by matplotlib (png, pdf, svg)
+    dpi : int, default 100
+        Resolution of raster formats
+    n_jobs : int, optional
+        Worker processes (default: one per CPU; 1 renders in-process)
+
+    Returns
+    -------
+    List[Path]
+        Written files, in the order of ``specs``
+    """
+    specs = list(specs)
+    if n_jobs == 1 or len(specs) <= 1:
+        return [render_figure(spec, output_dir, fmt, dpi) for spec in specs]
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        futures = [pool.submit(render_figure, spec, output_dir, fmt, dpi) for spec in specs]
+        return [future.result() for future in futures]
+
+
+def save_figure_data(specs: Sequence[Dict], path: Union[str, Path]) -> Path:
+    """Write figure specs (aggregates only) to JSON."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({'figures': list(specs)}, indent=1))
+    return path
+
+
+def load_figure_data(path: Union[str, Path]) -> List[Dict]:
+    """Read figure specs written by ``save_figure_data``."""
+    return json.loads(Path(path).read_text())['figures']
@@ -0,0 +1,527 @@
+"""
+Batched two-stage least squares for panels of IV specifications.
+
+Fitting each IV variant with ``IV2SLS.from_formula`` re-parses the formula,
+rebuilds the design and repeats the whole estimator. ``IVGrid`` groups
+the specifications by complete-case sample, exogenous regressors and
+excluded instruments. It factorizes each such instrument set once, with
+an SVD of Z, and projects every endogenous regressor onto it once. All
+second stages that share the instrument set and the endogenous regressors
+are then solved with one inverse of X̂'X̂ against the stacked dependent
+variables.
+
+``lag_instruments`` builds the lagged instruments from one ``PanelIndex``.
+A lag is NaN when the previous year of a bank is missing, instead of
+shifting over the gap.
+
+Reported statistics:
+
+- second-stage coefficients with non-robust, HC1, clustered, two-way or
+  Driscoll-Kraay errors (``utils.covariance``; small-sample corrections as
+  linearmodels' ``debiased=True``)
+- per endogenous regressor, the first-stage partial R² and F-test of the
+  excluded instruments (a robust Wald test divided by the number of
+  instruments under robust covariances)
+- with more instruments than endogenous regressors, Sargan's test and,
+  under robust covariances, Hansen's J from two-step efficient GMM
+
+Fits can be kept across runs in a ``utils.result_cache.ResultCache``.
+"""
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from scipy import stats as sps
+
+from utils.covariance import group_codes, group_sums, sandwich_cov
+from utils.panel import PanelIndex
+from utils.regression import COEFFICIENT_COLUMNS
+from utils.result_cache import ResultCache, code_version, sample_fingerprint
+
+IV_SUMMARY_COLUMNS = ['model', 'dependent_var', 'endogenous', 'instruments', 'n_obs', 'r_squared',
+                      'sargan', 'sargan_pval', 'hansen_j', 'hansen_pval', 'overid_df']
+FIRST_STAGE_COLUMNS = ['model', 'endogenous', 'partial_r_squared', 'f_statistic', 'prob_f', 'df_num', 'df_denom']
+
+# Singular values below this fraction of the largest are treated as zero
+_RANK_TOL = 1e-10
+
+# Source files whose changes invalidate cached fits
+_SOURCES = (Path(__file__), Path(__file__).with_name('covariance.py'))
+
+
+def lag_instruments(
+    data: pd.DataFrame,
+    columns: Sequence[str],
+    lags: Sequence[int] = (1,),
+    instrument_col: str = 'instrument',
+    year_col: str = 'year',
+    suffix: str = '_lag'
+) -> pd.DataFrame:
+    """
+    Lagged values of several columns from one panel index.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        Panel frame (any row order)
+    columns : Sequence[str]
+        Columns to lag
+    lags : Sequence[int], default (1,)
+        Lags in years
+    instrument_col, year_col : str
+        Panel identifiers
+    suffix : str, default '_lag'
+        Name suffix; lag k > 1 appends k ('DD_m_lag', 'DD_m_lag2')
+
+    Returns
+    -------
+    pd.DataFrame
+        Lag columns aligned to ``data.index``; NaN where the bank has no
+        observation k years earlier
+    """
+    panel = PanelIndex.from_frame(data, instrument_col, year_col)
+    lagged = {}
+    for col in columns:
+        for k in lags:
+            lagged[f'{col}{suffix}' if k == 1 else f'{col}{suffix}{k}'] = panel.lag(data[col].to_numpy(), k)
+    return pd.DataFrame(lagged, index=data.index)
+
+
+@dataclass(frozen=True)
+class IVSpec:
+    """One IV model: y on a constant, exogenous and endogenous regressors."""
+    model: str
+    y: str
+    exog: Tuple[str, ...]
+    endog: Tuple[str, ...]
+    instruments: Tuple[str, ...]
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        return (self.y,) + self.exog + self.endog + self.instruments
+
+
+class _Basis:
+    """Orthonormal basis of a design's column space (one SVD)."""
+
+    def __init__(self, Z: np.ndarray):
+        u, s, vt = np.linalg.svd(Z, full_matrices=False)
+        keep = s > _RANK_TOL * s[0]
+        self.rank = int(keep.sum())
+        self.u = u[:, keep]
+        # (Z'Z)^+ and Z^+ from the same factorization
+        self.inv = (vt[keep].T / s[keep] ** 2) @ vt[keep]
+        self.pinv = (vt[keep].T / s[keep]) @ u[:, keep].T
+
+    def project(self, values: np.ndarray) -> np.ndarray:
+        return self.u @ (self.u.T @ values)
+
+
+class _FirstStage:
+    """Instrument set of one sample: factorization, projections and second-stage breads."""
+
+    def __init__(self, Z: np.ndarray, n_exog: int, grid: 'IVGrid', mask: np.ndarray):
+        self.Z = Z
+        self.full = _Basis(Z)
+        self.included = _Basis(Z[:, :1 + n_exog])
+        self.n_excluded = Z.shape[1] - 1 - n_exog
+        self.grid = grid
+        self.mask = mask
+        self.fitted: Dict[str, np.ndarray] = {}
+        self.stats: Dict[str, Dict] = {}
+        self.breads: Dict[Tuple[str, ...], np.ndarray] = {}
+
+    def project(self, name: str, values: np.ndarray) -> np.ndarray:
+        """First-stage fitted values of an endogenous regressor (computed once)."""
+        if name not in self.fitted:
+            fitted = self.full.project(values)
+            self.fitted[name] = fitted
+            self.stats[name] = self._partial_test(values, fitted)
+        return self.fitted[name]
+
+    def _partial_test(self, x: np.ndarray, fitted: np.ndarray) -> Dict:
+        """Partial R² and F-test of the excluded instruments."""
+        n, kz = self.Z.shape
+        q = self.n_excluded
+        resid = x - fitted
+        ssr = resid @ resid
+        restricted = x - self.included.project(x)
+        ssr_r = restricted @ restricted
+        df_denom = n - self.full.rank
+        grid = self.grid
+        if grid.cov_type == 'nonrobust':
+            f_statistic = (ssr_r - ssr) / q / (ssr / df_denom)
+        else:
+            pi = self.full.pinv @ x
+            cov, n_groups = sandwich_cov(
+                self.full.inv, self.Z * resid[:, None], grid.cov_type, df_resid=df_denom,
+                groups=grid._labels(grid.groups, self.mask), time=grid._labels(grid.time, self.mask),
+                maxlags=grid.maxlags,
+            )
+            excluded = slice(kz - q, kz)
+            wald = pi[excluded] @ np.linalg.pinv(cov[excluded, excluded], hermitian=True) @ pi[excluded]
+            f_statistic = wald / q
+            if n_groups is not None:
+                df_denom = n_groups - 1
+        return {
+            'partial_r_squared': 1 - ssr / ssr_r if ssr_r > 0 else np.nan,
+            'f_statistic': f_statistic,
+            'prob_f': float(sps.f.sf(f_statistic, q, df_denom)),
+            'df_num': q,
+            'df_denom': df_denom,
+        }
+
+
+@dataclass
+class IVFit:
+    """
+    Fitted IV specification.
+
+    Attributes
+    ----------
+    spec : IVSpec
+        Model definition
+    n_obs : int
+        Complete-case observations
+    params, bse : pd.Series
+        Coefficients and standard errors ('const', exogenous, endogenous)
+    cov : pd.DataFrame
+        Coefficient covariance matrix
+    df_resid : int
+        n minus the number of coefficients
+    r_squared : float
+        1 - SSR / TSS with the structural residuals (can be negative)
+    cov_type : str
+        Covariance estimator of ``cov``
+    df_inference : int
+        Degrees of freedom of the t-tests (G - 1 for clustered errors)
+    first_stage : pd.DataFrame
+        One row per endogenous regressor (``FIRST_STAGE_COLUMNS``)
+    sargan, sargan_pval : float
+        Sargan's overidentification test (NaN if exactly identified)
+    hansen_j, hansen_pval : float
+        Hansen's J under the robust weighting (NaN if exactly identified
+        or with non-robust errors)
+    overid_df : int
+        Instruments minus endogenous regressors
+    """
+    spec: IVSpec
+    n_obs: int
+    params: pd.Series
+    bse: pd.Series
+    cov: pd.DataFrame
+    df_resid: int
+    r_squared: float
+    cov_type: str
+    df_inference: int
+    first_stage: pd.DataFrame
+    sargan: float
+    sargan_pval: float
+    hansen_j: float
+    hansen_pval: float
+    overid_df: int
+
+    @property
+    def tvalues(self) -> pd.Series:
+        return self.params / self.bse
+
+    @property
+    def pvalues(self) -> pd.Series:
+        return pd.Series(2 * sps.t.sf(np.abs(self.tvalues), self.df_inference), index=self.params.index)
+
+    def summary_row(self) -> Dict:
+        return {'model': self.spec.model, 'dependent_var': self.spec.y,
+                'endogenous': ', '.join(self.spec.endog), 'instruments': ', '.join(self.spec.instruments),
+                'n_obs': self.n_obs, 'r_squared': self.r_squared,
+                'sargan': self.sargan, 'sargan_pval': self.sargan_pval,
+                'hansen_j': self.hansen_j, 'hansen_pval': self.hansen_pval, 'overid_df': self.overid_df}
+
+    def coefficient_table(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            'model': self.spec.model, 'dependent_var': self.spec.y, 'term': self.params.index,
+            'coef': self.params.to_numpy(), 'std_err': self.bse.to_numpy(),
+            't': self.tvalues.to_numpy(), 'p_value': self.pvalues.to_numpy(),
+        })
+
+
+@dataclass
+class IVResults:
+    """
+    Fits of an ``IVGrid`` in the order the specifications were added.
+
+    Attributes
+    ----------
+    fits : Dict[str, IVFit]
+        Fitted models by name
+    skipped : Dict[str, int]
+        Models with fewer than ``min_obs`` complete cases -> their count
+    """
+    fits: Dict[str, IVFit] = field(default_factory=dict)
+    skipped: Dict[str, int] = field(default_factory=dict)
+
+    def __getitem__(self, model: str) -> IVFit:
+        return self.fits[model]
+
+    @property
+    def summary(self) -> pd.DataFrame:
+        """One row per model with the overidentification tests."""
+        return pd.DataFrame([f.summary_row() for f in self.fits.values()], columns=IV_SUMMARY_COLUMNS)
+
+    @property
+    def coefficients(self) -> pd.DataFrame:
+        """One row per model and term."""
+        if not self.fits:
+            return pd.DataFrame(columns=COEFFICIENT_COLUMNS)
+        return pd.concat([f.coefficient_table() for f in self.fits.values()], ignore_index=True)
+
+    @property
+    def first_stage(self) -> pd.DataFrame:
+        """One row per model and endogenous regressor."""
+        if not self.fits:
+            return pd.DataFrame(columns=FIRST_STAGE_COLUMNS)
+        return pd.concat([f.first_stage for f in self.fits.values()], ignore_index=True)
+
+
+class IVGrid:
+    """
+    Grid of 2SLS specifications on one data frame.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        Estimation data, including the instrument columns (see ``lag_instruments``)
+    min_obs : int, default 30
+        Models with fewer complete cases are skipped
+    cov_type : str, default 'nonrobust'
+        'nonrobust' or a ``utils.covariance.sandwich_cov`` estimator
+        ('HC1', 'cluster', 'twoway', 'driscoll_kraay')
+    groups : str or Sequence[str], optional
+        Cluster column ('cluster') or the two cluster columns ('twoway');
+        rows missing them are dropped from every sample
+    time : str, optional
+        Period column for 'driscoll_kraay'
+    maxlags : int, optional
+        Driscoll-Kraay Bartlett lags
+
+    Examples
+    --------
+    >>> data = df.join(lag_instruments(df, ['DD_m', 'DD_a']))
+    >>> grid = IVGrid(data, cov_type='cluster', groups='instrument')
+    >>> grid.add('DD_a', ['DD_m'], ['DD_m_lag', 'DD_a_lag'])
+    >>> grid.add('PD_a', ['DD_m'], ['DD_m_lag', 'DD_a_lag'])   # same first stage
+    >>> results = grid.fit()
+    """
+
+    def __init__(
+        self,
+        data: pd.DataFrame,
+        min_obs: int = 30,
+        cov_type: str = 'nonrobust',
+        groups: Optional[Union[str, Sequence[str]]] = None,
+        time: Optional[str] = None,
+        maxlags: Optional[int] = None
+    ):
+        self.data = data
+        self.min_obs = min_obs
+        self.cov_type = cov_type
+        self.groups = groups
+        self.time = time
+        self.maxlags = maxlags
+        label_cols = [groups] if isinstance(groups, str) else list(groups or [])
+        label_cols += [time] if time else []
+        self._label_cols = label_cols
+        self._labeled = ~data[label_cols].isna().any(axis=1).to_numpy() if label_cols else None
+        self.specs: Dict[str, IVSpec] = {}
+        self._values: Dict[str, np.ndarray] = {}
+        self._first_stages: Dict[Tuple, _FirstStage] = {}
+        self._fits: Dict[IVSpec, Optional[IVFit]] = {}
+
+    def add(
+        self,
+        y: str,
+        endog: Sequence[str],
+        instruments: Sequence[str],
+        exog: Sequence[str] = (),
+        model: Optional[str] = None
+    ) -> IVSpec:
+        """Register a model (named '<y> ~ [<endog> ~ <instruments>]' by default); returns its spec."""
+        if len(instruments) < len(endog):
+            raise ValueError(f"{len(endog)} endogenous regressors need at least as many instruments, "
+                             f"got {len(instruments)}")
+        model = model or f"{y} ~ {' + '.join(['1', *exog])} + [{' + '.join(endog)} ~ {' + '.join(instruments)}]"
+        if model in self.specs:
+            raise ValueError(f"Model '{model}' is already in the grid")
+        spec = IVSpec(model, y, tuple(exog), tuple(endog), tuple(instruments))
+        self.specs[model] = spec
+        return spec
+
+    def _column(self, name: str) -> np.ndarray:
+        if name not in self._values:
+            self._values[name] = self.data[name].to_numpy(dtype=float, na_value=np.nan)
+        return self._values[name]
+
+    def _labels(self, columns, mask: np.ndarray):
+        """Cluster or period labels of a sample's rows."""
+        if columns is None:
+            return None
+        if isinstance(columns, str):
+            return self.data[columns].to_numpy()[mask]
+        return tuple(self.data[c].to_numpy()[mask] for c in columns)
+
+    def _mask(self, spec: IVSpec) -> np.ndarray:
+        mask = ~np.isnan(np.column_stack([self._column(c) for c in spec.columns])).any(axis=1)
+        if self._labeled is not None:
+            mask &= self._labeled
+        return mask
+
+    def _first_stage(self, spec: IVSpec, mask: np.ndarray) -> _FirstStage:
+        """Factorized instrument set of a spec's sample (shared across specs)."""
+        key = (np.packbits(mask).tobytes(), spec.exog, spec.instruments)
+        if key not in self._first_stages:
+            Z = np.column_stack([np.ones(int(mask.sum()))] +
+                                [self._column(c)[mask] for c in spec.exog + spec.instruments])
+            self._first_stages[key] = _FirstStage(Z, len(spec.exog), self, mask)
+        return self._first_stages[key]
+
+    @property
+    def n_first_stages(self) -> int:
+        """Distinct instrument sets factorized so far."""
+        return len(self._first_stages)
+
+    def _hansen_j(self, X: np.ndarray, Z: np.ndarray, y: np.ndarray, resid: np.ndarray, mask: np.ndarray) -> float:
+        """Hansen's J at the two-step GMM estimate, weighting by the clusters of ``cov_type``."""
+        moments = Z * resid[:, None]
+        if self.cov_type == 'HC1':
+            sums = moments
+        else:
+            labels = self._labels(self.time, mask) if self.cov_type == 'driscoll_kraay' else \
+                self._labels(self.groups if isinstance(self.groups, str) else self.groups[0], mask)
+            sums = group_sums(moments, group_codes(labels))
+        weight = np.linalg.pinv(sums.T @ sums, hermitian=True)
+        zx, zy = Z.T @ X, Z.T @ y
+        params = np.linalg.solve(zx.T @ weight @ zx, zx.T @ weight @ zy)
+        g = zy - zx @ params
+        return float(g @ weight @ g)
+
+    def _fit_group(self, specs: List[IVSpec], mask: np.ndarray) -> List[IVFit]:
+        """Second stages sharing the sample, instrument set and regressors."""
+        first = self._first_stage(specs[0], mask)
+        spec0 = specs[0]
+        n = first.Z.shape[0]
+        exog = [self._column(c)[mask] for c in spec0.exog]
+        endog = [self._column(c)[mask] for c in spec0.endog]
+        X = np.column_stack([np.ones(n), *exog, *endog])
+        X_hat = np.column_stack([np.ones(n), *exog, *[first.project(c, v) for c, v in zip(spec0.endog, endog)]])
+        regressors = spec0.exog + spec0.endog
+        if regressors not in first.breads:
+            first.breads[regressors] = np.linalg.pinv(X_hat.T @ X_hat, hermitian=True)
+        bread = first.breads[regressors]
+
+        Y = np.column_stack([self._column(s.y)[mask] for s in specs])
+        params = bread @ (X_hat.T @ Y)
+        resids = Y - X @ params
+        k = X.shape[1]
+        df_resid = n - k
+        overid_df = len(spec0.instruments) - len(spec0.endog)
+        names = ['const', *regressors]
+        first_stage = pd.DataFrame([{'endogenous': c, **first.stats[c]} for c in spec0.endog])
+
+        fits = []
+        for i, spec in enumerate(specs):
+            resid = resids[:, i]
+            ssr = resid @ resid
+            if self.cov_type == 'nonrobust':
+                cov, n_groups = ssr / df_resid * bread, None
+            else:
+                cov, n_groups = sandwich_cov(
+                    bread, X_hat * resid[:, None], self.cov_type, df_resid=df_resid,
+                    groups=self._labels(self.groups, mask), time=self._labels(self.time, mask),
+                    maxlags=self.maxlags,
+                )
+            sargan = hansen_j = sargan_pval = hansen_pval = np.nan
+            if overid_df > 0:
+                outside = resid - first.full.project(resid)
+                sargan = n * (1 - (outside @ outside) / ssr)
+                sargan_pval = float(sps.chi2.sf(sargan, overid_df))
+                if self.cov_type != 'nonrobust':
+                    hansen_j = self._hansen_j(X, first.Z, Y[:, i], resid, mask)
+                    hansen_pval = float(sps.chi2.sf(hansen_j, overid_df))
+            centered = Y[:, i] - Y[:, i].mean()
+            fits.append(IVFit(
+                spec=spec,
+                n_obs=n,
+                params=pd.Series(params[:, i], index=names),
+                bse=pd.Series(np.sqrt(np.diag(cov)), index=names),
+                cov=pd.DataFrame(cov, index=names, columns=names),
+                df_resid=df_resid,
+                r_squared=1 - ssr / (centered @ centered),
+                cov_type=self.cov_type,
+                df_inference=df_resid if n_groups is None else n_groups - 1,
+                first_stage=first_stage.assign(model=spec.model)[FIRST_STAGE_COLUMNS],
+                sargan=sargan,
+                sargan_pval=sargan_pval,
+                hansen_j=hansen_j,
+                hansen_pval=hansen_pval,
+                overid_df=overid_df,
+            ))
+        return fits
+
+    def _cache_key(self, spec: IVSpec, version: str) -> str:
+        """Specification, sample threshold, covariance options and sample fingerprint of a model."""
+        return ResultCache.key('iv', repr(spec), self.min_obs, self.cov_type, self.groups, self.time, self.maxlags,
+                               sample_fingerprint(self.data, spec.columns, self._label_cols), version)
+
+    def fit(self, cache: Optional[ResultCache] = None) -> IVResults:
+        """
+        Fit every model not fitted yet and return results for the whole grid.
+
+        Parameters
+        ----------
+        cache : ResultCache, optional
+            Store of earlier fits; models whose specification and sample
+            are unchanged are read from it instead of being refitted
+
+        Returns
+        -------
+        IVResults
+            Fits and skipped models
+        """
+        version = code_version(*_SOURCES) if cache is not None else None
+        pending: Dict[Tuple, List[IVSpec]] = {}
+        masks: Dict[Tuple, np.ndarray] = {}
+        counts: Dict[str, int] = {}
+        keys: Dict[IVSpec, str] = {}
+        for spec in self.specs.values():
+            if spec in self._fits:
+                continue
+            if cache is not None:
+                keys[spec] = self._cache_key(spec, version)
+                cached = cache.get(keys[spec])
+                if cached is not None:
+                    self._fits[spec] = cached
+                    continue
+            mask = self._mask(spec)
+            counts[spec.model] = int(mask.sum())
+            if counts[spec.model] < self.min_obs:
+                self._fits[spec] = None
+                continue
+            key = (np.packbits(mask).tobytes(), spec.exog, spec.endog, spec.instruments)
+            pending.setdefault(key, []).append(spec)
+            masks[key] = mask
+        for key, specs in pending.items():
+            for spec, fitted in zip(specs, self._fit_group(specs, masks[key])):
+                self._fits[spec] = fitted
+                if cache is not None:
+                    cache.put(keys[spec], fitted, label=spec.model)
+
+        results = IVResults()
+        for model, spec in self.specs.items():
+            fitted = self._fits[spec]
+            if fitted is None:
+                results.skipped[model] = counts.get(model, int(self._mask(spec).sum()))
+            else:
+                results.fits[model] = fitted
+        return results
@@ -0,0 +1,187 @@
+"""
+Run manifest for stage outputs.
+
+Every datasheet written by a stage is recorded in a small SQLite database
+next to the outputs: run id, stage, output path, row count, content hash and
+the run ids of the upstream outputs it was built from. Consumers resolve
+"latest" or a specific run with one indexed lookup instead of scanning the
+output directory and sorting by modification time.
+
+Recording is a single transaction, so stages that run concurrently (e.g.,
+accounting and market) can append to the same manifest safely.
+"""
+
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from utils.pipeline import hash_file
+
+MANIFEST_NAME = 'run_manifest.sqlite'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outputs (
+    dataset_type TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    stage TEXT,
+    path TEXT NOT NULL,
+    rows INTEGER,
+    sha256 TEXT NOT NULL,
+    upstream TEXT NOT NULL,
+    created TEXT NOT NULL,
+    PRIMARY KEY (dataset_type, run_id)
+);
+CREATE TABLE IF NOT EXISTS latest (
+    dataset_type TEXT PRIMARY KEY,
+    run_id TEXT NOT NULL
+);
+"""
+
+_COLUMNS = ['dataset_type', 'run_id', 'stage', 'path', 'rows', 'sha256', 'upstream', 'created']
+
+
+class RunManifest:
+    """
+    SQLite-backed index of stage outputs.
+
+    Paths are stored relative to the manifest's directory so the output
+    folder can be moved or checked out elsewhere.
+
+    Parameters
+    ----------
+    path : str or Path
+        Manifest file, usually ``data/outputs/datasheet/run_manifest.sqlite``
+
+    Examples
+    --------
+    >>> manifest = RunManifest(output_dir / MANIFEST_NAME)
+    >>> manifest.record('merged', '20251011_043202', output_dir / 'merged_20251011_043202.parquet',
+    ...                 rows=1424, upstream={'accounting': '20251011_042604'})
+    >>> manifest.resolve('merged')
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.root = self.path.parent
+
+    def _connect(self) -> sqlite3.Connection:
+        self.root.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def _entry(self, row) -> Dict:
+        entry = dict(zip(_COLUMNS, row))
+        entry['path'] = self.root / entry['path']
+        entry['upstream'] = json.loads(entry['upstream'])
+        return entry
+
+    def record(
+        self,
+        dataset_type: str,
+        run_id: str,
+        path: Union[str, Path],
+        rows: Optional[int] = None,
+        stage: Optional[str] = None,
+        upstream: Optional[Dict[str, str]] = None
+    ) -> Dict:
+        """
+        Record an output and make it the latest of its type.
+
+        Parameters
+        ----------
+        dataset_type : str
+            Output name ('accounting', 'market', 'merged', 'esg_dd_pd', ...)
+        run_id : str
+            Run identifier (the run timestamp, YYYYMMDD_HHMMSS)
+        path : str or Path
+            Output file; it must already be written
+        rows : int, optional
+            Row count of the output
+        stage : str, optional
+            Stage that produced the output
+        upstream : Dict[str, str], optional
+            Run ids of the inputs, keyed by dataset type
+
+        Returns
+        -------
+        Dict
+            The recorded entry
+        """
+        path = Path(path)
+        relative = path.resolve().relative_to(self.root.resolve()).as_posix()
+        values = (dataset_type, run_id, stage, relative, rows, hash_file(path),
+                  json.dumps(upstream or {}, sort_keys=True), time.strftime('%Y-%m-%d %H:%M:%S'))
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(f"INSERT OR REPLACE INTO outputs VALUES ({', '.join('?' * len(_COLUMNS))})", values)
+                conn.execute("INSERT OR REPLACE INTO latest VALUES (?, ?)", (dataset_type, run_id))
+        finally:
+            conn.close()
+        return self._entry(values)
+
+    def get(self, dataset_type: str, run_id: Optional[str] = None) -> Optional[Dict]:
+        """
+        Manifest entry for one run of an output (latest when ``run_id`` is None).
+
+        Returns
+        -------
+        Dict or None
+            Entry with keys dataset_type, run_id, stage, path (absolute),
+            rows, sha256, upstream and created; None if not recorded
+        """
+        if not self.path.exists():
+            return None
+        conn = self._connect()
+        try:
+            if run_id is None:
+                row = conn.execute(
+                    "SELECT o.* FROM outputs o JOIN latest l "
+                    "ON o.dataset_type = l.dataset_type AND o.run_id = l.run_id "
+                    "WHERE l.dataset_type = ?", (dataset_type,)
+                ).fetchone()
+            else:
+                row = conn.execute(
+                    "SELECT * FROM outputs WHERE dataset_type = ? AND run_id = ?", (dataset_type, run_id)
+                ).fetchone()
+        finally:
+            conn.close()
+        return self._entry(row) if row else None
+
+    def resolve(self, dataset_type: str, run_id: Optional[str] = None) -> Path:
+        """
+        Path of the latest (or given) run of an output.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the run is not recorded or its file no longer exists
+        """
+        entry = self.get(dataset_type, run_id)
+        if entry is None:
+            which = f"run {run_id}" if run_id else "latest run"
+            raise FileNotFoundError(f"No {which} of {dataset_type} recorded in {self.path}")
+        if not entry['path'].exists():
+            raise FileNotFoundError(f"Recorded {dataset_type} output is missing: {entry['path']}")
+        return entry['path']
+
+    def runs(self, dataset_type: str) -> List[str]:
+        """Recorded run ids of an output, oldest first."""
+        if not self.path.exists():
+            return []
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT run_id FROM outputs WHERE dataset_type = ? ORDER BY run_id", (dataset_type,)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [row[0] for row in rows]
+
+    def verify(self, dataset_type: str, run_id: Optional[str] = None) -> bool:
+        """True if the recorded file exists and still has its recorded hash."""
+        entry = self.get(dataset_type, run_id)
+        return bool(entry) and entry['path'].exists() and hash_file(entry['path']) == entry['sha256']
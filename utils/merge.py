@@ -0,0 +1,236 @@
+"""
+Column-deduplicating merge of stage outputs.
+
+``merging.ipynb`` used to prefix every non-key column of the accounting and
+market outputs with ``a_``/``m_`` and outer-merge them. Identical columns
+were then stored twice: source columns that both stages carry, and the
+aliases a stage keeps internally (e.g., ``F``/``F_t``, ``rf``/``rf_t``,
+``equity_volatility``/``sigma_E_tminus1``). ``merge_outputs``:
+
+1. drops non-key columns whose content duplicates another column of the
+   same side (protected columns such as DD/PD are always kept),
+2. joins on one integer key (the factorized (instrument, year) pair),
+3. keeps a single unprefixed copy of every shared column whose values agree
+   on all matched rows, and prefixes only the side-specific columns,
+
+and returns a column-lineage table that says where each source column
+ended up.
+"""
+
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+LINEAGE_COLUMNS = ['side', 'source_column', 'merged_column', 'rule']
+
+
+def _comparable(series: pd.Series) -> pd.Series:
+    """Categoricals as plain values so equal labels compare equal across category sets."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.astype(object)
+    return series
+
+
+def _same_values(a: pd.Series, b: pd.Series) -> bool:
+    """True if two aligned columns hold the same values, missing in the same places."""
+    a, b = _comparable(a), _comparable(b)
+    a_na, b_na = a.isna().to_numpy(), b.isna().to_numpy()
+    if not np.array_equal(a_na, b_na):
+        return False
+    both = ~a_na
+    try:
+        return bool(np.all(a.to_numpy()[both] == b.to_numpy()[both]))
+    except (TypeError, ValueError):
+        return False
+
+
+def duplicate_columns(df: pd.DataFrame, protect: Sequence[str] = ()) -> Dict[str, str]:
+    """
+    Columns whose content repeats another column of the same frame.
+
+    Candidates are grouped by a content hash and confirmed by value
+    equality; integer and float columns never match each other.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Stage output
+    protect : Sequence[str], default ()
+        Columns that are always kept (their duplicates are dropped instead)
+
+    Returns
+    -------
+    Dict[str, str]
+        Redundant column -> column that is kept
+    """
+    groups: Dict[Tuple, list] = {}
+    for col in df.columns:
+        values = _comparable(df[col])
+        digest = int(pd.util.hash_pandas_object(values, index=False).to_numpy().sum(dtype=np.uint64))
+        groups.setdefault((str(values.dtype), digest), []).append(col)
+
+    aliases: Dict[str, str] = {}
+    for cols in groups.values():
+        if len(cols) < 2:
+            continue
+        cols = sorted(cols, key=lambda c: (c not in protect, list(df.columns).index(c)))
+        kept = []
+        for col in cols:
+            match = next((k for k in kept if _same_values(df[k], df[col])), None)
+            if match is None or col in protect:
+                kept.append(col)
+            else:
+                aliases[col] = match
+    return aliases
+
+
+def merge_outputs(
+    left: pd.DataFrame,
+    right: pd.DataFrame,
+    keys: Sequence[str] = ('instrument', 'year'),
+    prefixes: Tuple[str, str] = ('a_', 'm_'),
+    sides: Tuple[str, str] = ('accounting', 'market'),
+    protect: Sequence[str] = ('DD_a', 'PD_a', 'DD_m', 'PD_m'),
+    how: str = 'outer'
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Merge two stage outputs, storing each distinct column once.
+
+    Parameters
+    ----------
+    left, right : pd.DataFrame
+        Accounting and market outputs (or any two frames sharing ``keys``)
+    keys : Sequence[str], default ('instrument', 'year')
+        Join keys; rows are matched on their factorized integer code
+    prefixes : Tuple[str, str], default ('a_', 'm_')
+        Prefixes for side-specific columns
+    sides : Tuple[str, str], default ('accounting', 'market')
+        Side names used in the lineage table
+    protect : Sequence[str]
+        Columns never dropped or prefixed (model outputs that are already
+        named by side)
+    how : str, default 'outer'
+        Join type
+
+    Returns
+    -------
+    merged : pd.DataFrame
+        Keys, then left columns, then right columns, sorted by key
+    lineage : pd.DataFrame
+        One row per source column: side, source_column, merged_column and
+        rule ('key', 'protected', 'shared', 'prefixed' or 'alias' for a
+        dropped duplicate of ``merged_column``)
+    """
+    keys = list(keys)
+    frames = []
+    lineage = []
+    kept_names: Dict[str, Dict[str, str]] = {}
+    for side, prefix, df in zip(sides, prefixes, (left, right)):
+        # Keys are filled on every merged row, so they are never alias targets
+        aliases = duplicate_columns(df.drop(columns=keys), protect=protect)
+        frames.append((side, prefix, df.drop(columns=list(aliases)), aliases))
+
+    (l_side, l_prefix, l_df, l_alias), (r_side, r_prefix, r_df, r_alias) = frames
+    shared = [c for c in l_df.columns if c in r_df.columns and c not in keys and c not in protect]
+
+    # One integer key per (instrument, year); sorted so the output keeps key order
+    key_index = pd.MultiIndex.from_frame(pd.concat([l_df[keys], r_df[keys]], ignore_index=True))
+    codes, uniques = key_index.factorize(sort=True)
+
+    def side_frame(df, prefix, side, codes_part):
+        renamed = {c: c if c in protect else f'{prefix}{c}' for c in df.columns if c not in keys}
+        out = df.drop(columns=keys).rename(columns=renamed)
+        out.insert(0, '_key', codes_part)
+        kept_names[side] = renamed
+        return out
+
+    l_frame = side_frame(l_df, l_prefix, l_side, codes[:len(l_df)])
+    r_frame = side_frame(r_df, r_prefix, r_side, codes[len(l_df):])
+    merged = l_frame.merge(r_frame, on='_key', how=how, indicator='_side', sort=True)
+
+    positions = merged.pop('_key').to_numpy()
+    for i, k in enumerate(keys):
+        values = pd.Series(uniques.get_level_values(i).take(positions), index=merged.index)
+        dtype = l_df[k].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            # Right-only labels must stay in the categories
+            dtype = pd.CategoricalDtype(dtype.categories.union(pd.Index(values.dropna().unique())))
+        merged.insert(i, k, values.astype(dtype))
+
+    matched = (merged['_side'] == 'both').to_numpy()
+    from_left = merged['_side'].isin(['both', 'left_only']).to_numpy()
+    shared_kept = []
+    for col in shared:
+        a, m = merged[f'{l_prefix}{col}'], merged[f'{r_prefix}{col}']
+        if not _same_values(a[matched], m[matched]):
+            continue
+        if isinstance(a.dtype, pd.CategoricalDtype) or isinstance(m.dtype, pd.CategoricalDtype):
+            combined = _comparable(a).where(from_left, _comparable(m)).astype('category')
+        else:
+            combined = a.where(from_left, m)
+        merged.insert(merged.columns.get_loc(a.name), col, combined)
+        merged = merged.drop(columns=[a.name, m.name])
+        kept_names[l_side][col] = col
+        kept_names[r_side][col] = col
+        shared_kept.append(col)
+    merged = merged.drop(columns='_side')
+
+    for side, _, df, aliases in frames:
+        for col in df.columns:
+            if col in keys:
+                rule = 'key'
+            elif col in protect:
+                rule = 'protected'
+            elif col in shared_kept:
+                rule = 'shared'
+            else:
+                rule = 'prefixed'
+            lineage.append((side, col, col if col in keys else kept_names[side][col], rule))
+        for col, target in aliases.items():
+            lineage.append((side, col, kept_names[side][target], 'alias'))
+    return merged, pd.DataFrame(lineage, columns=LINEAGE_COLUMNS)
+
+
+def resolve_columns(
+    names: Sequence[str],
+    lineage: Optional[pd.DataFrame],
+    prefixes: Dict[str, str] = None
+) -> Dict[str, str]:
+    """
+    Map column names written against the fully prefixed layout to merged columns.
+
+    ``'a_covid'`` resolves to ``'covid'`` when the column was shared, and
+    ``'m_rf_t'`` to ``'m_rf'`` when it was dropped as a duplicate. Names
+    that need no translation, or are unknown, map to themselves; without a
+    lineage table every name does.
+
+    Parameters
+    ----------
+    names : Sequence[str]
+        Requested names (``a_x``, ``m_x``, unprefixed or protected)
+    lineage : pd.DataFrame or None
+        Lineage table from ``merge_outputs``
+    prefixes : Dict[str, str], optional
+        Prefix -> side (default ``{'a_': 'accounting', 'm_': 'market'}``)
+
+    Returns
+    -------
+    Dict[str, str]
+        Requested name -> merged column name
+    """
+    if lineage is None or lineage.empty:
+        return {name: name for name in names}
+    prefixes = prefixes or {'a_': 'accounting', 'm_': 'market'}
+    by_source = {(row.side, row.source_column): row.merged_column for row in lineage.itertuples()}
+    merged_columns = set(lineage['merged_column'])
+    resolved = {}
+    for name in names:
+        target = name
+        if name not in merged_columns:
+            for prefix, side in prefixes.items():
+                if name.startswith(prefix) and (side, name[len(prefix):]) in by_source:
+                    target = by_source[(side, name[len(prefix):])]
+                    break
+        resolved[name] = target
+    return resolved
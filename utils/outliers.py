@@ -0,0 +1,198 @@
+"""
+Declarative outlier categorization for DD outputs.
+
+A DD value above the threshold is an outlier. The rules in
+``data/clean/outlier_rules.json`` then give it a category, such as
+zero-cost debt, low debt or low leverage. Each rule has a category label,
+a priority (the lowest number that matches wins) and a list of conditions
+that must all hold::
+
+    {"category": "low_debt", "priority": 2,
+     "conditions": [{"column": "{prefix}debt_total", "op": "<=", "value": 1.0}]}
+
+Column names are templates filled from the dataset entry (``{prefix}``,
+``{dd}``), so one rule covers the accounting and the market outputs. A
+missing value never satisfies a condition. A rule whose column is absent
+from the frame does not apply. Outliers that match no rule get the default
+category.
+
+``OutlierRules`` compiles the table into boolean masks. Each distinct
+condition is evaluated once per dataset as a whole-column comparison, so
+the cost is a handful of array operations whatever the row count.
+"""
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+OPERATORS = {
+    '<': np.less,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '==': np.equal,
+    '!=': np.not_equal,
+}
+
+
+@dataclass(frozen=True)
+class Condition:
+    """Comparison of one (templated) column with a constant."""
+    column: str
+    op: str
+    value: float
+    abs: bool = False
+
+
+@dataclass(frozen=True)
+class Rule:
+    """Category assigned when all conditions hold."""
+    category: str
+    priority: int
+    conditions: Tuple[Condition, ...]
+
+
+def _values(df: pd.DataFrame, column: str) -> np.ndarray:
+    return df[column].to_numpy(dtype=float, na_value=np.nan)
+
+
+class OutlierRules:
+    """
+    Compiled outlier rule table.
+
+    Parameters
+    ----------
+    threshold : float
+        DD values strictly above the threshold are outliers
+    datasets : Dict[str, Dict[str, str]]
+        Dataset name -> {'dd': DD column, 'prefix': column prefix,
+        'output': category column written by ``apply``}
+    rules : Sequence[Rule]
+        Category rules; priorities must be unique
+    default : str, default 'other'
+        Category of outliers that match no rule
+    """
+
+    def __init__(
+        self,
+        threshold: float,
+        datasets: Dict[str, Dict[str, str]],
+        rules: Sequence[Rule],
+        default: str = 'other'
+    ):
+        for rule in rules:
+            for condition in rule.conditions:
+                if condition.op not in OPERATORS:
+                    raise ValueError(f"Unknown operator '{condition.op}' in rule '{rule.category}'. "
+                                     f"Known: {list(OPERATORS)}")
+        priorities = [rule.priority for rule in rules]
+        if len(set(priorities)) != len(priorities):
+            raise ValueError(f"Rule priorities must be unique, got {sorted(priorities)}")
+        self.threshold = float(threshold)
+        self.datasets = {name: dict(spec) for name, spec in datasets.items()}
+        self.rules = tuple(sorted(rules, key=lambda rule: rule.priority))
+        self.default = default
+
+    @classmethod
+    def from_dict(cls, spec: Dict) -> 'OutlierRules':
+        """Build from the JSON layout of ``outlier_rules.json``."""
+        rules = [
+            Rule(rule['category'], int(rule['priority']),
+                 tuple(Condition(c['column'], c['op'], float(c['value']), bool(c.get('abs', False)))
+                       for c in rule['conditions']))
+            for rule in spec['rules']
+        ]
+        return cls(spec['threshold'], spec['datasets'], rules, spec.get('default', 'other'))
+
+    @classmethod
+    def from_json(cls, path: Union[str, Path]) -> 'OutlierRules':
+        """Load a rule table from a JSON file."""
+        return cls.from_dict(json.loads(Path(path).read_text()))
+
+    def _dataset(self, dataset: str) -> Dict[str, str]:
+        if dataset not in self.datasets:
+            raise ValueError(f"Unknown dataset '{dataset}'. Known: {list(self.datasets)}")
+        return self.datasets[dataset]
+
+    def categorize(self, df: pd.DataFrame, dataset: str) -> pd.Series:
+        """
+        Outlier category of every row.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            Frame with the dataset's DD column and the rule columns
+        dataset : str
+            Key of ``datasets`` ('accounting' or 'market')
+
+        Returns
+        -------
+        pd.Series
+            Category label for outliers, None for all other rows
+        """
+        spec = self._dataset(dataset)
+        dd = _values(df, spec['dd'])
+        with np.errstate(invalid='ignore'):
+            flagged = dd > self.threshold
+
+        # Index into labels; lower-priority rules are written first and
+        # overwritten by higher-priority ones
+        labels = [rule.category for rule in self.rules] + [self.default]
+        codes = np.full(len(df), len(self.rules), dtype=np.intp)
+        compiled: Dict[Tuple, np.ndarray] = {}
+        for i in reversed(range(len(self.rules))):
+            mask = self._rule_mask(df, self.rules[i], spec, compiled)
+            if mask is not None:
+                codes[mask] = i
+        categories = np.array(labels, dtype=object)[codes]
+        categories[~flagged] = None
+        return pd.Series(categories, index=df.index, name=spec.get('output'), dtype=object)
+
+    def _rule_mask(
+        self,
+        df: pd.DataFrame,
+        rule: Rule,
+        spec: Dict[str, str],
+        compiled: Dict[Tuple, np.ndarray]
+    ) -> Optional[np.ndarray]:
+        """Rows satisfying every condition, or None if a column is absent."""
+        mask = np.ones(len(df), dtype=bool)
+        for condition in rule.conditions:
+            column = condition.column.format_map(spec)
+            if column not in df.columns:
+                return None
+            key = (column, condition.op, condition.value, condition.abs)
+            if key not in compiled:
+                values = _values(df, column)
+                if condition.abs:
+                    values = np.abs(values)
+                with np.errstate(invalid='ignore'):
+                    compiled[key] = OPERATORS[condition.op](values, condition.value) & ~np.isnan(values)
+            mask &= compiled[key]
+        return mask
+
+    def apply(self, df: pd.DataFrame, datasets: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Add one category column per dataset.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            Merged frame
+        datasets : Sequence[str], optional
+            Datasets to categorize (default: every dataset whose DD column is present)
+
+        Returns
+        -------
+        pd.DataFrame
+            ``df`` with the ``output`` columns set (modified in place)
+        """
+        if datasets is None:
+            datasets = [name for name, spec in self.datasets.items() if spec['dd'] in df.columns]
+        for dataset in datasets:
+            df[self._dataset(dataset)['output']] = self.categorize(df, dataset)
+        return df
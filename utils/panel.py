@@ -0,0 +1,312 @@
+"""
+Integer-coded (instrument, year) panel index with gap-aware time operations.
+
+``df.sort_values(['instrument', 'year'])`` followed by
+``groupby('instrument').shift(1)`` treats the previous *row* as the
+previous year. When a bank has no row for a year, the next year silently
+lags two years back, and duplicate rows lag onto their own twin.
+``PanelIndex`` codes instruments and years as dense integers once and
+addresses each (instrument, year) cell directly. Lags, leads, differences
+and rolling windows are therefore defined over calendar years and return
+NaN across missing years.
+"""
+
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+
+ArrayLike = Union[pd.Series, np.ndarray, list]
+
+_ROLLING_FUNCS = ('mean', 'sum', 'count', 'std', 'min', 'max')
+
+
+class PanelIndex:
+    """
+    Dense integer coding of an (instrument, year) panel.
+
+    Built once per frame (rows in any order); operations take columns of
+    that frame and return values aligned to its rows.
+
+    Parameters
+    ----------
+    instrument : array-like
+        Instrument identifier per row (strings or categorical)
+    year : array-like
+        Year per row (integers; missing years are allowed and never match)
+
+    Attributes
+    ----------
+    instruments : pd.Index
+        Sorted instrument labels; row codes index into it
+    first_year : int
+        Smallest year in the panel (year code 0)
+    n_years : int
+        Number of calendar years spanned (``last - first + 1``)
+    order : np.ndarray
+        Row positions sorted by (instrument, year), stable for duplicates
+    offsets : np.ndarray
+        Start of each instrument's block in ``order`` (length
+        ``n_instruments + 1``)
+
+    Notes
+    -----
+    When an (instrument, year) key occurs more than once, the first row in
+    frame order supplies the value that other years see (the convention of
+    ``drop_duplicates(keep='first')``); every duplicate row still receives
+    the lag of its own year.
+
+    Examples
+    --------
+    >>> panel = PanelIndex.from_frame(df)
+    >>> df['DD_m_lag'] = panel.lag(df['DD_m'])
+    >>> df['sigma_prior'] = panel.rolling(df['rit'], window=3, func='std', min_periods=2, lag=1)
+    """
+
+    def __init__(self, instrument: ArrayLike, year: ArrayLike):
+        year = pd.to_numeric(pd.Series(year).astype(object), errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+        inst_codes, instruments = pd.factorize(pd.Series(instrument).astype(object), sort=True)
+        valid = (inst_codes >= 0) & ~np.isnan(year)
+
+        self.n_rows = len(year)
+        self.instruments = pd.Index(instruments)
+        self.first_year = int(np.nanmin(year[valid])) if valid.any() else 0
+        last_year = int(np.nanmax(year[valid])) if valid.any() else -1
+        self.n_years = last_year - self.first_year + 1
+
+        self.inst_codes = inst_codes.astype(np.int64)
+        self.year_codes = np.where(valid, year - self.first_year, -1).astype(np.int64)
+        self.valid = valid
+
+        self.order = np.lexsort((self.year_codes, self.inst_codes))
+        sorted_inst = self.inst_codes[self.order]
+        self.offsets = np.searchsorted(sorted_inst, np.arange(len(self.instruments) + 1), side='left')
+
+        # Dense cell -> first row holding that (instrument, year), -1 if none
+        self.cells = np.where(valid, self.inst_codes * self.n_years + self.year_codes, -1)
+        self._cell_row = np.full(len(self.instruments) * self.n_years, -1, dtype=np.int64)
+        rows = np.flatnonzero(valid)[::-1]  # reversed so the first occurrence is written last
+        self._cell_row[self.cells[rows]] = rows
+
+    @classmethod
+    def from_frame(
+        cls,
+        df: pd.DataFrame,
+        instrument_col: str = 'instrument',
+        year_col: str = 'year'
+    ) -> 'PanelIndex':
+        """
+        Build the index for a frame's rows.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            Panel frame
+        instrument_col : str, default='instrument'
+            Instrument column
+        year_col : str, default='year'
+            Year column
+
+        Returns
+        -------
+        PanelIndex
+            Index aligned to ``df``'s current row order
+        """
+        return cls(df[instrument_col], df[year_col])
+
+    @property
+    def n_instruments(self) -> int:
+        return len(self.instruments)
+
+    @property
+    def duplicated(self) -> np.ndarray:
+        """True for rows whose (instrument, year) already occurred earlier."""
+        first = self._cell_row[np.where(self.valid, self.cells, 0)]
+        return self.valid & (first != np.arange(self.n_rows))
+
+    @property
+    def is_unique(self) -> bool:
+        return not self.duplicated.any()
+
+    def _values(self, values: ArrayLike) -> np.ndarray:
+        if isinstance(values, pd.Series):
+            values = values.to_numpy(dtype=float, na_value=np.nan)
+        values = np.asarray(values, dtype=float)
+        if len(values) != self.n_rows:
+            raise ValueError(f"Expected {self.n_rows} values aligned to the panel rows, got {len(values)}")
+        return values
+
+    def _wrap(self, result: np.ndarray, like: ArrayLike, name: Optional[str] = None):
+        if isinstance(like, pd.Series):
+            return pd.Series(result, index=like.index, name=name or like.name)
+        return result
+
+    def _dense(self, values: np.ndarray) -> np.ndarray:
+        """(n_instruments, n_years) matrix of cell values, NaN where a year is missing."""
+        dense = np.full(len(self._cell_row), np.nan)
+        present = self._cell_row >= 0
+        dense[present] = values[self._cell_row[present]]
+        return dense.reshape(len(self.instruments), self.n_years)
+
+    def _from_dense(self, dense: np.ndarray) -> np.ndarray:
+        result = np.full(self.n_rows, np.nan)
+        result[self.valid] = dense.reshape(-1)[self.cells[self.valid]]
+        return result
+
+    def lag(self, values: ArrayLike, k: int = 1):
+        """
+        Value of the same instrument ``k`` years earlier (NaN if that year is missing).
+
+        Parameters
+        ----------
+        values : array-like
+            Column aligned to the panel rows
+        k : int, default=1
+            Number of years; negative values give leads
+
+        Returns
+        -------
+        pd.Series or np.ndarray
+            Lagged values (Series with the input's index if a Series was given)
+        """
+        data = self._values(values)
+        target_year = self.year_codes - k
+        ok = self.valid & (target_year >= 0) & (target_year < self.n_years)
+        source = np.full(self.n_rows, -1, dtype=np.int64)
+        source[ok] = self._cell_row[self.inst_codes[ok] * self.n_years + target_year[ok]]
+        result = np.full(self.n_rows, np.nan)
+        found = source >= 0
+        result[found] = data[source[found]]
+        return self._wrap(result, values)
+
+    def lead(self, values: ArrayLike, k: int = 1):
+        """Value of the same instrument ``k`` years later (NaN if that year is missing)."""
+        return self.lag(values, -k)
+
+    def diff(self, values: ArrayLike, k: int = 1):
+        """Change from ``k`` years earlier (NaN if that year is missing)."""
+        data = self._values(values)
+        return self._wrap(data - self._values(self.lag(data, k)), values)
+
+    def rolling(
+        self,
+        values: ArrayLike,
+        window: int,
+        func: str = 'mean',
+        min_periods: Optional[int] = None,
+        lag: int = 0
+    ):
+        """
+        Statistic over a window of calendar years.
+
+        The window for year t covers years ``t - lag - window + 1`` to
+        ``t - lag``; missing years count as missing observations, not as
+        extra history.
+
+        Parameters
+        ----------
+        values : array-like
+            Column aligned to the panel rows
+        window : int
+            Window length in years
+        func : str, default='mean'
+            One of 'mean', 'sum', 'count', 'std' (ddof=1), 'min', 'max'
+        min_periods : int, optional
+            Minimum observations in the window (default: ``window``)
+        lag : int, default=0
+            Shift the window back by this many years (1 = prior years only)
+
+        Returns
+        -------
+        pd.Series or np.ndarray
+            Rolling statistic per row
+        """
+        if func not in _ROLLING_FUNCS:
+            raise ValueError(f"func must be one of {_ROLLING_FUNCS}")
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        min_periods = window if min_periods is None else min_periods
+        dense = self._dense(self._values(values))
+        n_inst, n_years = dense.shape
+
+        # Pad with window-1 missing years in front so every year has a full window
+        pad = np.full((n_inst, window - 1), np.nan)
+        padded = np.concatenate([pad, dense], axis=1)
+        windows = np.lib.stride_tricks.sliding_window_view(padded, window, axis=1)  # (n_inst, n_years, window)
+        present = ~np.isnan(windows)
+        count = present.sum(axis=2)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if func == 'count':
+                stat = count.astype(float)
+            elif func == 'sum':
+                stat = np.nansum(windows, axis=2)
+            elif func == 'mean':
+                stat = np.nansum(windows, axis=2) / count
+            elif func == 'std':
+                mean = np.nansum(windows, axis=2) / count
+                sq = np.nansum((windows - mean[..., None]) ** 2, axis=2)
+                stat = np.sqrt(sq / (count - 1))
+            elif func == 'min':
+                stat = np.where(count > 0, np.nanmin(np.where(present, windows, np.inf), axis=2), np.nan)
+            else:
+                stat = np.where(count > 0, np.nanmax(np.where(present, windows, -np.inf), axis=2), np.nan)
+        stat = np.where(count >= max(min_periods, 1 if func != 'count' else 0), stat, np.nan)
+        stat = self._shift_dense(stat, lag, fill=0.0 if func == 'count' else np.nan)
+        return self._wrap(self._from_dense(stat), values)
+
+    def expanding(self, values: ArrayLike, func: str = 'mean', lag: int = 0):
+        """
+        Statistic over all of an instrument's years up to ``t - lag``.
+
+        Parameters
+        ----------
+        values : array-like
+            Column aligned to the panel rows
+        func : str, default='mean'
+            One of 'mean', 'sum', 'count'
+        lag : int, default=0
+            1 uses prior years only
+
+        Returns
+        -------
+        pd.Series or np.ndarray
+            Expanding statistic per row (NaN before the first observation)
+        """
+        if func not in ('mean', 'sum', 'count'):
+            raise ValueError("func must be one of ('mean', 'sum', 'count')")
+        dense = self._dense(self._values(values))
+        count = np.cumsum(~np.isnan(dense), axis=1).astype(float)
+        total = np.cumsum(np.nan_to_num(dense), axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            stat = {'mean': total / count, 'sum': total, 'count': count}[func]
+        if func != 'count':
+            stat = np.where(count > 0, stat, np.nan)
+        stat = self._shift_dense(stat, lag, fill=0.0 if func == 'count' else np.nan)
+        return self._wrap(self._from_dense(stat), values)
+
+    @staticmethod
+    def _shift_dense(stat: np.ndarray, lag: int, fill: float = np.nan) -> np.ndarray:
+        """Move year columns right by ``lag``; years shifted in from outside the panel get ``fill``."""
+        if lag == 0:
+            return stat
+        shifted = np.full_like(stat, fill)
+        if lag > 0:
+            shifted[:, lag:] = stat[:, :-lag]
+        else:
+            shifted[:, :lag] = stat[:, -lag:]
+        return shifted
+
+    def gaps(self) -> pd.DataFrame:
+        """
+        Missing years inside each instrument's observed span.
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per missing (instrument, year) between an instrument's
+            first and last observed year
+        """
+        present = (self._cell_row >= 0).reshape(len(self.instruments), self.n_years)
+        seen = np.maximum.accumulate(present, axis=1) & np.maximum.accumulate(present[:, ::-1], axis=1)[:, ::-1]
+        inst, year = np.nonzero(seen & ~present)
+        return pd.DataFrame({'instrument': self.instruments[inst], 'year': year + self.first_year})
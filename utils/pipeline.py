@@ -0,0 +1,356 @@
+"""
+Stage DAG runner for the DD/PD production flow.
+
+Each stage declares the files it reads and writes. Dependencies between
+stages are derived from those declarations, stages whose code and inputs
+are unchanged since their last successful run are skipped, and stages with
+no dependency on each other run concurrently. A stage's code includes the
+``utils`` modules it imports (transitively), so editing a helper module
+invalidates every stage that uses it.
+"""
+
+import fnmatch
+import hashlib
+import json
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+
+@dataclass
+class Stage:
+    """
+    One step of the pipeline.
+
+    Attributes
+    ----------
+    name : str
+        Stage name used on the command line and in the state file
+    code : str
+        Script (.py) or notebook (.ipynb) path, relative to the repo root
+    inputs : List[str]
+        Files read by the stage (relative paths; glob patterns resolve to
+        the latest run, see ``resolve``)
+    outputs : List[str]
+        Files written by the stage (relative paths or glob patterns)
+    """
+    name: str
+    code: str
+    inputs: List[str] = field(default_factory=list)
+    outputs: List[str] = field(default_factory=list)
+
+    def command(self, base_dir: Path, log_dir: Path) -> List[str]:
+        """Command line that runs the stage headlessly."""
+        if self.code.endswith('.ipynb'):
+            return [sys.executable, '-m', 'jupyter', 'nbconvert', '--to', 'notebook', '--execute',
+                    str(base_dir / self.code), '--output-dir', str(log_dir),
+                    '--ExecutePreprocessor.timeout=-1']
+        return [sys.executable, str(base_dir / self.code)]
+
+
+def hash_file(path: Path, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_code(path: Path) -> str:
+    """
+    SHA-256 of a stage's code.
+
+    For notebooks only the cell sources are hashed, so executing a notebook
+    (which rewrites its outputs) does not invalidate it.
+    """
+    if path.suffix == '.ipynb':
+        nb = json.loads(path.read_text())
+        sources = [(cell['cell_type'], ''.join(cell['source'])) for cell in nb['cells']]
+        return hashlib.sha256(json.dumps(sources).encode()).hexdigest()
+    return hash_file(path)
+
+
+_UTILS_IMPORT = re.compile(r'^\s*(?:from|import)\s+utils\.(\w+)', re.MULTILINE)
+
+
+def _source_text(path: Path) -> str:
+    """Python source of a script or of a notebook's code cells."""
+    if path.suffix == '.ipynb':
+        nb = json.loads(path.read_text())
+        return '\n'.join(''.join(cell['source']) for cell in nb['cells'] if cell['cell_type'] == 'code')
+    return path.read_text()
+
+
+def local_imports(base_dir: Path, code: str) -> List[str]:
+    """
+    ``utils`` modules imported by a stage's code, directly or through other ``utils`` modules.
+
+    Returns
+    -------
+    List[str]
+        Sorted paths relative to ``base_dir`` (e.g., 'utils/regression.py')
+    """
+    base_dir = Path(base_dir)
+    found, queue = set(), [base_dir / code]
+    while queue:
+        for name in _UTILS_IMPORT.findall(_source_text(queue.pop())):
+            module = f'utils/{name}.py'
+            if module not in found and (base_dir / module).exists():
+                found.add(module)
+                queue.append(base_dir / module)
+    return sorted(found)
+
+
+_RUN_NAME = re.compile(r'^(\w+?)_(\d{8}_\d{6})\.\w+$')
+
+
+def _recorded_latest(matches: List[Path]) -> Optional[Path]:
+    """Among glob matches, the latest run recorded in their directory's run manifest."""
+    from utils.manifest import MANIFEST_NAME, RunManifest
+
+    found = set(p.resolve() for p in matches)
+    best = None
+    for directory in {p.parent for p in matches}:
+        if not (directory / MANIFEST_NAME).exists():
+            continue
+        manifest = RunManifest(directory / MANIFEST_NAME)
+        types = {m.group(1) for m in map(_RUN_NAME.match, (p.name for p in matches)) if m}
+        for dataset_type in types:
+            entry = manifest.get(dataset_type)
+            if entry and entry['path'].resolve() in found and (best is None or entry['run_id'] > best[0]):
+                best = (entry['run_id'], entry['path'])
+    return best[1] if best else None
+
+
+def resolve(base_dir: Path, pattern: str) -> Optional[Path]:
+    """
+    Resolve a path or glob pattern to one file.
+
+    A glob resolves to the latest run recorded in the run manifest
+    (``utils.manifest``) of the matches' directory. Without a manifest
+    entry, the match with the latest run timestamp in its name is used
+    (modification time only for names without one).
+    """
+    if any(ch in pattern for ch in '*?['):
+        matches = list(base_dir.glob(pattern))
+        if not matches:
+            return None
+        recorded = _recorded_latest(matches)
+        if recorded is not None:
+            return recorded
+
+        def run_order(path):
+            match = _RUN_NAME.match(path.name)
+            return (match.group(2) if match else '', path.stat().st_mtime)
+
+        return max(matches, key=run_order)
+    path = base_dir / pattern
+    return path if path.exists() else None
+
+
+def _matches(path: str, pattern: str) -> bool:
+    return path == pattern or fnmatch.fnmatch(path, pattern) or fnmatch.fnmatch(pattern, path)
+
+
+class Pipeline:
+    """
+    Run a set of stages in dependency order with content-hash skipping.
+
+    Parameters
+    ----------
+    stages : Sequence[Stage]
+        Stage declarations
+    base_dir : Path
+        Repository root; all stage paths are relative to it
+    state_path : Path
+        JSON file recording the key and outputs of each stage's last
+        successful run
+    log_dir : Path
+        Directory for stage logs and executed notebooks
+    """
+
+    def __init__(self, stages: Sequence[Stage], base_dir: Path, state_path: Path, log_dir: Path):
+        self.stages = {stage.name: stage for stage in stages}
+        self.base_dir = Path(base_dir)
+        self.state_path = Path(state_path)
+        self.log_dir = Path(log_dir)
+        self.deps = self._build_dag()
+        self.state = json.loads(self.state_path.read_text()) if self.state_path.exists() else {}
+        self._hash_cache: Dict[str, List] = self.state.get('_files', {})
+
+    def _build_dag(self) -> Dict[str, List[str]]:
+        deps = {}
+        for name, stage in self.stages.items():
+            deps[name] = sorted(
+                other.name for other in self.stages.values()
+                if other.name != name and any(
+                    _matches(inp, out) for inp in stage.inputs for out in other.outputs
+                )
+            )
+        # Reject cycles early
+        order, seen = [], set()
+
+        def visit(name, path):
+            if name in path:
+                raise ValueError(f"Pipeline has a dependency cycle: {' -> '.join(path + [name])}")
+            if name in seen:
+                return
+            for dep in deps[name]:
+                visit(dep, path + [name])
+            seen.add(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name, [])
+        self.order = order
+        return deps
+
+    def downstream(self, names: Sequence[str]) -> List[str]:
+        """Stages in ``names`` plus everything that depends on them."""
+        selected = set(names)
+        changed = True
+        while changed:
+            changed = False
+            for name in self.order:
+                if name not in selected and selected.intersection(self.deps[name]):
+                    selected.add(name)
+                    changed = True
+        return [name for name in self.order if name in selected]
+
+    def _file_hash(self, path: Path) -> str:
+        stat = path.stat()
+        key = str(path.relative_to(self.base_dir))
+        cached = self._hash_cache.get(key)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        digest = hash_file(path)
+        self._hash_cache[key] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+    def stage_key(self, stage: Stage) -> Optional[str]:
+        """Hash of the stage's code, its ``utils`` imports and current inputs (None if an input is missing)."""
+        parts = [stage.code, hash_code(self.base_dir / stage.code)]
+        for module in local_imports(self.base_dir, stage.code):
+            parts += [module, self._file_hash(self.base_dir / module)]
+        for pattern in stage.inputs:
+            path = resolve(self.base_dir, pattern)
+            if path is None:
+                return None
+            parts += [pattern, self._file_hash(path)]
+        return hashlib.sha256('\n'.join(parts).encode()).hexdigest()
+
+    def is_current(self, stage: Stage) -> bool:
+        """True if the last successful run used the same code and inputs."""
+        record = self.state.get(stage.name)
+        key = self.stage_key(stage)
+        if record is None or key is None or record.get('key') != key:
+            return False
+        return all(resolve(self.base_dir, pattern) is not None for pattern in stage.outputs)
+
+    def _run_stage(self, stage: Stage) -> Dict:
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        log_path = self.log_dir / f'{stage.name}.log'
+        started = time.time()
+        with open(log_path, 'w') as log:
+            proc = subprocess.run(stage.command(self.base_dir, self.log_dir), cwd=self.base_dir,
+                                  stdout=log, stderr=subprocess.STDOUT)
+        return {'returncode': proc.returncode, 'seconds': time.time() - started, 'log': str(log_path)}
+
+    def _save_state(self) -> None:
+        self.state['_files'] = self._hash_cache
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(self.state, indent=2, sort_keys=True))
+        tmp_path.replace(self.state_path)
+
+    def run(
+        self,
+        targets: Optional[Sequence[str]] = None,
+        force: bool = False,
+        dry_run: bool = False,
+        jobs: int = 2
+    ) -> Dict[str, str]:
+        """
+        Run the pipeline.
+
+        Parameters
+        ----------
+        targets : Sequence[str], optional
+            Stages to consider (default: all). Their downstream stages are
+            included automatically.
+        force : bool, default False
+            Run the selected stages even if they are current
+        dry_run : bool, default False
+            Only report what would run
+        jobs : int, default 2
+            Maximum number of stages running at the same time
+
+        Returns
+        -------
+        Dict[str, str]
+            Status per stage: 'skipped', 'ran', 'would run', 'failed' or
+            'blocked' (an upstream stage failed)
+        """
+        unknown = set(targets or []) - set(self.stages)
+        if unknown:
+            raise KeyError(f"Unknown stages: {sorted(unknown)}")
+        selected = self.downstream(targets) if targets else list(self.order)
+
+        status: Dict[str, str] = {}
+        pending = list(selected)
+        running = {}
+
+        def ready(name):
+            return all(status.get(dep, 'skipped') in ('skipped', 'ran', 'would run')
+                       for dep in self.deps[name] if dep in selected)
+
+        def done(name):
+            return all(dep not in selected or dep in status for dep in self.deps[name])
+
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            while pending or running:
+                for name in [n for n in pending if done(n)]:
+                    pending.remove(name)
+                    stage = self.stages[name]
+                    if not ready(name):
+                        status[name] = 'blocked'
+                        print(f"[BLOCKED] {name}: upstream stage failed")
+                        continue
+                    upstream_ran = any(status.get(dep) in ('ran', 'would run') for dep in self.deps[name])
+                    if not force and not (dry_run and upstream_ran) and self.is_current(stage):
+                        status[name] = 'skipped'
+                        print(f"[SKIP] {name}: code and inputs unchanged")
+                        continue
+                    if dry_run:
+                        status[name] = 'would run'
+                        print(f"[DRY-RUN] {name}: {' '.join(stage.command(self.base_dir, self.log_dir))}")
+                        continue
+                    print(f"[RUN] {name}")
+                    running[pool.submit(self._run_stage, stage)] = name
+
+                if not running:
+                    continue
+                finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    result = future.result()
+                    if result['returncode'] == 0:
+                        status[name] = 'ran'
+                        self.state[name] = {
+                            'key': self.stage_key(self.stages[name]),
+                            'finished': time.strftime('%Y-%m-%d %H:%M:%S'),
+                            'seconds': round(result['seconds'], 1),
+                        }
+                        self._save_state()
+                        print(f"[DONE] {name} ({result['seconds']:.1f}s)")
+                    else:
+                        status[name] = 'failed'
+                        print(f"[FAILED] {name} (exit {result['returncode']}, see {result['log']})")
+
+        return status
@@ -0,0 +1,253 @@
+"""
+Mergeable quantile sketches for streaming DD/PD panels.
+
+This module provides a KLL (Karnin-Lang-Liberty) sketch that summarizes a
+stream of values in bounded memory and answers approximate quantile
+queries. Sketches built on separate chunks or by parallel workers can be
+merged into one sketch covering the combined data.
+"""
+
+import math
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch with compactors of geometrically decreasing capacity.
+
+    While fewer than ``k`` values have been seen the sketch stores them all
+    and quantiles are exact (same linear interpolation as
+    ``Series.quantile``). Beyond that, the rank error is roughly
+    ``1.7 / k`` of the number of observations.
+
+    Parameters
+    ----------
+    k : int, default=200
+        Capacity of the top compactor; larger values are more accurate
+    seed : int, optional
+        Seed for the random compaction offsets (reproducible sketches)
+
+    Examples
+    --------
+    >>> sketch = KLLSketch(k=200, seed=0)
+    >>> for chunk in chunks:
+    ...     sketch.update(chunk['DD_a'])
+    >>> sketch.quantile([0.01, 0.99])
+    """
+
+    _decay = 2.0 / 3.0
+
+    def __init__(self, k: int = 200, seed: Optional[int] = None):
+        if k < 8:
+            raise ValueError("k must be at least 8")
+        self.k = int(k)
+        self.seed = seed
+        self.n = 0
+        self.min = np.nan
+        self.max = np.nan
+        self._rng = np.random.default_rng(seed)
+        self._levels: List[np.ndarray] = [np.empty(0, dtype=float)]
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self._levels) - level - 1
+        return max(2, int(math.ceil(self.k * self._decay ** depth)))
+
+    def _size(self) -> int:
+        return sum(len(buf) for buf in self._levels)
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(h) for h in range(len(self._levels)))
+
+    def _compress(self) -> None:
+        while self._size() > self._max_size():
+            for h, buf in enumerate(self._levels):
+                if len(buf) < self._capacity(h):
+                    continue
+                if h + 1 == len(self._levels):
+                    self._levels.append(np.empty(0, dtype=float))
+                buf = np.sort(buf)
+                # Keep an odd leftover at this level so weights stay exact
+                leftover = buf[:1] if len(buf) % 2 else buf[:0]
+                paired = buf[len(leftover):]
+                offset = int(self._rng.integers(0, 2))
+                self._levels[h + 1] = np.concatenate([self._levels[h + 1], paired[offset::2]])
+                self._levels[h] = leftover
+                break
+
+    def update(self, values: Sequence[float]) -> 'KLLSketch':
+        """
+        Add a batch of values to the sketch (NaNs are ignored).
+
+        Parameters
+        ----------
+        values : array-like
+            Values to add
+
+        Returns
+        -------
+        KLLSketch
+            The updated sketch (``self``)
+        """
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+
+        self.n += len(values)
+        self.min = np.nanmin([self.min, values.min()])
+        self.max = np.nanmax([self.max, values.max()])
+
+        # Feed large batches in slices so the top compactor never holds
+        # more than a few times its capacity
+        step = max(self.k, 1)
+        for start in range(0, len(values), step):
+            self._levels[0] = np.concatenate([self._levels[0], values[start:start + step]])
+            self._compress()
+        return self
+
+    def merge(self, other: 'KLLSketch') -> 'KLLSketch':
+        """
+        Merge another sketch into this one.
+
+        Parameters
+        ----------
+        other : KLLSketch
+            Sketch built on a different part of the data
+
+        Returns
+        -------
+        KLLSketch
+            The merged sketch (``self``)
+        """
+        if other.n == 0:
+            return self
+        while len(self._levels) < len(other._levels):
+            self._levels.append(np.empty(0, dtype=float))
+        for h, buf in enumerate(other._levels):
+            self._levels[h] = np.concatenate([self._levels[h], buf])
+        self.n += other.n
+        self.min = np.nanmin([self.min, other.min])
+        self.max = np.nanmax([self.max, other.max])
+        self._compress()
+        return self
+
+    @property
+    def is_exact(self) -> bool:
+        """True while no compaction has happened (all values retained)."""
+        return len(self._levels) == 1 or all(len(buf) == 0 for buf in self._levels[1:])
+
+    def quantile(self, q) -> np.ndarray:
+        """
+        Approximate quantiles of all values seen so far.
+
+        Parameters
+        ----------
+        q : float or array-like
+            Quantile(s) in [0, 1]
+
+        Returns
+        -------
+        np.ndarray
+            Quantile estimates (NaN for an empty sketch)
+        """
+        q = np.atleast_1d(np.asarray(q, dtype=float))
+        if self.n == 0:
+            return np.full(len(q), np.nan)
+        if self.is_exact:
+            return np.quantile(self._levels[0], q)
+
+        items = np.concatenate(self._levels)
+        weights = np.concatenate([np.full(len(buf), 2.0 ** h) for h, buf in enumerate(self._levels)])
+        order = np.argsort(items, kind='mergesort')
+        items = items[order]
+        cum = np.cumsum(weights[order])
+        idx = np.searchsorted(cum, q * cum[-1], side='left')
+        result = items[np.clip(idx, 0, len(items) - 1)]
+
+        # Extremes are tracked exactly
+        result = np.where(q <= 0, self.min, result)
+        result = np.where(q >= 1, self.max, result)
+        return result
+
+
+def build_group_sketches(
+    chunks: Iterable[pd.DataFrame],
+    cols: List[str],
+    group_cols: Sequence[str] = ('year', 'dummylarge'),
+    k: int = 200,
+    seed: Optional[int] = None
+) -> Dict[Tuple[str, Hashable], KLLSketch]:
+    """
+    Build one sketch per (column, group) in a single pass over chunked input.
+
+    Overall (ungrouped) sketches are stored under the group key ``None``.
+
+    Parameters
+    ----------
+    chunks : Iterable[pd.DataFrame]
+        Chunks of the panel, e.g. ``pd.read_csv(path, chunksize=100_000)``
+    cols : List[str]
+        Columns to sketch
+    group_cols : Sequence[str], default=('year', 'dummylarge')
+        Grouping columns
+    k : int, default=200
+        Sketch accuracy parameter
+    seed : int, optional
+        Seed for reproducible sketches
+
+    Returns
+    -------
+    Dict[Tuple[str, Hashable], KLLSketch]
+        Sketches keyed by (column, group key)
+    """
+    group_cols = list(group_cols)
+    sketches: Dict[Tuple[str, Hashable], KLLSketch] = {}
+
+    def get(key):
+        if key not in sketches:
+            sketches[key] = KLLSketch(k=k, seed=seed)
+        return sketches[key]
+
+    for chunk in chunks:
+        for col in cols:
+            if col not in chunk.columns:
+                continue
+            get((col, None)).update(chunk[col].to_numpy(dtype=float))
+            if not group_cols:
+                continue
+            valid = chunk.loc[chunk[col].notna(), group_cols + [col]]
+            for key, values in valid.groupby(group_cols, sort=False)[col]:
+                key = key if len(group_cols) > 1 else (key[0] if isinstance(key, tuple) else key)
+                get((col, key)).update(values.to_numpy(dtype=float))
+
+    return sketches
+
+
+def merge_group_sketches(
+    *sketch_maps: Dict[Tuple[str, Hashable], KLLSketch]
+) -> Dict[Tuple[str, Hashable], KLLSketch]:
+    """
+    Combine sketch maps produced by ``build_group_sketches`` on separate
+    chunks or workers.
+
+    Parameters
+    ----------
+    *sketch_maps : Dict[Tuple[str, Hashable], KLLSketch]
+        Sketch maps to merge
+
+    Returns
+    -------
+    Dict[Tuple[str, Hashable], KLLSketch]
+        Merged sketch map (new sketch objects with the seed of the first
+        input sketch; inputs are not modified)
+    """
+    merged: Dict[Tuple[str, Hashable], KLLSketch] = {}
+    for sketch_map in sketch_maps:
+        for key, sketch in sketch_map.items():
+            if key not in merged:
+                merged[key] = KLLSketch(k=sketch.k, seed=sketch.seed)
+            merged[key].merge(sketch)
+    return merged
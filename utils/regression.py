@@ -0,0 +1,429 @@
+"""
+Batched OLS for specification grids.
+
+``analysis.ipynb`` fits the same sequence of models (ESG raw, ESG combined,
+dummies, ESG + each control, full model) for every DD/PD measure. Fitting
+each one with statsmodels re-subsets the frame, rebuilds the design matrix
+and refactorizes it from scratch. ``OLSGrid`` groups the specifications by
+their complete-case sample and forms the centered cross-product matrix of
+each sample once; every specification is then solved from a sub-block of
+that matrix by Cholesky. Adding a model only computes the cross-products of
+columns the sample has not seen yet.
+
+Coefficients, standard errors, R², adjusted R² and the F-test match
+``statsmodels.OLS(y, add_constant(X)).fit()`` on the same sample. Robust
+errors (HC1, clustered, two-way clustered, Driscoll-Kraay) come from
+``utils.covariance``; with them the F-test is the robust Wald test.
+Fits can be kept across runs in a ``utils.result_cache.ResultCache``.
+"""
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from scipy import linalg
+from scipy import stats as sps
+
+from utils.covariance import sandwich_cov
+from utils.result_cache import ResultCache, code_version, sample_fingerprint
+
+SUMMARY_COLUMNS = ['model', 'dependent_var', 'n_obs', 'r_squared', 'adj_r_squared', 'f_statistic', 'prob_f']
+COEFFICIENT_COLUMNS = ['model', 'dependent_var', 'term', 'coef', 'std_err', 't', 'p_value']
+
+# Smallest pivot of the correlation-scaled Cholesky factor accepted as full
+# rank (a squared pivot is 1 - R² of that regressor on the ones before it)
+_PIVOT_TOL = 1e-7
+
+# Source files whose changes invalidate cached fits
+_SOURCES = (Path(__file__), Path(__file__).with_name('covariance.py'))
+
+
+@dataclass(frozen=True)
+class Spec:
+    """One model of the grid: dependent variable and regressors (constant implied)."""
+    model: str
+    y: str
+    X: Tuple[str, ...]
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        return (self.y,) + self.X
+
+
+class Sample:
+    """
+    Complete-case sample shared by one or more specifications.
+
+    Holds the sample's column means, the centered values and their
+    cross-product matrix; columns are added on demand.
+    """
+
+    def __init__(self, mask: np.ndarray):
+        self.mask = mask
+        self.n = int(mask.sum())
+        self.columns: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.means = np.empty(0)
+        self.centered = np.empty((self.n, 0))
+        self.gram = np.empty((0, 0))
+
+    def extend(self, values: Dict[str, np.ndarray]) -> None:
+        """Add columns (full-length arrays) and their cross-products with the existing ones."""
+        new = [c for c in values if c not in self.index]
+        if not new:
+            return
+        block = np.column_stack([values[c][self.mask] for c in new])
+        means = block.mean(axis=0)
+        block = block - means
+        cross = self.centered.T @ block
+        self.gram = np.block([[self.gram, cross], [cross.T, block.T @ block]])
+        self.centered = np.hstack([self.centered, block])
+        self.means = np.concatenate([self.means, means])
+        for c in new:
+            self.index[c] = len(self.columns)
+            self.columns.append(c)
+
+
+@dataclass
+class OLSFit:
+    """
+    Fitted specification.
+
+    Attributes
+    ----------
+    spec : Spec
+        Model definition
+    n_obs : int
+        Complete-case observations
+    params, bse : pd.Series
+        Coefficients and standard errors ('const' first)
+    cov : pd.DataFrame
+        Coefficient covariance matrix
+    df_model, df_resid : int
+        Model and residual degrees of freedom
+    ssr, r_squared, adj_r_squared, f_statistic, prob_f : float
+        Fit statistics (as in statsmodels)
+    cov_type : str
+        Covariance estimator of ``cov``
+    df_inference : int
+        Denominator degrees of freedom of the t- and F-tests (G - 1 for
+        clustered errors, df_resid otherwise)
+    """
+    spec: Spec
+    n_obs: int
+    params: pd.Series
+    bse: pd.Series
+    cov: pd.DataFrame
+    df_model: int
+    df_resid: int
+    ssr: float
+    r_squared: float
+    adj_r_squared: float
+    f_statistic: float
+    prob_f: float
+    cov_type: str = 'nonrobust'
+    df_inference: Optional[int] = None
+
+    @property
+    def tvalues(self) -> pd.Series:
+        return self.params / self.bse
+
+    @property
+    def pvalues(self) -> pd.Series:
+        df = self.df_resid if self.df_inference is None else self.df_inference
+        return pd.Series(2 * sps.t.sf(np.abs(self.tvalues), df), index=self.params.index)
+
+    def summary_row(self) -> Dict:
+        return {'model': self.spec.model, 'dependent_var': self.spec.y, 'n_obs': self.n_obs,
+                'r_squared': self.r_squared, 'adj_r_squared': self.adj_r_squared,
+                'f_statistic': self.f_statistic, 'prob_f': self.prob_f}
+
+    def coefficient_table(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            'model': self.spec.model, 'dependent_var': self.spec.y, 'term': self.params.index,
+            'coef': self.params.to_numpy(), 'std_err': self.bse.to_numpy(),
+            't': self.tvalues.to_numpy(), 'p_value': self.pvalues.to_numpy(),
+        })
+
+
+@dataclass
+class GridResults:
+    """
+    Fits of an ``OLSGrid`` in the order the specifications were added.
+
+    Attributes
+    ----------
+    fits : Dict[str, OLSFit]
+        Fitted models by name
+    skipped : Dict[str, int]
+        Models with fewer than ``min_obs`` complete cases -> their count
+    """
+    fits: Dict[str, OLSFit] = field(default_factory=dict)
+    skipped: Dict[str, int] = field(default_factory=dict)
+
+    def __getitem__(self, model: str) -> OLSFit:
+        return self.fits[model]
+
+    @property
+    def summary(self) -> pd.DataFrame:
+        """One row per model, with the columns of ``regression_summary_<ts>.csv``."""
+        return pd.DataFrame([f.summary_row() for f in self.fits.values()], columns=SUMMARY_COLUMNS)
+
+    @property
+    def coefficients(self) -> pd.DataFrame:
+        """One row per model and term."""
+        if not self.fits:
+            return pd.DataFrame(columns=COEFFICIENT_COLUMNS)
+        return pd.concat([f.coefficient_table() for f in self.fits.values()], ignore_index=True)
+
+
+def _solve(sample: Sample, spec: Spec) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Slopes and inverse centered cross-product block for one specification."""
+    j = [sample.index[c] for c in spec.X]
+    cxx = sample.gram[np.ix_(j, j)]
+    cxy = sample.gram[j, sample.index[spec.y]]
+    k = len(j)
+    if k == 0:
+        return np.empty(0), np.empty((0, 0)), 0
+    scale = np.sqrt(np.diag(cxx))
+    if np.all(scale > 0):
+        # Cholesky of the correlation-scaled block; rescale afterwards
+        corr = cxx / np.outer(scale, scale)
+        try:
+            factor = linalg.cholesky(corr, lower=True)
+        except linalg.LinAlgError:
+            factor = None
+        if factor is not None and np.diag(factor).min() > _PIVOT_TOL:
+            inv = linalg.cho_solve((factor, True), np.eye(k)) / np.outer(scale, scale)
+            return inv @ cxy, inv, k
+    # Rank-deficient design: minimum-norm solution, as statsmodels' pinv
+    inv = np.linalg.pinv(cxx, hermitian=True)
+    return inv @ cxy, inv, int(np.linalg.matrix_rank(cxx, hermitian=True))
+
+
+class OLSGrid:
+    """
+    Grid of OLS specifications on one data frame.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        Estimation data (e.g., the merged panel)
+    min_obs : int, default 10
+        Models with fewer complete cases are skipped
+    cov_type : str, default 'nonrobust'
+        'nonrobust' or a ``utils.covariance.sandwich_cov`` estimator
+        ('HC1', 'cluster', 'twoway', 'driscoll_kraay')
+    groups : str or Sequence[str], optional
+        Cluster column ('cluster') or the two cluster columns ('twoway');
+        rows missing them are dropped from every sample
+    time : str, optional
+        Period column for 'driscoll_kraay'
+    maxlags : int, optional
+        Driscoll-Kraay Bartlett lags
+
+    Examples
+    --------
+    >>> grid = OLSGrid(df)
+    >>> grid.add('DD_m', ['m_esg_combined_score'], 'ESG Combined → DD_m')
+    >>> grid.add('DD_m', ['m_esg_combined_score', 'm_lnta'], 'ESG + lnta → DD_m')
+    >>> results = grid.fit()
+    >>> results.summary
+    """
+
+    def __init__(
+        self,
+        data: pd.DataFrame,
+        min_obs: int = 10,
+        cov_type: str = 'nonrobust',
+        groups: Optional[Union[str, Sequence[str]]] = None,
+        time: Optional[str] = None,
+        maxlags: Optional[int] = None
+    ):
+        self.data = data
+        self.min_obs = min_obs
+        self.cov_type = cov_type
+        self.groups = groups
+        self.time = time
+        self.maxlags = maxlags
+        label_cols = [groups] if isinstance(groups, str) else list(groups or [])
+        label_cols += [time] if time else []
+        self._label_cols = label_cols
+        self._labeled = ~data[label_cols].isna().any(axis=1).to_numpy() if label_cols else None
+        self.specs: Dict[str, Spec] = {}
+        self._values: Dict[str, np.ndarray] = {}
+        self._samples: Dict[bytes, Sample] = {}
+        self._fits: Dict[Spec, Optional[OLSFit]] = {}
+
+    def add(self, y: str, X: Sequence[str], model: Optional[str] = None) -> Spec:
+        """Register a model (named '<X> → <y>' by default); returns its spec."""
+        model = model or f"{' + '.join(X)} → {y}"
+        if model in self.specs:
+            raise ValueError(f"Model '{model}' is already in the grid")
+        spec = Spec(model, y, tuple(X))
+        self.specs[model] = spec
+        return spec
+
+    def _column(self, name: str) -> np.ndarray:
+        if name not in self._values:
+            self._values[name] = self.data[name].to_numpy(dtype=float, na_value=np.nan)
+        return self._values[name]
+
+    def sample(self, spec: Spec) -> Sample:
+        """Complete-case sample of a specification (shared with specs of the same sample)."""
+        values = {c: self._column(c) for c in spec.columns}
+        mask = ~np.isnan(np.column_stack(list(values.values()))).any(axis=1)
+        if self._labeled is not None:
+            mask &= self._labeled
+        key = np.packbits(mask).tobytes()
+        sample = self._samples.setdefault(key, Sample(mask))
+        sample.extend(values)
+        return sample
+
+    @property
+    def n_samples(self) -> int:
+        """Distinct complete-case samples formed so far."""
+        return len(self._samples)
+
+    def design(self, model: str, clusters: Optional[str] = None) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Estimation sample of a model, e.g. for ``utils.bootstrap``.
+
+        Parameters
+        ----------
+        model : str
+            Registered model name
+        clusters : str, optional
+            Cluster column (default: the grid's ``groups`` column)
+
+        Returns
+        -------
+        names : List[str]
+            'const' and the regressors
+        X : np.ndarray
+            Design matrix with the constant first
+        y : np.ndarray
+            Dependent variable
+        labels : np.ndarray or None
+            Cluster labels of the sample rows
+        """
+        spec = self.specs[model]
+        sample = self.sample(spec)
+        jx = [sample.index[c] for c in spec.X]
+        X = np.column_stack([np.ones(sample.n), sample.centered[:, jx] + sample.means[jx]])
+        y = sample.centered[:, sample.index[spec.y]] + sample.means[sample.index[spec.y]]
+        clusters = clusters or (self.groups if isinstance(self.groups, str) else None)
+        labels = self._labels(clusters, sample) if clusters else None
+        return ['const', *spec.X], X, y, labels
+
+    def _labels(self, columns, sample: Sample):
+        """Cluster or period labels of a sample's rows."""
+        if columns is None:
+            return None
+        if isinstance(columns, str):
+            return self.data[columns].to_numpy()[sample.mask]
+        return tuple(self.data[c].to_numpy()[sample.mask] for c in columns)
+
+    def _fit_spec(self, spec: Spec) -> Optional[OLSFit]:
+        sample = self.sample(spec)
+        n = sample.n
+        if n < self.min_obs:
+            return None
+        slopes, inv, rank = _solve(sample, spec)
+        iy = sample.index[spec.y]
+        tss = sample.gram[iy, iy]
+        cxy = sample.gram[[sample.index[c] for c in spec.X], iy]
+        ssr = max(tss - slopes @ cxy, 0.0)
+        df_resid = n - rank - 1
+        scale = ssr / df_resid
+
+        jx = [sample.index[c] for c in spec.X]
+        x_means = sample.means[jx]
+        intercept = sample.means[iy] - x_means @ slopes
+        # (X'X)^-1 of the design with the constant, from the centered block
+        cross = -inv @ x_means
+        bread = np.block([
+            [np.array([[1 / n + x_means @ inv @ x_means]]), cross[None, :]],
+            [cross[:, None], inv],
+        ])
+        names = ['const', *spec.X]
+        r_squared = 1 - ssr / tss if tss > 0 else np.nan
+        df_inference = df_resid
+        if self.cov_type == 'nonrobust':
+            cov = scale * bread
+            if rank > 0:
+                f_statistic = (r_squared / rank) / ((1 - r_squared) / df_resid)
+        else:
+            resid = sample.centered[:, iy] - sample.centered[:, jx] @ slopes
+            design = np.column_stack([np.ones(n), sample.centered[:, jx] + x_means])
+            cov, n_groups = sandwich_cov(
+                bread, design * resid[:, None], self.cov_type, df_resid=df_resid,
+                groups=self._labels(self.groups, sample), time=self._labels(self.time, sample),
+                maxlags=self.maxlags,
+            )
+            if n_groups is not None:
+                df_inference = n_groups - 1
+            if rank > 0:
+                # Robust Wald test that all slopes are zero
+                wald = slopes @ np.linalg.pinv(cov[1:, 1:], hermitian=True) @ slopes
+                f_statistic = wald / rank
+        if rank > 0:
+            prob_f = float(sps.f.sf(f_statistic, rank, df_inference))
+        else:
+            f_statistic = prob_f = np.nan
+        return OLSFit(
+            spec=spec,
+            n_obs=n,
+            params=pd.Series(np.concatenate([[intercept], slopes]), index=names),
+            bse=pd.Series(np.sqrt(np.diag(cov)), index=names),
+            cov=pd.DataFrame(cov, index=names, columns=names),
+            df_model=rank,
+            df_resid=df_resid,
+            ssr=ssr,
+            r_squared=r_squared,
+            adj_r_squared=1 - (n - 1) / df_resid * (1 - r_squared),
+            f_statistic=f_statistic,
+            prob_f=prob_f,
+            cov_type=self.cov_type,
+            df_inference=df_inference,
+        )
+
+    def _cache_key(self, spec: Spec, version: str) -> str:
+        """Specification, sample threshold, covariance options and sample fingerprint of a model."""
+        return ResultCache.key('ols', repr(spec), self.min_obs, self.cov_type, self.groups, self.time, self.maxlags,
+                               sample_fingerprint(self.data, spec.columns, self._label_cols), version)
+
+    def fit(self, cache: Optional[ResultCache] = None) -> GridResults:
+        """
+        Fit every model not fitted yet and return results for the whole grid.
+
+        Parameters
+        ----------
+        cache : ResultCache, optional
+            Store of earlier fits; models whose specification and sample
+            are unchanged are read from it instead of being refitted
+
+        Returns
+        -------
+        GridResults
+            Fits and skipped models
+        """
+        version = code_version(*_SOURCES) if cache is not None else None
+        results = GridResults()
+        for model, spec in self.specs.items():
+            if spec not in self._fits:
+                key = self._cache_key(spec, version) if cache is not None else None
+                fitted = cache.get(key) if cache is not None else None
+                if fitted is None:
+                    fitted = self._fit_spec(spec)
+                    if cache is not None and fitted is not None:
+                        cache.put(key, fitted, label=model)
+                self._fits[spec] = fitted
+            fitted = self._fits[spec]
+            if fitted is None:
+                results.skipped[model] = self.sample(spec).n
+            else:
+                results.fits[model] = fitted
+        return results
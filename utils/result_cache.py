@@ -0,0 +1,182 @@
+"""
+Persistent cache of fitted models keyed by their exact estimation sample.
+
+Rerunning ``analysis.ipynb`` on an unchanged merged dataset refits every
+model. ``ResultCache`` stores fitted results in a SQLite file under
+``data/cache``. Each result is keyed by a SHA-256 over:
+
+- the specification (model, variables, instruments) and covariance options
+- the sample fingerprint: the bytes of the selected columns (and cluster
+  labels) after dropping incomplete rows
+- the source code of the estimator modules
+
+An identical request is served from the cache without building the design.
+Any change to the sample, the specification or the estimator code gives
+a new key.
+
+A cache opened with ``source`` (the merged run id) drops the entries of
+every other run, so the file does not grow across runs.
+"""
+
+import hashlib
+import json
+import pickle
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from utils.pipeline import hash_file
+
+CACHE_NAME = 'regression_results.sqlite'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    source TEXT,
+    label TEXT,
+    payload BLOB NOT NULL,
+    created TEXT NOT NULL
+);
+"""
+
+
+def _update(digest, values: np.ndarray) -> None:
+    if values.dtype.kind in 'biuf':
+        digest.update(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+    else:
+        digest.update(pd.util.hash_array(np.asarray(values, dtype=object)).tobytes())
+
+
+def array_fingerprint(*arrays: np.ndarray) -> str:
+    """SHA-256 over the shapes and bytes of several arrays (labels are hashed element-wise)."""
+    digest = hashlib.sha256()
+    for values in arrays:
+        values = np.asarray(values)
+        digest.update(repr(values.shape).encode())
+        _update(digest, values)
+    return digest.hexdigest()
+
+
+def sample_fingerprint(data: pd.DataFrame, columns: Sequence[str], labels: Sequence[str] = ()) -> str:
+    """
+    Fingerprint of a model's complete-case sample.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        Estimation data
+    columns : Sequence[str]
+        Numeric model columns
+    labels : Sequence[str], default ()
+        Cluster or period columns
+
+    Returns
+    -------
+    str
+        SHA-256 over the column names and the values of the rows where
+        no column is missing
+    """
+    columns, labels = list(columns), list(labels)
+    values = np.column_stack([data[c].to_numpy(dtype=float, na_value=np.nan) for c in columns])
+    mask = ~np.isnan(values).any(axis=1)
+    for col in labels:
+        mask &= data[col].notna().to_numpy()
+    digest = hashlib.sha256(json.dumps(columns + labels).encode())
+    digest.update(np.ascontiguousarray(values[mask]).tobytes())
+    for col in labels:
+        _update(digest, data[col].to_numpy()[mask])
+    return digest.hexdigest()
+
+
+def code_version(*paths: Union[str, Path]) -> str:
+    """Hash of the estimator source files, so that code changes invalidate cached fits."""
+    return hashlib.sha256(''.join(hash_file(Path(p)) for p in paths).encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    SQLite store of pickled fit results.
+
+    Parameters
+    ----------
+    path : str or Path
+        Cache file, usually ``data/cache/regression_results.sqlite``
+    source : str, optional
+        Identifier of the input data (the merged run id); entries recorded
+        for another source are removed on open
+
+    Examples
+    --------
+    >>> cache = ResultCache(base_dir / 'data' / 'cache' / CACHE_NAME, source=merged_run['run_id'])
+    >>> results = ols_grid.fit(cache=cache)
+    >>> cache.hits, cache.misses
+    """
+
+    def __init__(self, path: Union[str, Path], source: Optional[str] = None):
+        self.path = Path(path)
+        self.source = source
+        self.hits = 0
+        self.misses = 0
+        if source is not None:
+            self.invalidate(source)
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.executescript(_SCHEMA)
+        return conn
+
+    @staticmethod
+    def key(*parts: Any) -> str:
+        """Cache key of a request (parts must be JSON-serializable or have a stable repr)."""
+        return hashlib.sha256(json.dumps(parts, default=repr).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Cached result or None."""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT payload FROM results WHERE key = ?", (key,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return pickle.loads(row[0])
+
+    def put(self, key: str, value: Any, label: Optional[str] = None) -> None:
+        """Store a result under ``key``."""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                             (key, self.source, label, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL),
+                              time.strftime('%Y-%m-%d %H:%M:%S')))
+        finally:
+            conn.close()
+
+    def invalidate(self, source: Optional[str] = None) -> int:
+        """Remove entries of other sources (all entries if ``source`` is None); returns the count."""
+        conn = self._connect()
+        try:
+            with conn:
+                if source is None:
+                    removed = conn.execute("DELETE FROM results").rowcount
+                else:
+                    removed = conn.execute("DELETE FROM results WHERE source IS NOT ?", (source,)).rowcount
+        finally:
+            conn.close()
+        return removed
+
+    def entries(self) -> pd.DataFrame:
+        """One row per cached result (without the payload)."""
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT key, source, label, length(payload), created FROM results").fetchall()
+        finally:
+            conn.close()
+        return pd.DataFrame(rows, columns=['key', 'source', 'label', 'bytes', 'created'])
@@ -0,0 +1,305 @@
+"""
+Schema registry for the core panel tables.
+
+Declares, per table, which columns are categorical string keys, which are
+small integers (years, window lengths, 0/1 dummies) and which are nullable
+booleans. ``read_table`` applies a schema while reading a CSV so that
+string keys are parsed straight into categoricals; ``apply_schema`` does the
+same for frames that are already loaded (e.g., Parquet datasheets).
+Measures stay float64 unless ``compact_floats=True`` is requested.
+
+Notes
+-----
+Group-bys on categorical keys should pass ``observed=True`` (the default
+from pandas 3 on); otherwise pandas 2 returns a row for every category,
+including ones filtered out of the frame.
+"""
+
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class TableSchema:
+    """
+    Column types of one table.
+
+    Attributes
+    ----------
+    name : str
+        Registry name
+    categorical : Tuple[str, ...]
+        String columns stored as ``category`` (keys, methods, statuses)
+    integer : Dict[str, str]
+        Integer columns and their numpy dtype (e.g., ``{'year': 'int16'}``).
+        Columns with missing values use the nullable equivalent ('Int16').
+    boolean : Tuple[str, ...]
+        Flag columns stored as the nullable ``boolean`` dtype
+    """
+    name: str
+    categorical: Tuple[str, ...] = ()
+    integer: Dict[str, str] = field(default_factory=dict)
+    boolean: Tuple[str, ...] = ()
+
+    def prefixed(self, prefix: str, keep: Sequence[str] = ()) -> 'TableSchema':
+        """Same schema with ``prefix`` added to every column not in ``keep``."""
+        def rename(col):
+            return col if col in keep else f'{prefix}{col}'
+        return TableSchema(
+            name=f'{prefix}{self.name}',
+            categorical=tuple(rename(c) for c in self.categorical),
+            integer={rename(c): dtype for c, dtype in self.integer.items()},
+            boolean=tuple(rename(c) for c in self.boolean),
+        )
+
+
+def _combine(name: str, *schemas: TableSchema) -> TableSchema:
+    integer: Dict[str, str] = {}
+    for schema in schemas:
+        integer.update(schema.integer)
+    return TableSchema(
+        name=name,
+        categorical=tuple(dict.fromkeys(c for s in schemas for c in s.categorical)),
+        integer=integer,
+        boolean=tuple(dict.fromkeys(c for s in schemas for c in s.boolean)),
+    )
+
+
+# 0/1 dummies are small integers rather than booleans: regressions and
+# tabulations in analysis.ipynb treat them as numeric regressors.
+_DUMMIES = {'covid': 'int8', 'dummylarge': 'int8', 'dummymid': 'int8'}
+_KEYS = TableSchema('keys', categorical=('instrument',), integer={'year': 'int16'})
+
+_ACCOUNTING = _combine('accounting', _KEYS, TableSchema(
+    'accounting_output',
+    categorical=('E_source', 'naive_status'),
+    boolean=('weak_E_proxy',),
+))
+_MARKET = _combine('market', _KEYS, TableSchema(
+    'market_output',
+    categorical=('ticker_prefix', 'symbol', 'solver_status', 'sigma_E_method', 'status_flag'),
+    integer={**_DUMMIES, 'sigma_E_window_months': 'int16', 'sigmaE_window_end_year': 'int16',
+             'sigmaE_window_start_year': 'int16', 'nfev': 'int32'},
+))
+
+SCHEMAS: Dict[str, TableSchema] = {
+    'book2_clean': _combine('book2_clean', _KEYS),
+    'esg_0718_clean': _combine('esg_0718_clean', _KEYS, TableSchema('esg', integer=dict(_DUMMIES))),
+    'equity_volatility_by_year': TableSchema(
+        'equity_volatility_by_year',
+        categorical=('ticker_base', 'company', 'sigma_E_method', 'sigma_E_flag'),
+        integer={'year': 'int16', 'sigma_E_window_months': 'int16', 'sigma_E_obs_count': 'int16',
+                 'sigmaE_window_start_year': 'int16', 'sigmaE_window_end_year': 'int16'},
+    ),
+    'marketcap_annual': TableSchema(
+        'marketcap_annual', categorical=('symbol',), integer={'year': 'int16'},
+    ),
+    'monthly_returns': TableSchema(
+        'monthly_returns', categorical=('Instrument',), integer={'Index': 'int32'},
+    ),
+    'accounting': _ACCOUNTING,
+    'market': _MARKET,
+    # Side-specific columns carry the a_/m_ prefix; columns identical on both
+    # sides are stored once under their own name (see utils.merge)
+    'merged': _combine(
+        'merged',
+        _ACCOUNTING,
+        _MARKET,
+        _ACCOUNTING.prefixed('a_', keep=('instrument', 'year')),
+        _MARKET.prefixed('m_', keep=('instrument', 'year')),
+    ),
+}
+
+
+def get_schema(schema: Union[str, TableSchema]) -> TableSchema:
+    """Look up a schema by name (TableSchema instances pass through)."""
+    if isinstance(schema, TableSchema):
+        return schema
+    if schema not in SCHEMAS:
+        raise KeyError(f"Unknown table schema '{schema}'. Known: {sorted(SCHEMAS)}")
+    return SCHEMAS[schema]
+
+
+def _to_integer(series: pd.Series, dtype: str) -> pd.Series:
+    values = pd.to_numeric(series, errors='coerce')
+    present = values.dropna()
+    if len(present) and not np.array_equal(present, np.round(present)):
+        return series  # not integral; leave as read
+    if values.isna().any():
+        return values.astype(dtype.capitalize())
+    return values.astype(dtype)
+
+
+def _to_boolean(series: pd.Series) -> pd.Series:
+    if series.dtype == bool or str(series.dtype) == 'boolean':
+        return series.astype('boolean')
+    mapping = {True: True, False: False, 1: True, 0: False,
+               'True': True, 'False': False, 'true': True, 'false': False, '1': True, '0': False}
+    return series.map(lambda v: mapping.get(v, pd.NA) if pd.notna(v) else pd.NA).astype('boolean')
+
+
+def apply_schema(
+    df: pd.DataFrame,
+    schema: Union[str, TableSchema],
+    compact_floats: bool = False
+) -> pd.DataFrame:
+    """
+    Cast a frame to a table schema.
+
+    Columns the schema does not mention keep their dtype (floats become
+    float32 when ``compact_floats`` is set); schema columns missing from
+    the frame are skipped.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Table to cast
+    schema : str or TableSchema
+        Registry name (see ``SCHEMAS``) or schema
+    compact_floats : bool, default False
+        Store float64 measures as float32 (about 7 significant digits)
+
+    Returns
+    -------
+    pd.DataFrame
+        Cast copy of ``df``
+    """
+    schema = get_schema(schema)
+    df = df.copy()
+    for col in schema.categorical:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    for col, dtype in schema.integer.items():
+        if col in df.columns:
+            df[col] = _to_integer(df[col], dtype)
+    for col in schema.boolean:
+        if col in df.columns:
+            df[col] = _to_boolean(df[col])
+    if compact_floats:
+        floats = df.select_dtypes(include='float64').columns
+        df[floats] = df[floats].astype('float32')
+    return df
+
+
+def read_table(
+    path: Union[str, Path],
+    schema: Union[str, TableSchema],
+    compact_floats: bool = False,
+    **read_csv_kwargs
+) -> pd.DataFrame:
+    """
+    Read a CSV table with its schema applied.
+
+    Categorical columns are parsed directly as categoricals, so their
+    strings are materialized once per distinct value rather than per row.
+
+    Parameters
+    ----------
+    path : str or Path
+        CSV file
+    schema : str or TableSchema
+        Registry name (see ``SCHEMAS``) or schema
+    compact_floats : bool, default False
+        Store float64 measures as float32
+    **read_csv_kwargs
+        Passed to ``pd.read_csv``
+
+    Returns
+    -------
+    pd.DataFrame
+        Typed table
+    """
+    schema = get_schema(schema)
+    dtype = {col: 'category' for col in schema.categorical}
+    if read_csv_kwargs.get('engine') == 'pyarrow':
+        # With a dtype mapping the pyarrow engine casts integer columns that
+        # have gaps back to int64 and fails; read them as floats and let
+        # apply_schema pick the (nullable) integer dtype
+        dtype.update({col: 'float64' for col in schema.integer})
+    dtype.update(read_csv_kwargs.pop('dtype', {}) or {})
+    df = pd.read_csv(path, dtype=dtype, **read_csv_kwargs)
+    return apply_schema(df, schema, compact_floats=compact_floats)
+
+
+def align_categories(*frames: pd.DataFrame, cols: Sequence[str] = ('instrument',)) -> Tuple[pd.DataFrame, ...]:
+    """
+    Give categorical key columns identical categories across frames.
+
+    Merging on categoricals is only fast when both sides share the same
+    categories; otherwise pandas falls back to comparing strings.
+
+    Parameters
+    ----------
+    *frames : pd.DataFrame
+        Frames to be merged with each other
+    cols : Sequence[str], default ('instrument',)
+        Key columns to align (converted to categorical where needed)
+
+    Returns
+    -------
+    Tuple[pd.DataFrame, ...]
+        Copies of the frames with aligned categories
+    """
+    frames = tuple(frame.copy() for frame in frames)
+    for col in cols:
+        present = [frame for frame in frames if col in frame.columns]
+        if not present:
+            continue
+        categories = pd.Index(sorted(set().union(*(frame[col].dropna().unique() for frame in present))))
+        for frame in present:
+            frame[col] = pd.Categorical(frame[col], categories=categories)
+    return frames
+
+
+def memory_report(
+    tables: Dict[str, Union[str, Path]],
+    merge_keys: Optional[Sequence[str]] = ('instrument', 'year')
+) -> pd.DataFrame:
+    """
+    Memory footprint of tables read with default dtypes versus the schema.
+
+    Parameters
+    ----------
+    tables : Dict[str, str or Path]
+        Schema name -> CSV path
+    merge_keys : Sequence[str], optional
+        If every key is present, also time a self-merge on these keys with
+        default and schema dtypes
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per table: rows, columns, bytes with default dtypes, with
+        the schema, and with the schema plus float32 measures, the
+        reduction factors and (optionally) merge seconds
+    """
+    rows = []
+    for name, path in tables.items():
+        default = pd.read_csv(path)
+        typed = read_table(path, name)
+        compact = apply_schema(typed, name, compact_floats=True)
+        row = {
+            'table': name,
+            'rows': len(default),
+            'columns': default.shape[1],
+            'bytes_default': int(default.memory_usage(deep=True).sum()),
+            'bytes_schema': int(typed.memory_usage(deep=True).sum()),
+            'bytes_schema_float32': int(compact.memory_usage(deep=True).sum()),
+        }
+        row['reduction_schema'] = row['bytes_default'] / row['bytes_schema']
+        row['reduction_float32'] = row['bytes_default'] / row['bytes_schema_float32']
+        keys = list(merge_keys or [])
+        if keys and all(k in default.columns for k in keys):
+            for label, frame in (('default', default), ('schema', typed)):
+                left = frame[keys].drop_duplicates()
+                started = time.perf_counter()
+                for _ in range(5):
+                    left.merge(left, on=keys, how='inner')
+                row[f'merge_seconds_{label}'] = (time.perf_counter() - started) / 5
+        rows.append(row)
+    return pd.DataFrame(rows)
@@ -0,0 +1,180 @@
+"""
+Split-sample regressions: the OLS grid re-estimated within subsamples.
+
+Re-estimating every ESG specification per year, per size bucket and before
+and after COVID multiplies the grid 10-20 times. ``split_fit`` takes a
+populated ``OLSGrid`` and returns one stacked table of all
+(split x specification) fits.
+
+The panel is partitioned once. Each split column is factorized to integer
+codes, and the model columns, cluster labels and split codes are packed into
+one float64 block. With a process pool the block is placed in shared memory.
+Workers get only its name and a (split, level) pair and fit the level's
+rows with their own ``OLSGrid``. Rows are selected by comparing codes, so
+no DataFrame is pickled to the workers, and each level still shares
+cross-products across specifications.
+
+A regressor that is constant within a level (e.g., ``covid_dummy``
+within one year) is dropped from that level's fits.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.regression import COEFFICIENT_COLUMNS, SUMMARY_COLUMNS, OLSGrid
+
+SPLIT_LABELS = ['split', 'split_value']
+
+# Block attached by a pool worker (name, shape, column names)
+_worker_block: Dict = {}
+
+
+@dataclass
+class SplitResults:
+    """
+    Stacked split-sample fits.
+
+    Attributes
+    ----------
+    coefficients : pd.DataFrame
+        ``SPLIT_LABELS`` + the grid's coefficient columns
+    summary : pd.DataFrame
+        ``SPLIT_LABELS`` + the grid's summary columns
+    skipped : pd.DataFrame
+        split, split_value, model and n_obs of fits below ``min_obs``
+    """
+    coefficients: pd.DataFrame
+    summary: pd.DataFrame
+    skipped: pd.DataFrame
+
+
+def _label_columns(grid: OLSGrid) -> List[str]:
+    groups = [grid.groups] if isinstance(grid.groups, str) else list(grid.groups or [])
+    return groups + ([grid.time] if grid.time else [])
+
+
+def _codes(values: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """Float codes (NaN for missing) and the sorted levels of a column."""
+    codes, levels = pd.factorize(values, sort=True)
+    codes = codes.astype(float)
+    codes[codes < 0] = np.nan
+    return codes, np.asarray(levels)
+
+
+def _fit_level(
+    block: np.ndarray,
+    columns: List[str],
+    split: str,
+    level: int,
+    specs: List[Tuple[str, str, Tuple[str, ...]]],
+    options: Dict
+) -> Tuple[pd.DataFrame, pd.DataFrame, Dict[str, int]]:
+    """Fit every specification on the rows of one split level."""
+    rows = block[:, columns.index(f'__split__{split}')] == level
+    frame = pd.DataFrame(block[rows], columns=columns)
+    constant = {c for c in frame.columns if frame[c].nunique() <= 1}
+    grid = OLSGrid(frame, **options)
+    for model, y, X in specs:
+        grid.add(y, [c for c in X if c not in constant], model)
+    results = grid.fit()
+    return results.coefficients, results.summary, results.skipped
+
+
+def _attach(name: str, shape: Tuple[int, int], columns: List[str]) -> None:
+    """Pool initializer: map the shared block once per worker."""
+    shm = shared_memory.SharedMemory(name=name)
+    _worker_block.update(shm=shm, block=np.ndarray(shape, dtype=np.float64, buffer=shm.buf), columns=columns)
+
+
+def _fit_shared(split: str, level: int, specs, options):
+    return _fit_level(_worker_block['block'], _worker_block['columns'], split, level, specs, options)
+
+
+def split_fit(
+    grid: OLSGrid,
+    splits: Sequence[str],
+    models: Optional[Sequence[str]] = None,
+    n_jobs: Optional[int] = None
+) -> SplitResults:
+    """
+    Fit a grid's specifications within each level of several split columns.
+
+    Parameters
+    ----------
+    grid : OLSGrid
+        Grid with registered models; its data, ``min_obs`` and covariance
+        options are used for every split
+    splits : Sequence[str]
+        Columns of ``grid.data`` to split by (e.g., 'year', 'size_bucket',
+        'covid_dummy'); rows missing the split value are left out of that split
+    models : Sequence[str], optional
+        Models to re-estimate (default: all)
+    n_jobs : int, optional
+        Worker processes (default: one per CPU; 1 runs in-process)
+
+    Returns
+    -------
+    SplitResults
+        Stacked coefficients and summaries, ordered by split, level and model
+    """
+    data = grid.data
+    models = list(grid.specs) if models is None else list(models)
+    specs = [(m, grid.specs[m].y, grid.specs[m].X) for m in models]
+    value_cols = list(dict.fromkeys(c for _, y, X in specs for c in (y, *X)))
+    label_cols = [c for c in _label_columns(grid) if c not in value_cols]
+
+    # Partition once: every column becomes a float64 column of one block
+    arrays, levels = {}, {}
+    for col in value_cols:
+        arrays[col] = data[col].to_numpy(dtype=float, na_value=np.nan)
+    for col in label_cols:
+        arrays[col] = _codes(data[col])[0]
+    for split in splits:
+        arrays[f'__split__{split}'], levels[split] = _codes(data[split])
+    columns = list(arrays)
+    options = {'min_obs': grid.min_obs, 'cov_type': grid.cov_type, 'groups': grid.groups,
+               'time': grid.time, 'maxlags': grid.maxlags}
+    tasks = [(split, i) for split in splits for i in range(len(levels[split]))]
+
+    if n_jobs == 1:
+        block = np.column_stack([arrays[c] for c in columns])
+        outputs = [_fit_level(block, columns, split, i, specs, options) for split, i in tasks]
+    else:
+        shape = (len(data), len(columns))
+        shm = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * 8, 1))
+        try:
+            block = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+            for j, c in enumerate(columns):
+                block[:, j] = arrays[c]
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_attach,
+                                     initargs=(shm.name, shape, columns)) as pool:
+                futures = [pool.submit(_fit_shared, split, i, specs, options) for split, i in tasks]
+                outputs = [future.result() for future in futures]
+            del block
+        finally:
+            shm.close()
+            shm.unlink()
+
+    coefficients, summaries, skipped = [], [], []
+    for (split, i), (coefs, summary, missed) in zip(tasks, outputs):
+        value = levels[split][i]
+        coefficients.append(coefs.assign(split=split, split_value=value))
+        summaries.append(summary.assign(split=split, split_value=value))
+        skipped += [{'split': split, 'split_value': value, 'model': m, 'n_obs': n} for m, n in missed.items()]
+
+    def stack(frames, cols):
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return pd.DataFrame(columns=SPLIT_LABELS + cols)
+        return pd.concat(frames, ignore_index=True)[SPLIT_LABELS + cols]
+
+    return SplitResults(
+        coefficients=stack(coefficients, COEFFICIENT_COLUMNS),
+        summary=stack(summaries, SUMMARY_COLUMNS),
+        skipped=pd.DataFrame(skipped, columns=['split', 'split_value', 'model', 'n_obs']),
+    )
@@ -0,0 +1,277 @@
+"""
+Ticker resolution: map return-file instruments and symbols to bank tickers.
+
+Return files identify banks by Refinitiv RIC (``ABCB.N``, ``CIZnv.OQ^J24``),
+while ``esg_0718`` and ``List_bank.xlsx`` use the base ticker (``ABCB``).
+``TickerResolver`` builds one crosswalk from
+
+1. ``ticker_mapping_exceptions.csv`` (manual mappings, highest priority),
+2. ``List_bank.xlsx`` (Symbol -> Ticker, Ticker -> Ticker, with PermID), and
+3. suffix rules (drop a ``^`` delisting tag and the exchange suffix, then
+   look the stripped form up again),
+
+persists it under ``data/cache`` and maps whole columns at once: each
+distinct identifier is resolved once and the result is broadcast back
+through the column's integer codes. Identifiers that match no List_bank
+ticker are reported instead of silently producing keys that will not merge.
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from utils.excel_cache import read_workbook
+from utils.pipeline import hash_file
+
+EXCHANGE_SUFFIXES = ('.N', '.O', '.OQ', '.K', '.PK', '.A', '.AS')
+CROSSWALK_NAME = 'ticker_crosswalk.json'
+
+_SUFFIX_RE = re.compile(r'\^.*$')
+_EXCHANGE_RE = re.compile('(' + '|'.join(re.escape(s) for s in EXCHANGE_SUFFIXES) + r')$')
+
+
+def strip_suffix(identifiers: pd.Series) -> pd.Series:
+    """
+    Apply the suffix rules to a column of identifiers.
+
+    Drops a trailing ``^...`` delisting tag, then one known exchange suffix
+    (``.N``, ``.O``, ``.OQ``, ``.K``, ``.PK``, ``.A``, ``.AS``).
+
+    Parameters
+    ----------
+    identifiers : pd.Series
+        String identifiers
+
+    Returns
+    -------
+    pd.Series
+        Stripped identifiers
+    """
+    return (identifiers.astype('string')
+            .str.replace(_SUFFIX_RE, '', regex=True)
+            .str.replace(_EXCHANGE_RE, '', regex=True)
+            .astype(object))
+
+
+def build_crosswalk(
+    exceptions_path: Union[str, Path],
+    list_bank_path: Optional[Union[str, Path]] = None,
+    cache_dir: Optional[Union[str, Path]] = None
+) -> pd.DataFrame:
+    """
+    Crosswalk of known identifiers to base tickers.
+
+    Parameters
+    ----------
+    exceptions_path : str or Path
+        ``ticker_mapping_exceptions.csv`` (return_instrument, list_bank_ticker)
+    list_bank_path : str or Path, optional
+        ``List_bank.xlsx`` (Ticker, Symbol, PermId, Company)
+    cache_dir : str or Path, optional
+        Workbook cache directory (see ``utils.excel_cache.read_workbook``)
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per identifier with columns identifier, ticker_base,
+        perm_id, company and source ('exception', 'list_bank_symbol' or
+        'list_bank_ticker'); earlier sources win
+    """
+    exceptions = pd.read_csv(exceptions_path)
+    parts = [pd.DataFrame({
+        'identifier': exceptions['return_instrument'],
+        'ticker_base': exceptions['list_bank_ticker'],
+        'source': 'exception',
+    })]
+    banks = pd.DataFrame(columns=['ticker_base', 'perm_id', 'company'])
+    if list_bank_path is not None:
+        list_bank = read_workbook(list_bank_path, cache_dir=cache_dir)
+        banks = pd.DataFrame({
+            'ticker_base': list_bank['ticker'].astype(str).str.strip(),
+            'perm_id': pd.to_numeric(list_bank['permid'], errors='coerce').astype('Int64'),
+            'company': list_bank['company'],
+        }).drop_duplicates('ticker_base')
+        parts.append(pd.DataFrame({
+            'identifier': list_bank['symbol'].astype(str).str.strip(),
+            'ticker_base': banks['ticker_base'].to_numpy(),
+            'source': 'list_bank_symbol',
+        }))
+        parts.append(pd.DataFrame({
+            'identifier': banks['ticker_base'],
+            'ticker_base': banks['ticker_base'],
+            'source': 'list_bank_ticker',
+        }))
+    crosswalk = pd.concat(parts, ignore_index=True).dropna(subset=['identifier'])
+    crosswalk = crosswalk.drop_duplicates('identifier', keep='first')
+    return crosswalk.merge(banks, on='ticker_base', how='left')[
+        ['identifier', 'ticker_base', 'perm_id', 'company', 'source']
+    ].reset_index(drop=True)
+
+
+class TickerResolver:
+    """
+    Vectorized identifier -> base ticker lookup backed by a crosswalk.
+
+    Parameters
+    ----------
+    crosswalk : pd.DataFrame
+        Output of ``build_crosswalk``
+    universe : Iterable[str], optional
+        Valid base tickers; defaults to the List_bank tickers in the
+        crosswalk (or every crosswalk ticker when List_bank was not used)
+
+    Examples
+    --------
+    >>> resolver = TickerResolver.from_clean_dir(base_dir / 'data/clean')
+    >>> monthly['ticker_base'] = resolver.resolve(monthly['instrument'])
+    >>> resolver.report(monthly['instrument'])  # identifiers outside List_bank
+    """
+
+    def __init__(self, crosswalk: pd.DataFrame, universe=None):
+        self.crosswalk = crosswalk
+        self._lookup: Dict[str, str] = dict(zip(crosswalk['identifier'], crosswalk['ticker_base']))
+        self._source: Dict[str, str] = dict(zip(crosswalk['identifier'], crosswalk['source']))
+        if universe is None:
+            listed = crosswalk['source'] != 'exception'
+            universe = crosswalk.loc[listed if listed.any() else slice(None), 'ticker_base']
+        self.universe = set(universe)
+
+    @classmethod
+    def from_files(
+        cls,
+        exceptions_path: Union[str, Path],
+        list_bank_path: Optional[Union[str, Path]] = None,
+        cache_dir: Optional[Union[str, Path]] = None
+    ) -> 'TickerResolver':
+        """
+        Build (or load from cache) the crosswalk for the given source files.
+
+        The cached crosswalk is reused while the SHA-256 of every source
+        file is unchanged and rebuilt otherwise.
+
+        Parameters
+        ----------
+        exceptions_path : str or Path
+            ``ticker_mapping_exceptions.csv``
+        list_bank_path : str or Path, optional
+            ``List_bank.xlsx``
+        cache_dir : str or Path, optional
+            Directory holding ``ticker_crosswalk.json``; None disables the
+            crosswalk cache (the workbook cache then uses its default location)
+
+        Returns
+        -------
+        TickerResolver
+            Resolver over the crosswalk
+        """
+        sources = {str(Path(p).name): hash_file(Path(p))
+                   for p in (exceptions_path, list_bank_path) if p is not None}
+        cache_path = Path(cache_dir) / CROSSWALK_NAME if cache_dir is not None else None
+        if cache_path is not None and cache_path.exists():
+            cached = json.loads(cache_path.read_text())
+            if cached.get('sources') == sources:
+                crosswalk = pd.DataFrame(cached['rows'])
+                crosswalk['perm_id'] = crosswalk['perm_id'].astype('Int64')
+                return cls(crosswalk)
+
+        crosswalk = build_crosswalk(exceptions_path, list_bank_path, cache_dir=cache_dir)
+        if cache_path is not None:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            rows = crosswalk.astype(object).where(crosswalk.notna(), None).to_dict('records')
+            cache_path.write_text(json.dumps({'sources': sources, 'rows': rows}, indent=1))
+        return cls(crosswalk)
+
+    @classmethod
+    def from_clean_dir(
+        cls,
+        clean_dir: Union[str, Path],
+        cache_dir: Optional[Union[str, Path]] = None
+    ) -> 'TickerResolver':
+        """
+        Resolver over ``data/clean`` (exceptions file plus List_bank.xlsx).
+
+        The cache defaults to ``data/cache`` next to ``clean_dir``.
+        """
+        clean_dir = Path(clean_dir)
+        list_bank = clean_dir / 'List_bank.xlsx'
+        return cls.from_files(
+            clean_dir / 'ticker_mapping_exceptions.csv',
+            list_bank if list_bank.exists() else None,
+            cache_dir=clean_dir.parent / 'cache' if cache_dir is None else cache_dir,
+        )
+
+    def _resolve_unique(self, identifiers: pd.Series) -> pd.DataFrame:
+        """Resolve distinct identifiers; returns ticker_base and source per identifier."""
+        identifiers = identifiers.astype(str).str.strip()
+        ticker = identifiers.map(self._lookup)
+        source = identifiers.map(self._source)
+
+        pending = ticker.isna()
+        stripped = strip_suffix(identifiers[pending])
+        ticker[pending] = stripped.map(self._lookup).fillna(stripped)
+        source[pending] = np.where(stripped.isin(self._lookup.keys()), 'suffix_rule', 'unresolved')
+        source[pending & ~ticker.isin(self.universe)] = 'unresolved'
+        return pd.DataFrame({'ticker_base': ticker, 'source': source})
+
+    def resolve(self, identifiers: pd.Series) -> pd.Series:
+        """
+        Map a column of identifiers to base tickers.
+
+        Identifiers that match nothing keep their suffix-stripped form (see
+        ``report``). Missing values stay missing.
+
+        Parameters
+        ----------
+        identifiers : pd.Series
+            RICs, symbols or tickers
+
+        Returns
+        -------
+        pd.Series
+            Base tickers with the input's index; categorical when the input
+            is categorical
+        """
+        codes, uniques = pd.factorize(identifiers)
+        resolved = self._resolve_unique(pd.Series(uniques, dtype=object))['ticker_base'].to_numpy(dtype=object)
+        values = np.full(len(codes), None, dtype=object)
+        present = codes >= 0
+        values[present] = resolved[codes[present]]
+        result = pd.Series(values, index=identifiers.index, name=identifiers.name, dtype=object)
+        if isinstance(identifiers.dtype, pd.CategoricalDtype):
+            result = result.astype('category')
+        return result
+
+    def report(self, identifiers: pd.Series) -> pd.DataFrame:
+        """
+        Identifiers whose resolved ticker is not in the universe.
+
+        Parameters
+        ----------
+        identifiers : pd.Series
+            RICs, symbols or tickers
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per unresolved identifier: identifier, ticker_base (the
+            stripped form that will be used) and rows (occurrences)
+        """
+        counts = identifiers.dropna().astype(str).value_counts()
+        if counts.empty:
+            return pd.DataFrame(columns=['identifier', 'ticker_base', 'rows'])
+        resolved = self._resolve_unique(pd.Series(counts.index, dtype=object))
+        unresolved = resolved['source'].eq('unresolved').to_numpy()
+        return pd.DataFrame({
+            'identifier': counts.index[unresolved],
+            'ticker_base': resolved['ticker_base'].to_numpy()[unresolved],
+            'rows': counts.to_numpy()[unresolved],
+        }).reset_index(drop=True)
+
+    def metadata(self) -> pd.DataFrame:
+        """One row per universe ticker: ticker_base, perm_id, company."""
+        table = self.crosswalk.drop_duplicates('ticker_base')[['ticker_base', 'perm_id', 'company']]
+        return table[table['ticker_base'].isin(self.universe)].reset_index(drop=True)
@@ -7,9 +7,185 @@ Ensures no lookahead bias by validating that:
 - All time windows are correctly specified
 """
 
+from pathlib import Path
+from typing import Iterable, Optional, Sequence, Tuple, Union
+
 import numpy as np
 import pandas as pd
 
+from utils.tickers import TickerResolver
+
+
+# Bit flags for each time integrity rule (combined with bitwise OR per row)
+SIGMA_END_NOT_TMINUS1 = 1
+MU_SOURCE_NOT_TMINUS1 = 2
+WINDOW_START_AFTER_END = 4
+WINDOW_INCLUDES_FUTURE = 8
+
+TIME_RULES = {
+    SIGMA_END_NOT_TMINUS1: "σ_E window end must be t-1",
+    MU_SOURCE_NOT_TMINUS1: "μ̂ source year must be t-1 when using lagged return",
+    WINDOW_START_AFTER_END: "σ_E window start must be <= window end",
+    WINDOW_INCLUDES_FUTURE: "σ_E window cannot include current or future years",
+}
+
+
+def _column(df: pd.DataFrame, col: str) -> np.ndarray:
+    return df[col].to_numpy(dtype=float, na_value=np.nan)
+
+
+def time_violation_flags(df: pd.DataFrame) -> np.ndarray:
+    """
+    Evaluate every time integrity rule in one pass over the year columns.
+    
+    Parameters
+    ----------
+    df : pd.DataFrame
+        DataFrame with the time-tagged columns used by ``assert_time_integrity``
+    
+    Returns
+    -------
+    np.ndarray
+        uint8 array, one entry per row; each set bit is a failed rule
+        (see ``TIME_RULES``)
+    """
+    flags = np.zeros(len(df), dtype=np.uint8)
+    year = _column(df, "year")
+    
+    if "sigmaE_window_end_year" in df.columns:
+        end = _column(df, "sigmaE_window_end_year")
+        flags |= (end != year - 1).astype(np.uint8) * SIGMA_END_NOT_TMINUS1
+        flags |= (end >= year).astype(np.uint8) * WINDOW_INCLUDES_FUTURE
+        
+        if "sigmaE_window_start_year" in df.columns:
+            start = _column(df, "sigmaE_window_start_year")
+            flags |= (start > end).astype(np.uint8) * WINDOW_START_AFTER_END
+    
+    if "mu_hat_from" in df.columns and "mu_source_year" in df.columns:
+        uses_lag = (df["mu_hat_from"].to_numpy(dtype=object) == "rit_tminus1")
+        mu_year = _column(df, "mu_source_year")
+        flags |= (uses_lag & (mu_year != year - 1)).astype(np.uint8) * MU_SOURCE_NOT_TMINUS1
+    
+    return flags
+
+
+def find_time_violations(
+    data: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+    chunksize: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Build a compact index of rows that violate time integrity.
+    
+    Parameters
+    ----------
+    data : pd.DataFrame or Iterable[pd.DataFrame]
+        Frame to validate, or a stream of chunks (e.g.
+        ``pd.read_csv(path, chunksize=500_000)``); row ids are taken from
+        each chunk's index, positions count rows across chunks
+    chunksize : int, optional
+        When ``data`` is a DataFrame, validate it in slices of this many rows
+    
+    Returns
+    -------
+    pd.DataFrame
+        Columns ``row_id`` (index label of the offending row), ``position``
+        (its 0-based row position, unique even when labels repeat) and
+        ``violations`` (uint8 bitmask of failed rules); empty if clean
+    """
+    if isinstance(data, pd.DataFrame):
+        step = chunksize or max(len(data), 1)
+        chunks = (data.iloc[i:i + step] for i in range(0, len(data), step))
+    else:
+        chunks = data
+    
+    row_ids = []
+    positions = []
+    masks = []
+    offset = 0
+    for chunk in chunks:
+        flags = time_violation_flags(chunk)
+        bad = np.flatnonzero(flags)
+        if len(bad):
+            row_ids.append(chunk.index.to_numpy()[bad])
+            positions.append(offset + bad)
+            masks.append(flags[bad])
+        offset += len(chunk)
+    
+    if not row_ids:
+        return pd.DataFrame({"row_id": pd.Series([], dtype=np.int64),
+                             "position": pd.Series([], dtype=np.int64),
+                             "violations": pd.Series([], dtype=np.uint8)})
+    return pd.DataFrame({"row_id": np.concatenate(row_ids),
+                         "position": np.concatenate(positions).astype(np.int64),
+                         "violations": np.concatenate(masks)})
+
+
+def summarize_time_violations(violations: pd.DataFrame) -> pd.DataFrame:
+    """
+    Count violations per rule from the index built by ``find_time_violations``.
+    
+    Parameters
+    ----------
+    violations : pd.DataFrame
+        Output of ``find_time_violations``
+    
+    Returns
+    -------
+    pd.DataFrame
+        One row per rule with its bit, message and number of violating rows
+    """
+    flags = violations["violations"].to_numpy(dtype=np.uint8)
+    return pd.DataFrame([
+        {"rule": bit, "message": message, "n_violations": int(((flags & bit) > 0).sum())}
+        for bit, message in TIME_RULES.items()
+    ])
+
+
+def drop_time_violations(
+    df: pd.DataFrame,
+    id_cols: Sequence[str] = ("instrument", "year"),
+    verbose: bool = True
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Remove rows that violate time integrity and return them for logging.
+    
+    Parameters
+    ----------
+    df : pd.DataFrame
+        DataFrame to validate
+    id_cols : Sequence[str], default ("instrument", "year")
+        Identifier columns copied into the returned violation log
+    verbose : bool, default True
+        Print the dropped rows per rule
+    
+    Returns
+    -------
+    Tuple[pd.DataFrame, pd.DataFrame]
+        The clean DataFrame and a log of dropped rows (identifiers, bitmask
+        and a readable list of failed rules)
+    """
+    violations = find_time_violations(df)
+    positions = violations["position"].to_numpy()
+    id_cols = [c for c in id_cols if c in df.columns]
+    # Select by position: index labels may repeat (e.g., after a concat)
+    log = df.iloc[positions][id_cols].reset_index(drop=True)
+    log["violations"] = violations["violations"].to_numpy()
+    log["rules"] = [
+        "; ".join(message for bit, message in TIME_RULES.items() if flags & bit)
+        for flags in log["violations"]
+    ]
+    
+    if verbose:
+        if log.empty:
+            print("✅ Time integrity check passed: No lookahead bias detected")
+        else:
+            print(f"⚠️  Dropping {len(log)} rows with time integrity violations:")
+            print(summarize_time_violations(violations).to_string(index=False))
+    
+    keep = np.ones(len(df), dtype=bool)
+    keep[positions] = False
+    return df[keep], log
+
 
 def assert_time_integrity(df: pd.DataFrame) -> None:
     """
@@ -31,36 +207,13 @@ def assert_time_integrity(df: pd.DataFrame) -> None:
     AssertionError
         If any time integrity violations are detected
     """
+    flags = time_violation_flags(df)
     errs = []
     
-    # Check 1: σ_E window must end at t-1
-    if "sigmaE_window_end_year" in df.columns:
-        bad_sigma = df["sigmaE_window_end_year"] != (df["year"] - 1)
-        if bad_sigma.any():
-            n_bad = bad_sigma.sum()
-            errs.append(f"σ_E window end must be t-1 ({n_bad} violations)")
-    
-    # Check 2: μ̂ source year must be t-1 when using lagged return
-    if "mu_hat_from" in df.columns and "mu_source_year" in df.columns:
-        uses_lag = df["mu_hat_from"].eq("rit_tminus1")
-        bad_mu = uses_lag & (df["mu_source_year"] != df["year"] - 1)
-        if bad_mu.any():
-            n_bad = bad_mu.sum()
-            errs.append(f"μ̂ source year must be t-1 when using lagged return ({n_bad} violations)")
-    
-    # Check 3: Window start year must be <= window end year
-    if "sigmaE_window_start_year" in df.columns and "sigmaE_window_end_year" in df.columns:
-        bad_window = df["sigmaE_window_start_year"] > df["sigmaE_window_end_year"]
-        if bad_window.any():
-            n_bad = bad_window.sum()
-            errs.append(f"σ_E window start must be <= window end ({n_bad} violations)")
-    
-    # Check 4: Window end year must be < current year (no future data)
-    if "sigmaE_window_end_year" in df.columns:
-        future_data = df["sigmaE_window_end_year"] >= df["year"]
-        if future_data.any():
-            n_bad = future_data.sum()
-            errs.append(f"σ_E window cannot include current or future years ({n_bad} violations)")
+    for bit, message in TIME_RULES.items():
+        n_bad = int(((flags & bit) > 0).sum())
+        if n_bad:
+            errs.append(f"{message} ({n_bad} violations)")
     
     if errs:
         raise AssertionError("Time integrity violations: " + "; ".join(errs))
@@ -120,3 +273,206 @@ def add_time_provenance_summary(df: pd.DataFrame) -> pd.DataFrame:
         df["sigmaE_lag_years"] = df["year"] - df["sigmaE_window_end_year"]
     
     return df
+
+
+def build_monthly_return_index(
+    monthly: pd.DataFrame,
+    ticker_col: str = "ticker_base",
+    date_col: str = "date",
+    return_col: str = "log_return"
+) -> pd.DataFrame:
+    """
+    Build a sorted (ticker, month) index over valid monthly returns.
+    
+    The index keeps one row per monthly observation with a non-missing
+    return, in the order the volatility stage consumes them, plus the
+    running count of valid observations per ticker.
+    
+    Parameters
+    ----------
+    monthly : pd.DataFrame
+        Monthly returns with ticker, date and return columns
+    ticker_col : str, default "ticker_base"
+        Ticker column (standardized to the panel's identifiers)
+    date_col : str, default "date"
+        Observation date column
+    return_col : str, default "log_return"
+        Return column; rows with missing returns are excluded
+    
+    Returns
+    -------
+    pd.DataFrame
+        Columns ``ticker``, ``month`` (year * 12 + month - 1) and ``rank``
+        (1-based position among the ticker's valid returns), sorted by
+        ticker and month
+    """
+    valid = monthly.loc[monthly[return_col].notna() & monthly[ticker_col].notna(), [ticker_col, date_col]]
+    dates = pd.to_datetime(valid[date_col])
+    index = pd.DataFrame({
+        "ticker": valid[ticker_col].to_numpy(),
+        "month": (dates.dt.year * 12 + dates.dt.month - 1).to_numpy(dtype=np.int64),
+    })
+    index = index.sort_values(["ticker", "month"], kind="mergesort").reset_index(drop=True)
+    index["rank"] = index.groupby("ticker").cumcount().to_numpy(dtype=np.int64) + 1
+    return index
+
+
+def load_monthly_return_index(monthly_path, exceptions_path) -> pd.DataFrame:
+    """
+    Load the raw monthly total return file into a ``build_monthly_return_index``.
+    
+    Applies the same preparation as ``scripts/02_calculate_equity_volatility.py``:
+    2013-2023 filter, ticker standardization and percent to log returns.
+    
+    Parameters
+    ----------
+    monthly_path : str or Path
+        Path to ``raw_monthly_total_return_2013_2023 (1).csv``
+    exceptions_path : str or Path
+        Path to ``ticker_mapping_exceptions.csv`` (``List_bank.xlsx`` in the
+        same directory is used as well when present)
+    
+    Returns
+    -------
+    pd.DataFrame
+        Monthly return index
+    """
+    monthly = pd.read_csv(monthly_path)
+    monthly.columns = monthly.columns.str.strip()
+    monthly = monthly.rename(columns={"Instrument": "instrument", "Date": "date", "Total Return": "total_return_pct"})
+    monthly["date"] = pd.to_datetime(monthly["date"], format="%m/%d/%y")
+    monthly = monthly[monthly["date"].dt.year.between(2013, 2023)]
+    
+    exceptions_path = Path(exceptions_path)
+    list_bank_path = exceptions_path.with_name("List_bank.xlsx")
+    resolver = TickerResolver.from_files(
+        exceptions_path, list_bank_path if list_bank_path.exists() else None
+    )
+    monthly["ticker_base"] = resolver.resolve(monthly["instrument"])
+    monthly["log_return"] = np.log(1 + monthly["total_return_pct"] / 100)
+    return build_monthly_return_index(monthly)
+
+
+def audit_sigma_windows(
+    df: pd.DataFrame,
+    monthly_index: pd.DataFrame,
+    ticker_col: str = "instrument",
+    months_col: str = "sigma_E_window_months",
+    max_window: int = 36
+) -> pd.DataFrame:
+    """
+    Re-derive the σ_E estimation window of every bank-year from monthly returns.
+    
+    Unlike ``assert_time_integrity``, this does not trust the declared window
+    columns: for each bank-year it joins against the monthly return index to
+    find the exact months the volatility stage uses (the last ``max_window``
+    valid returns dated before January of year t) and compares them with
+    the declared count and window years. A declared count that cannot be
+    reached with pre-January returns means the stage used data from year t
+    or later (or different data). Both lookups are merge-joins.
+    
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Panel with ``year``, the ticker column and ``months_col``; declared
+        ``sigmaE_window_start_year``/``sigmaE_window_end_year`` are checked
+        when present
+    monthly_index : pd.DataFrame
+        Output of ``build_monthly_return_index``
+    ticker_col : str, default "instrument"
+        Ticker column in ``df`` (``ticker_base`` for the volatility file)
+    months_col : str, default "sigma_E_window_months"
+        Declared number of monthly returns used
+    max_window : int, default 36
+        Maximum number of months in the volatility window
+    
+    Returns
+    -------
+    pd.DataFrame
+        One row per row of ``df`` (same index) with the derived first/last
+        month (year * 12 + month - 1), derived count, violation flags
+        (``count_mismatch``, ``outside_declared_window``) and ``ok``
+    """
+    panel = pd.DataFrame({
+        "ticker": df[ticker_col].to_numpy(),
+        "year": df["year"].to_numpy(dtype=np.int64),
+        "declared_months": df[months_col].fillna(0).to_numpy(dtype=np.int64),
+    })
+    panel["row"] = np.arange(len(panel))
+    panel["cutoff"] = panel["year"] * 12  # January of year t
+    
+    # Last valid month strictly before the cutoff (and its running count)
+    last = pd.merge_asof(
+        panel.assign(last_allowed=panel["cutoff"] - 1).sort_values("last_allowed"),
+        monthly_index.rename(columns={"month": "last_month", "rank": "last_rank"}).sort_values("last_month"),
+        left_on="last_allowed", right_on="last_month", by="ticker", direction="backward"
+    )
+    last["last_rank"] = last["last_rank"].fillna(0).astype(np.int64)
+    last["derived_months"] = np.minimum(last["last_rank"], max_window)
+    last["first_rank"] = last["last_rank"] - last["derived_months"] + 1
+    
+    # First month of the window via an exact (ticker, rank) join
+    audit = last.merge(
+        monthly_index.rename(columns={"month": "first_month", "rank": "first_rank"}),
+        on=["ticker", "first_rank"], how="left"
+    ).sort_values("row")
+    
+    has_window = audit["derived_months"].to_numpy() > 0
+    last_month = audit["last_month"].to_numpy(dtype=float)
+    first_month = audit["first_month"].to_numpy(dtype=float)
+    
+    result = pd.DataFrame(index=df.index)
+    result["derived_first_month"] = np.where(has_window, first_month, np.nan)
+    result["derived_last_month"] = np.where(has_window, last_month, np.nan)
+    result["derived_months"] = audit["derived_months"].to_numpy()
+    result["declared_months"] = audit["declared_months"].to_numpy()
+    result["count_mismatch"] = result["derived_months"].to_numpy() != result["declared_months"].to_numpy()
+    
+    outside = np.zeros(len(df), dtype=bool)
+    if "sigmaE_window_end_year" in df.columns:
+        end_year = df["sigmaE_window_end_year"].to_numpy(dtype=float, na_value=np.nan)
+        outside |= has_window & (np.floor(last_month / 12) > end_year)
+    if "sigmaE_window_start_year" in df.columns:
+        start_year = df["sigmaE_window_start_year"].to_numpy(dtype=float, na_value=np.nan)
+        outside |= has_window & (np.floor(first_month / 12) < start_year)
+    result["outside_declared_window"] = outside
+    
+    result["ok"] = ~(result["count_mismatch"] | result["outside_declared_window"])
+    return result
+
+
+def assert_sigma_windows(
+    df: pd.DataFrame,
+    monthly_index: pd.DataFrame,
+    **kwargs
+) -> None:
+    """
+    Deep time integrity audit: raise if any re-derived σ_E window is invalid.
+    
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Panel passed to ``audit_sigma_windows``
+    monthly_index : pd.DataFrame
+        Output of ``build_monthly_return_index``
+    **kwargs
+        Passed to ``audit_sigma_windows``
+    
+    Raises
+    ------
+    AssertionError
+        If the derived window of any bank-year disagrees with the declared
+        month count or window years
+    """
+    audit = audit_sigma_windows(df, monthly_index, **kwargs)
+    errs = []
+    
+    n_bad = int(audit["count_mismatch"].sum())
+    if n_bad:
+        errs.append(f"σ_E window month count differs from declared count ({n_bad} violations)")
+    n_bad = int(audit["outside_declared_window"].sum())
+    if n_bad:
+        errs.append(f"σ_E window months fall outside declared window years ({n_bad} violations)")
+    
+    if errs:
+        raise AssertionError("Deep time integrity violations: " + "; ".join(errs))
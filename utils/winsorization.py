@@ -6,9 +6,14 @@ Probability-of-Default (PD) variables by year and size category to handle
 extreme values while preserving distributional properties within groups.
 """
 
+import json
+from pathlib import Path
+
 import pandas as pd
 import numpy as np
-from typing import List, Tuple, Optional
+from typing import Dict, Hashable, Iterable, Iterator, List, Tuple, Optional, Sequence, Union
+
+from utils.quantile_sketch import KLLSketch, build_group_sketches
 
 
 def trim_by_year_size(
@@ -222,6 +227,155 @@ def winsorize_overall(
     return df
 
 
+def _sorted_quantiles(
+    sorted_values: np.ndarray,
+    starts: np.ndarray,
+    counts: np.ndarray,
+    q: float
+) -> np.ndarray:
+    """Linear-interpolation quantile of every group in a group-sorted array."""
+    pos = q * (counts - 1)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.minimum(lo + 1, counts - 1)
+    frac = pos - lo
+    last = len(sorted_values) - 1
+    a = sorted_values[np.minimum(starts + lo, last)]
+    b = sorted_values[np.minimum(starts + hi, last)]
+    # Same lerp as numpy/pandas so bounds match Series.quantile exactly
+    diff = b - a
+    return np.where(frac >= 0.5, b - diff * (1 - frac), a + diff * frac)
+
+
+def trim_sensitivity_grid(
+    df: pd.DataFrame,
+    dd_cols: List[str],
+    percentile_pairs: List[Tuple[float, float]],
+    group_cols: Optional[Sequence[str]] = ('year', 'dummylarge'),
+    min_obs: int = 10
+) -> Dict[str, object]:
+    """
+    Evaluate many trimming thresholds on many columns with one sort per column.
+    
+    Equivalent to calling ``trim_by_year_size`` once per percentile pair, but
+    without copying the frame: every column is sorted once within its
+    groups, all percentile pairs are read off the sorted values, and the
+    result for each pair is a packed bitmask of kept rows.
+    
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Input dataframe (not modified)
+    dd_cols : List[str]
+        DD/PD columns to trim jointly (e.g., ['DD_a', 'DD_m'])
+    percentile_pairs : List[Tuple[float, float]]
+        Lower and upper percentiles, e.g. [(0.01, 0.99), (0.025, 0.975), (0.05, 0.95)]
+    group_cols : Sequence[str], optional, default=('year', 'dummylarge')
+        Grouping columns; None or [] for overall trimming
+    min_obs : int, default=10
+        Groups with fewer non-missing observations are not trimmed
+        
+    Returns
+    -------
+    Dict[str, object]
+        - 'bounds': bounds and excluded counts per pair, column and group
+        - 'summary': excluded and remaining rows per pair
+        - 'masks': {(q_low, q_high): packed keep mask (np.packbits)}
+        - 'n_rows': number of rows in ``df`` (needed to unpack masks)
+        
+    Examples
+    --------
+    >>> grid = trim_sensitivity_grid(df, ['DD_a', 'DD_m'], [(0.01, 0.99), (0.05, 0.95)])
+    >>> keep = unpack_keep_mask(grid['masks'][(0.05, 0.95)], grid['n_rows'])
+    >>> model = smf.ols('DD_m ~ ESG + controls', data=df[keep]).fit()
+    """
+    
+    group_cols = list(group_cols) if group_cols else []
+    pairs = [(float(lo), float(hi)) for lo, hi in percentile_pairs]
+    n_rows = len(df)
+    keep = {pair: np.ones(n_rows, dtype=bool) for pair in pairs}
+    bound_frames = []
+    
+    # Rows with a missing group key are left alone, as in trim_by_year_size
+    if group_cols:
+        codes, uniques = pd.MultiIndex.from_frame(df[group_cols]).factorize()
+        codes = np.where(df[group_cols].isna().any(axis=1).to_numpy(), -1, codes)
+        labels = pd.DataFrame(list(uniques), columns=group_cols)
+    else:
+        codes = np.zeros(n_rows, dtype=np.int64)
+        labels = pd.DataFrame(index=[0])
+    
+    for col in dd_cols:
+        if col not in df.columns:
+            continue
+        
+        values = df[col].to_numpy(dtype=float)
+        valid = ~np.isnan(values) & (codes >= 0)
+        rows = np.flatnonzero(valid)
+        if len(rows) == 0:
+            continue
+        row_codes = codes[rows]
+        row_values = values[rows]
+        order = np.lexsort((row_values, row_codes))
+        sorted_values = row_values[order]
+        
+        counts = np.bincount(row_codes, minlength=len(labels))
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        eligible = counts >= min_obs
+        safe_counts = np.maximum(counts, 1)
+        
+        for pair in pairs:
+            p_low = np.where(eligible, _sorted_quantiles(sorted_values, starts, safe_counts, pair[0]), np.nan)
+            p_high = np.where(eligible, _sorted_quantiles(sorted_values, starts, safe_counts, pair[1]), np.nan)
+            
+            below = row_values < p_low[row_codes]
+            above = row_values > p_high[row_codes]
+            keep[pair][rows[below | above]] = False
+            
+            stats = labels.copy()
+            stats['variable'] = col
+            stats['q_low'], stats['q_high'] = pair
+            stats['n_obs'] = counts
+            stats['p_low'] = p_low
+            stats['p_high'] = p_high
+            stats['n_lower'] = np.bincount(row_codes, weights=below, minlength=len(labels)).astype(int)
+            stats['n_upper'] = np.bincount(row_codes, weights=above, minlength=len(labels)).astype(int)
+            bound_frames.append(stats[counts > 0])
+    
+    bounds = pd.concat(bound_frames, ignore_index=True) if bound_frames else pd.DataFrame()
+    summary = pd.DataFrame([
+        {'q_low': pair[0], 'q_high': pair[1], 'n_rows': n_rows,
+         'n_excluded': int(n_rows - mask.sum()), 'n_remaining': int(mask.sum())}
+        for pair, mask in keep.items()
+    ])
+    
+    return {
+        'bounds': bounds,
+        'summary': summary,
+        'masks': {pair: np.packbits(mask) for pair, mask in keep.items()},
+        'n_rows': n_rows
+    }
+
+
+def unpack_keep_mask(packed: np.ndarray, n_rows: int) -> np.ndarray:
+    """
+    Expand a packed keep mask from ``trim_sensitivity_grid`` to booleans.
+    
+    Parameters
+    ----------
+    packed : np.ndarray
+        Packed mask (uint8)
+    n_rows : int
+        Number of rows in the original dataframe
+        
+    Returns
+    -------
+    np.ndarray
+        Boolean mask aligned with the rows of the original dataframe
+    """
+    
+    return np.unpackbits(packed, count=n_rows).astype(bool)
+
+
 def compare_winsorization_methods(
     df: pd.DataFrame,
     dd_col: str,
@@ -277,15 +431,17 @@ def compare_winsorization_methods(
     return pd.DataFrame(comparison)
 
 
-def export_winsorization_report(
+def build_winsorization_report(
     df: pd.DataFrame,
     dd_cols: List[str],
-    output_path: str,
     year_col: str = 'year',
     size_col: str = 'dummylarge'
-) -> None:
+) -> pd.DataFrame:
     """
-    Export detailed winsorization report to CSV.
+    Build the per-observation winsorization audit table.
+    
+    One masked selection per column: rows where ``{col}`` and ``{col}_wins``
+    differ (missing values on both sides are not counted as changes).
     
     Parameters
     ----------
@@ -293,37 +449,578 @@ def export_winsorization_report(
         Dataframe with winsorized columns
     dd_cols : List[str]
         List of DD columns
-    output_path : str
-        Path to save report
     year_col : str
         Year column name
     size_col : str
         Size category column name
+        
+    Returns
+    -------
+    pd.DataFrame
+        One row per winsorized observation and variable
     """
     
-    report_data = []
+    columns = ['variable', 'instrument', 'year', 'size_category',
+               'original_value', 'winsorized_value', 'change', 'direction']
+    frames = []
     
     for col in dd_cols:
         if col not in df.columns or f'{col}_wins' not in df.columns:
             continue
         
-        # Find winsorized observations
-        winsorized = df[df[col] != df[f'{col}_wins']].copy()
+        original = df[col].to_numpy(dtype=float)
+        wins = df[f'{col}_wins'].to_numpy(dtype=float)
+        changed = (original != wins) & ~(np.isnan(original) & np.isnan(wins))
         
-        for _, row in winsorized.iterrows():
-            size_label = 'Large' if row[size_col] == 1 else 'Small/Mid'
-            report_data.append({
-                'variable': col,
-                'instrument': row.get('instrument', 'Unknown'),
-                'year': row[year_col],
-                'size_category': size_label,
-                'original_value': row[col],
-                'winsorized_value': row[f'{col}_wins'],
-                'change': row[f'{col}_wins'] - row[col],
-                'direction': 'upper' if row[col] > row[f'{col}_wins'] else 'lower'
-            })
+        if not changed.any():
+            continue
+        
+        original = original[changed]
+        wins = wins[changed]
+        if 'instrument' in df.columns:
+            instrument = df['instrument'].to_numpy()[changed]
+        else:
+            instrument = np.full(len(original), 'Unknown', dtype=object)
+        
+        frames.append(pd.DataFrame({
+            'variable': col,
+            'instrument': instrument,
+            'year': df[year_col].to_numpy()[changed],
+            'size_category': np.where(df[size_col].to_numpy()[changed] == 1, 'Large', 'Small/Mid'),
+            'original_value': original,
+            'winsorized_value': wins,
+            'change': wins - original,
+            'direction': np.where(original > wins, 'upper', 'lower')
+        }))
+    
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    
+    return pd.concat(frames, ignore_index=True)[columns]
+
+
+def export_winsorization_report(
+    df: pd.DataFrame,
+    dd_cols: List[str],
+    output_path: str,
+    year_col: str = 'year',
+    size_col: str = 'dummylarge',
+    parquet_path: Optional[str] = None
+) -> None:
+    """
+    Export detailed winsorization report to CSV.
+    
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Dataframe with winsorized columns
+    dd_cols : List[str]
+        List of DD columns
+    output_path : str
+        Path to save report
+    year_col : str
+        Year column name
+    size_col : str
+        Size category column name
+    parquet_path : str, optional
+        Also save the report as Parquet to this path (requires pyarrow)
+    """
     
-    report_df = pd.DataFrame(report_data)
+    report_df = build_winsorization_report(df, dd_cols, year_col=year_col, size_col=size_col)
     report_df.to_csv(output_path, index=False)
     print(f"✓ Winsorization report saved to: {output_path}")
+    if parquet_path is not None:
+        report_df.to_parquet(parquet_path, index=False)
+        print(f"✓ Winsorization report saved to: {parquet_path}")
     print(f"  Total winsorized observations: {len(report_df)}")
+
+
+class GroupWinsorizer:
+    """
+    Learn per-group percentile bounds once and reuse them on new data.
+
+    ``trim_by_year_size`` and ``winsorize_overall`` recompute percentiles from
+    whatever frame they receive. ``GroupWinsorizer`` separates the two steps:
+    ``fit`` computes the lower/upper bounds for every (group, variable) pair,
+    and ``transform`` applies those stored bounds to any frame (a new year, a
+    scenario run) with a single keyed join, without recomputing quantiles.
+
+    The fitted bounds are kept in ``bounds_`` as a long table and can be saved
+    to JSON or Parquet so that analysis runs share one artifact.
+
+    Parameters
+    ----------
+    cols : List[str]
+        Columns to winsorize (e.g., ['DD_a', 'DD_m'])
+    group_cols : List[str], default=('year', 'dummylarge')
+        Grouping columns. Pass an empty list for overall (ungrouped) bounds.
+    percentiles : Tuple[float, float], default=(0.01, 0.99)
+        Lower and upper percentiles
+    min_obs : int, default=10
+        Groups with fewer non-missing observations get no bounds and are left
+        untouched, matching ``trim_by_year_size``
+
+    Examples
+    --------
+    >>> wins = GroupWinsorizer(['DD_a', 'DD_m']).fit(df)
+    >>> wins.to_json('data/outputs/analysis/winsor_bounds.json')
+    >>> df_new = GroupWinsorizer.from_json('data/outputs/analysis/winsor_bounds.json').transform(df_new)
+    """
+
+    def __init__(
+        self,
+        cols: List[str],
+        group_cols: Sequence[str] = ('year', 'dummylarge'),
+        percentiles: Tuple[float, float] = (0.01, 0.99),
+        min_obs: int = 10
+    ):
+        self.cols = list(cols)
+        self.group_cols = list(group_cols)
+        self.percentiles = (float(percentiles[0]), float(percentiles[1]))
+        self.min_obs = int(min_obs)
+        self.bounds_: Optional[pd.DataFrame] = None
+
+    def fit(self, df: pd.DataFrame) -> 'GroupWinsorizer':
+        """
+        Compute per-group and overall bounds for every column in ``cols``.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            Frame to learn the bounds from
+
+        Returns
+        -------
+        GroupWinsorizer
+            The fitted winsorizer (``self``)
+        """
+        q_low, q_high = self.percentiles
+        frames = []
+
+        for col in self.cols:
+            if col not in df.columns:
+                continue
+
+            valid = df[col].dropna()
+            frames.append(pd.DataFrame({
+                'variable': [col],
+                'scope': ['overall'],
+                'n_obs': [len(valid)],
+                'p_low': [valid.quantile(q_low) if len(valid) > 0 else np.nan],
+                'p_high': [valid.quantile(q_high) if len(valid) > 0 else np.nan],
+            }))
+
+            if not self.group_cols:
+                continue
+
+            grouped = df.loc[df[col].notna(), self.group_cols + [col]].groupby(self.group_cols)[col]
+            stats = grouped.quantile([q_low, q_high]).unstack(level=-1)
+            stats.columns = ['p_low', 'p_high']
+            stats['n_obs'] = grouped.size()
+            small = stats['n_obs'] < self.min_obs
+            stats.loc[small, ['p_low', 'p_high']] = np.nan
+            stats = stats.reset_index()
+            stats['variable'] = col
+            stats['scope'] = 'group'
+            frames.append(stats)
+
+        if not frames:
+            raise ValueError(f"None of the columns {self.cols} found in dataframe")
+
+        bounds = pd.concat(frames, ignore_index=True)
+        bounds['q_low'] = q_low
+        bounds['q_high'] = q_high
+        bounds['min_obs'] = self.min_obs
+        self.bounds_ = bounds[self.group_cols + ['variable', 'scope', 'n_obs', 'p_low', 'p_high',
+                                                 'q_low', 'q_high', 'min_obs']]
+        return self
+
+    def transform(
+        self,
+        df: pd.DataFrame,
+        suffix: str = '_wins',
+        mode: str = 'clip',
+        fallback: Optional[str] = 'overall'
+    ) -> pd.DataFrame:
+        """
+        Apply the fitted bounds to ``df`` without recomputing quantiles.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            Frame to winsorize; must contain ``group_cols``
+        suffix : str, default='_wins'
+            Suffix for clipped columns. Use '' to overwrite in place.
+            Ignored when ``mode='trim'``.
+        mode : {'clip', 'trim'}, default='clip'
+            'clip' adds winsorized columns; 'trim' drops rows outside bounds
+            (same semantics as ``trim_by_year_size``)
+        fallback : {'overall', None}, default='overall'
+            Bounds for rows whose group was not seen during ``fit`` (e.g., a
+            new year). None leaves those rows untouched.
+
+        Returns
+        -------
+        pd.DataFrame
+            Winsorized or trimmed copy of ``df``
+        """
+        if self.bounds_ is None:
+            raise ValueError("GroupWinsorizer must be fitted before calling transform")
+        if mode not in ('clip', 'trim'):
+            raise ValueError(f"Unknown mode '{mode}'. Use 'clip' or 'trim'.")
+
+        df = df.copy()
+        keep_mask = np.ones(len(df), dtype=bool)
+
+        for col in self.bounds_['variable'].unique():
+            if col not in df.columns:
+                continue
+
+            lower, upper = self._row_bounds(df, col, fallback)
+            values = df[col].to_numpy(dtype=float)
+
+            if mode == 'clip':
+                clipped = np.where(values < lower, lower, values)
+                clipped = np.where(clipped > upper, upper, clipped)
+                df[f'{col}{suffix}'] = clipped
+            else:
+                keep_mask &= ~((values < lower) | (values > upper))
+
+        if mode == 'trim':
+            df = df[keep_mask].copy()
+
+        return df
+
+    def fit_transform(self, df: pd.DataFrame, **kwargs) -> pd.DataFrame:
+        """Fit on ``df`` and transform it in one call."""
+        return self.fit(df).transform(df, **kwargs)
+
+    def _row_bounds(
+        self,
+        df: pd.DataFrame,
+        col: str,
+        fallback: Optional[str]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Align the stored bounds of ``col`` to the rows of ``df`` (NaN = no bound)."""
+        bounds = self.bounds_[self.bounds_['variable'] == col]
+        overall = bounds[bounds['scope'] == 'overall']
+        overall_low = overall['p_low'].iloc[0] if len(overall) else np.nan
+        overall_high = overall['p_high'].iloc[0] if len(overall) else np.nan
+
+        if not self.group_cols:
+            return (np.full(len(df), overall_low, dtype=float),
+                    np.full(len(df), overall_high, dtype=float))
+
+        group_bounds = bounds.loc[bounds['scope'] == 'group', self.group_cols + ['p_low', 'p_high']]
+        aligned = df[self.group_cols].reset_index(drop=True).merge(
+            group_bounds, on=self.group_cols, how='left', indicator=True
+        )
+        lower = np.array(aligned['p_low'], dtype=float)
+        upper = np.array(aligned['p_high'], dtype=float)
+
+        if fallback == 'overall':
+            unseen = (aligned['_merge'] == 'left_only').to_numpy()
+            lower[unseen] = overall_low
+            upper[unseen] = overall_high
+        elif fallback is not None:
+            raise ValueError(f"Unknown fallback '{fallback}'. Use 'overall' or None.")
+
+        return lower, upper
+
+    @classmethod
+    def from_bounds(cls, bounds: pd.DataFrame) -> 'GroupWinsorizer':
+        """
+        Rebuild a fitted winsorizer from a saved ``bounds_`` table.
+
+        Parameters
+        ----------
+        bounds : pd.DataFrame
+            Table in the layout produced by ``fit``
+
+        Returns
+        -------
+        GroupWinsorizer
+            Fitted winsorizer
+        """
+        fixed = ['variable', 'scope', 'n_obs', 'p_low', 'p_high', 'q_low', 'q_high', 'min_obs']
+        group_cols = [c for c in bounds.columns if c not in fixed]
+        wins = cls(
+            cols=list(bounds['variable'].unique()),
+            group_cols=group_cols,
+            percentiles=(bounds['q_low'].iloc[0], bounds['q_high'].iloc[0]),
+            min_obs=int(bounds['min_obs'].iloc[0])
+        )
+        wins.bounds_ = bounds.reset_index(drop=True)
+        return wins
+
+    def to_json(self, path: Union[str, Path]) -> None:
+        """Save the fitted bounds to a JSON file."""
+        if self.bounds_ is None:
+            raise ValueError("GroupWinsorizer must be fitted before saving")
+        payload = {
+            'cols': self.cols,
+            'group_cols': self.group_cols,
+            'percentiles': list(self.percentiles),
+            'min_obs': self.min_obs,
+            'bounds': json.loads(self.bounds_.to_json(orient='records'))
+        }
+        Path(path).write_text(json.dumps(payload, indent=2))
+
+    @classmethod
+    def from_json(cls, path: Union[str, Path]) -> 'GroupWinsorizer':
+        """Load a fitted winsorizer saved with ``to_json``."""
+        payload = json.loads(Path(path).read_text())
+        wins = cls(
+            cols=payload['cols'],
+            group_cols=payload['group_cols'],
+            percentiles=tuple(payload['percentiles']),
+            min_obs=payload['min_obs']
+        )
+        columns = wins.group_cols + ['variable', 'scope', 'n_obs', 'p_low', 'p_high',
+                                     'q_low', 'q_high', 'min_obs']
+        bounds = pd.DataFrame(payload['bounds'], columns=columns)
+        bounds[['p_low', 'p_high']] = bounds[['p_low', 'p_high']].astype(float)
+        wins.bounds_ = bounds
+        return wins
+
+    def to_parquet(self, path: Union[str, Path]) -> None:
+        """Save the fitted bounds to a Parquet file (requires pyarrow)."""
+        if self.bounds_ is None:
+            raise ValueError("GroupWinsorizer must be fitted before saving")
+        self.bounds_.to_parquet(path, index=False)
+
+    @classmethod
+    def from_parquet(cls, path: Union[str, Path]) -> 'GroupWinsorizer':
+        """Load a fitted winsorizer saved with ``to_parquet``."""
+        return cls.from_bounds(pd.read_parquet(path))
+
+
+def winsorizer_from_sketches(
+    sketches: Dict[Tuple[str, Hashable], KLLSketch],
+    cols: List[str],
+    group_cols: Sequence[str] = ('year', 'dummylarge'),
+    percentiles: Tuple[float, float] = (0.01, 0.99),
+    min_obs: int = 10
+) -> GroupWinsorizer:
+    """
+    Turn per-group quantile sketches into a fitted ``GroupWinsorizer``.
+
+    Parameters
+    ----------
+    sketches : Dict[Tuple[str, Hashable], KLLSketch]
+        Output of ``build_group_sketches`` (or ``merge_group_sketches``)
+    cols : List[str]
+        Columns to winsorize
+    group_cols : Sequence[str], default=('year', 'dummylarge')
+        Grouping columns used when the sketches were built
+    percentiles : Tuple[float, float], default=(0.01, 0.99)
+        Lower and upper percentiles
+    min_obs : int, default=10
+        Groups with fewer observations get no bounds
+
+    Returns
+    -------
+    GroupWinsorizer
+        Winsorizer whose bounds come from the sketches
+    """
+    wins = GroupWinsorizer(cols, group_cols=group_cols, percentiles=percentiles, min_obs=min_obs)
+    q = list(wins.percentiles)
+    rows = []
+
+    for (col, key), sketch in sketches.items():
+        if col not in wins.cols:
+            continue
+        if key is None:
+            row = {c: np.nan for c in wins.group_cols}
+            row['scope'] = 'overall'
+        else:
+            if not wins.group_cols:
+                continue
+            values = key if isinstance(key, tuple) else (key,)
+            row = dict(zip(wins.group_cols, values))
+            row['scope'] = 'group'
+        p_low, p_high = sketch.quantile(q)
+        if row['scope'] == 'group' and sketch.n < wins.min_obs:
+            p_low, p_high = np.nan, np.nan
+        row.update({'variable': col, 'n_obs': sketch.n, 'p_low': p_low, 'p_high': p_high})
+        rows.append(row)
+
+    if not rows:
+        raise ValueError(f"No sketches found for columns {cols}")
+
+    bounds = pd.DataFrame(rows)
+    bounds['q_low'] = q[0]
+    bounds['q_high'] = q[1]
+    bounds['min_obs'] = wins.min_obs
+    bounds = bounds.sort_values(['variable', 'scope'] + wins.group_cols, ascending=[True, False] + [True] * len(wins.group_cols))
+    wins.bounds_ = bounds[wins.group_cols + ['variable', 'scope', 'n_obs', 'p_low', 'p_high',
+                                             'q_low', 'q_high', 'min_obs']].reset_index(drop=True)
+    return wins
+
+
+def fit_streaming_winsorizer(
+    chunks: Iterable[pd.DataFrame],
+    cols: List[str],
+    group_cols: Sequence[str] = ('year', 'dummylarge'),
+    percentiles: Tuple[float, float] = (0.01, 0.99),
+    min_obs: int = 10,
+    k: int = 200,
+    seed: Optional[int] = None
+) -> GroupWinsorizer:
+    """
+    Fit group bounds in one pass over chunked input using quantile sketches.
+    
+    This is the first pass of streaming winsorization for panels that do not
+    fit in memory. The second pass is ``winsorize_chunks``. To fit in
+    parallel, call ``build_group_sketches`` per worker, combine the results
+    with ``merge_group_sketches`` and pass them to ``winsorizer_from_sketches``.
+    
+    Parameters
+    ----------
+    chunks : Iterable[pd.DataFrame]
+        Chunks of the panel, e.g. ``pd.read_csv(path, chunksize=100_000)``
+    cols : List[str]
+        Columns to winsorize
+    group_cols : Sequence[str], default=('year', 'dummylarge')
+        Grouping columns
+    percentiles : Tuple[float, float], default=(0.01, 0.99)
+        Lower and upper percentiles
+    min_obs : int, default=10
+        Groups with fewer observations get no bounds
+    k : int, default=200
+        Sketch accuracy parameter (groups with fewer than ``k`` observations
+        get exact bounds)
+    seed : int, optional
+        Seed for reproducible sketches
+        
+    Returns
+    -------
+    GroupWinsorizer
+        Fitted winsorizer with approximate bounds
+        
+    Examples
+    --------
+    >>> wins = fit_streaming_winsorizer(pd.read_csv(path, chunksize=100_000), ['DD_a', 'DD_m'])
+    >>> for chunk in winsorize_chunks(pd.read_csv(path, chunksize=100_000), wins):
+    ...     chunk.to_csv(out_path, mode='a', index=False)
+    """
+    
+    sketches = build_group_sketches(chunks, cols, group_cols=group_cols, k=k, seed=seed)
+    return winsorizer_from_sketches(sketches, cols, group_cols=group_cols,
+                                    percentiles=percentiles, min_obs=min_obs)
+
+
+def winsorize_chunks(
+    chunks: Iterable[pd.DataFrame],
+    winsorizer: GroupWinsorizer,
+    **transform_kwargs
+) -> Iterator[pd.DataFrame]:
+    """
+    Second streaming pass: clip or trim each chunk with fitted bounds.
+    
+    Parameters
+    ----------
+    chunks : Iterable[pd.DataFrame]
+        Chunks of the panel
+    winsorizer : GroupWinsorizer
+        Fitted winsorizer (exact or from sketches)
+    **transform_kwargs
+        Passed to ``GroupWinsorizer.transform`` (``suffix``, ``mode``, ``fallback``)
+        
+    Yields
+    ------
+    pd.DataFrame
+        Transformed chunk
+    """
+    
+    for chunk in chunks:
+        yield winsorizer.transform(chunk, **transform_kwargs)
+
+
+def sketch_error_report(
+    df: pd.DataFrame,
+    cols: List[str],
+    group_cols: Sequence[str] = ('year', 'dummylarge'),
+    percentiles: Tuple[float, float] = (0.01, 0.99),
+    min_obs: int = 10,
+    k: int = 200,
+    chunksize: int = 250,
+    seed: Optional[int] = 0
+) -> pd.DataFrame:
+    """
+    Compare sketch-based bounds against exact quantiles on an in-memory frame.
+    
+    The frame is fed to the sketches in chunks of ``chunksize`` rows to
+    mimic the streaming path.
+    
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Panel small enough to compute exact quantiles
+    cols : List[str]
+        Columns to compare
+    group_cols : Sequence[str], default=('year', 'dummylarge')
+        Grouping columns
+    percentiles : Tuple[float, float], default=(0.01, 0.99)
+        Lower and upper percentiles
+    min_obs : int, default=10
+        Groups with fewer observations get no bounds
+    k : int, default=200
+        Sketch accuracy parameter
+    chunksize : int, default=250
+        Rows per simulated chunk
+    seed : int, optional
+        Seed for reproducible sketches
+        
+    Returns
+    -------
+    pd.DataFrame
+        Exact and approximate bounds per group with absolute errors and the
+        rank error of the approximate bound (fraction of the group's
+        observations between the exact and approximate value)
+    """
+    
+    chunks = (df.iloc[start:start + chunksize] for start in range(0, len(df), chunksize))
+    approx = fit_streaming_winsorizer(chunks, cols, group_cols=group_cols, percentiles=percentiles,
+                                      min_obs=min_obs, k=k, seed=seed).bounds_
+    exact = GroupWinsorizer(cols, group_cols=group_cols, percentiles=percentiles,
+                            min_obs=min_obs).fit(df).bounds_
+    
+    keys = list(group_cols) + ['variable', 'scope']
+    report = exact[keys + ['n_obs', 'p_low', 'p_high']].merge(
+        approx[keys + ['p_low', 'p_high']], on=keys, how='left', suffixes=('_exact', '_approx')
+    )
+    
+    # Sort each variable's values once per group (and overall); the count
+    # between two bounds is then a pair of binary searches
+    group_cols = list(group_cols)
+    sorted_values = {}
+    for variable in report['variable'].unique():
+        present = df[variable].notna()
+        values = df.loc[present, variable].astype(float)
+        sorted_values[(variable, 'overall')] = np.sort(values.to_numpy())
+        for key, group in values.groupby([df.loc[present, c] for c in group_cols], sort=False):
+            key = key if isinstance(key, tuple) else (key,)
+            sorted_values[(variable, 'group') + key] = np.sort(group.to_numpy())
+    
+    lookup = [
+        (variable, 'group', *key) if scope == 'group' else (variable, 'overall')
+        for variable, scope, *key in zip(report['variable'], report['scope'], *(report[c] for c in group_cols))
+    ]
+    empty = np.empty(0)
+    
+    for side in ('low', 'high'):
+        report[f'abs_err_{side}'] = (report[f'p_{side}_approx'] - report[f'p_{side}_exact']).abs()
+        rank_err = []
+        for key, a, b in zip(lookup, report[f'p_{side}_exact'], report[f'p_{side}_approx']):
+            values = sorted_values.get(key, empty)
+            if not len(values):
+                rank_err.append(np.nan)
+                continue
+            lo, hi = min(a, b), max(a, b)
+            # Strictly between the bounds; a missing bound counts nothing
+            inside = np.searchsorted(values, hi, 'left') - np.searchsorted(values, lo, 'right') if lo < hi else 0
+            rank_err.append(max(inside, 0) / len(values))
+        report[f'rank_err_{side}'] = rank_err
+    
+    return report